@@ -1,11 +1,46 @@
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns # type: ignore
 import os
-from config import ARQUIVO_EXCEL, ARQUIVO_SOCIOECONOMICO, NOME_DA_PLANILHA_RESULTADOS, NOME_DA_PLANILHA_MATERIAS, NOME_DA_PLANILHA_SOCIO, PASTA_ANALISES
+import inspect
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from config import ARQUIVO_EXCEL, ARQUIVO_SOCIOECONOMICO, NOME_DA_PLANILHA_RESULTADOS, NOME_DA_PLANILHA_MATERIAS, NOME_DA_PLANILHA_SOCIO, PASTA_ANALISES, WORKERS_GRAFICOS, COLUNA_NOME_SOCIO, ARQUIVO_CORRESPONDENCIA_NOMES
+from config import DPI_GRAFICOS_RELATORIO, FORMATO_GRAFICOS_RELATORIO, QUALIDADE_JPEG_RELATORIO, LIMIAR_CORRESPONDENCIA_NOMES
+import gerar_relatorio
+import pontuacao
+import correspondencia_nomes
+from cache_planilhas import ler_planilha
+from cache_analises import hash_entradas, carregar_manifesto, salvar_manifesto, esta_atualizada
+from gerar_relatorio import figura_para_buffer, renderizar_png, caminho_versao_relatorio
+from correspondencia_nomes import parear_nomes, resumir_pareamento
+from pontuacao import acertos_da_aba
 
 # --- Funções Auxiliares e de Análise (sem alterações) ---
 
+# Quando é um dicionário, cada gráfico salvo também é guardado aqui em memória (ver `executar_analises`)
+_figuras_capturadas = None
+
+def salvar_figura(caminho_arquivo):
+    """
+    Renderiza a figura atual uma única vez (PNG em DPI_GRAFICOS_RELATORIO) e grava esses bytes em arquivo.
+    Grava também a versão do relatório (ver `gerar_relatorio.caminho_versao_relatorio`), convertida a partir da
+    mesma renderização (só o formato 'svg' precisa de uma renderização própria, em vetor), e a guarda em memória
+    se a captura estiver ligada. Devolve os bytes do PNG.
+    """
+    png = renderizar_png(plt.gcf())
+    with open(caminho_arquivo, 'wb') as f:
+        f.write(png)
+    relatorio = figura_para_buffer(plt.gcf(), png=png).getvalue()
+    versao = caminho_versao_relatorio(caminho_arquivo)
+    os.makedirs(os.path.dirname(versao), exist_ok=True)
+    with open(versao, 'wb') as f:
+        f.write(relatorio)
+    if _figuras_capturadas is not None:
+        _figuras_capturadas[os.path.basename(caminho_arquivo)] = relatorio
+    return png
+
 def parse_questoes(texto_questoes):
     """Interpreta o texto da coluna 'Questões' (ex: '1-10, 15')."""
     questoes = set()
@@ -24,7 +59,7 @@ def ler_mapeamento_materias(caminho_excel, nome_planilha):
     """Lê o mapeamento de matérias e questões da aba 'Materias' do Excel."""
     print("📚 Lendo mapeamento de matérias do Excel...")
     try:
-        df_materias = pd.read_excel(caminho_excel, sheet_name=nome_planilha, header=4)
+        df_materias = ler_planilha(caminho_excel, nome_planilha, header=4)
         mapeamento = {row['Matéria']: parse_questoes(row['Questões']) for _, row in df_materias.iterrows() if pd.notna(row['Matéria']) and pd.notna(row['Questões'])}
         if not mapeamento: raise ValueError("Nenhum mapeamento válido encontrado.")
         return mapeamento
@@ -53,7 +88,7 @@ def gerar_distribuicao_notas(df_resultados, pasta_saida):
     plt.figure(figsize=(10, 6)); sns.histplot(df_resultados['% de Acertos'], kde=True, bins=10, color='skyblue')
     plt.title('Distribuição das Notas Finais dos Alunos'); plt.xlabel('Porcentagem de Acertos (%)'); plt.ylabel('Número de Alunos'); plt.xlim(0, 100)
     plt.grid(axis='y', linestyle='--', alpha=0.7)
-    caminho_arquivo = os.path.join(pasta_saida, 'distribuicao_notas.png'); plt.savefig(caminho_arquivo); plt.close()
+    caminho_arquivo = os.path.join(pasta_saida, 'distribuicao_notas.png'); salvar_figura(caminho_arquivo); plt.close()
     print(f"✅ Gráfico de distribuição salvo.")
 
 def gerar_boxplot_por_materia(df_completo, mapeamento, pasta_saida):
@@ -65,6 +100,9 @@ def gerar_boxplot_por_materia(df_completo, mapeamento, pasta_saida):
     
     gabarito = df_completo.iloc[0]
     respostas_alunos = df_completo.iloc[1:]
+    # Acertos de cada aluno no gabarito da sua versão, com as anuladas como certas (colunas 'Certa <questão>')
+    questoes_prova = [q for q in respostas_alunos.columns if isinstance(q, int)]
+    acertos = pd.DataFrame(acertos_da_aba(respostas_alunos, questoes_prova, gabarito), columns=questoes_prova)
     
     dados_boxplot = []
     
@@ -76,14 +114,8 @@ def gerar_boxplot_por_materia(df_completo, mapeamento, pasta_saida):
         if not colunas_materia:
             continue
             
-        # Seleciona as respostas de TODOS os alunos apenas para as questões da matéria atual.
-        respostas_subset = respostas_alunos[colunas_materia]
-        gabarito_subset = gabarito[colunas_materia]
-        
-        # Compara o DataFrame de respostas com a Série do gabarito.
-        # O método .eq(gabarito_subset) compara cada linha de respostas com o gabarito.
-        # .sum(axis=1) soma os acertos (True values) para cada aluno.
-        acertos_por_aluno = respostas_subset.eq(gabarito_subset).sum(axis=1)
+        # .sum(axis=1) soma os acertos (True values) de cada aluno nas questões da matéria.
+        acertos_por_aluno = acertos[colunas_materia].sum(axis=1)
         
         # Calcula o percentual de acertos para cada aluno nesta matéria.
         percentuais = (acertos_por_aluno / len(colunas_materia)) * 100
@@ -109,7 +141,7 @@ def gerar_boxplot_por_materia(df_completo, mapeamento, pasta_saida):
 
     caminho_arquivo = os.path.join(pasta_saida, 'boxplot_desempenho_por_materia.png')
     plt.tight_layout()
-    plt.savefig(caminho_arquivo)
+    salvar_figura(caminho_arquivo)
     plt.close()
     
     print(f"✅ Gráfico de boxplot por matéria salvo.")
@@ -119,8 +151,9 @@ def analisar_dificuldade_questoes(df_completo, pasta_saida):
     print("📊 Gerando análise de dificuldade das questões...")
     # (Código interno sem alterações)
     gabarito = df_completo.iloc[0]; respostas_alunos = df_completo.iloc[1:]
-    acertos_por_questao = {q: ((respostas_alunos[q].values == gabarito[q]).sum() / len(respostas_alunos)) * 100 for q in respostas_alunos.columns if isinstance(q, int)}
-    df_dificuldade = pd.Series(acertos_por_questao).sort_values()
+    questoes = [q for q in respostas_alunos.columns if isinstance(q, int)]
+    acertos = acertos_da_aba(respostas_alunos, questoes, gabarito)  # gabarito da versão de cada aluno
+    df_dificuldade = pd.Series(acertos.mean(axis=0) * 100, index=questoes).sort_values()
     caminho_txt = os.path.join(pasta_saida, 'dificuldade_questoes.txt')
     with open(caminho_txt, 'w', encoding='utf-8') as f:
         f.write("As 5 questões MAIS DIFÍCEIS (menor % de acerto):\n")
@@ -129,15 +162,147 @@ def analisar_dificuldade_questoes(df_completo, pasta_saida):
         f.writelines(f"  - Questão {q}: {p:.1f}% de acerto\n" for q, p in df_dificuldade.tail(5).iloc[::-1].items())
     plt.figure(figsize=(15, 7)); df_dificuldade.plot(kind='bar', color='coral')
     plt.title('Percentual de Acerto por Questão'); plt.xlabel('Número da Questão'); plt.ylabel('Acertos (%)')
-    caminho_img = os.path.join(pasta_saida, 'dificuldade_questoes.png'); plt.tight_layout(); plt.savefig(caminho_img); plt.close()
+    caminho_img = os.path.join(pasta_saida, 'dificuldade_questoes.png'); plt.tight_layout(); salvar_figura(caminho_img); plt.close()
     print(f"✅ Análise de dificuldade concluída.")
 
+# --- Análise de Itens ---
+
+ALTERNATIVAS_ITENS = ["A", "B", "C", "D", "E", "Em branco", "Z"]
+FRACAO_GRUPOS_ITENS = 0.27  # grupos superior e inferior do índice de discriminação (27% de cada lado)
+MAX_ITENS_REVISAR = 15  # questões listadas no texto do relatório; a tabela completa fica no CSV
+
+def classificar_discriminacao(indice):
+    """Classificação usual do índice de discriminação: ≥ 0,40 ótima, ≥ 0,30 boa, ≥ 0,20 regular, abaixo disso fraca."""
+    return np.select([indice >= 0.4, indice >= 0.3, indice >= 0.2], ["Ótima", "Boa", "Regular"], "Fraca")
+
+def calcular_analise_itens(respostas, gabarito, numeros_questoes, acertos=None):
+    """
+    Análise de itens de todas as questões de uma vez, a partir da matriz de respostas (alunos × questões)
+    e do gabarito. `acertos` (alunos × questões, booleana) substitui a comparação com `gabarito` quando cada
+    aluno tem o gabarito da sua versão ou há questões anuladas (ver `pontuacao.acertos_da_aba`).
+    Devolve um DataFrame com uma linha por questão:
+    - '% Acerto': dificuldade (proporção de acertos × 100);
+    - 'Discriminação': acerto no grupo dos 27% maiores totais menos o acerto nos 27% menores (-1 a 1);
+    - 'Ponto-bisserial': correlação entre acertar a questão e o total de acertos (NaN se todos ou ninguém acertam);
+    - '% A' ... '% E', '% Em branco', '% Z': quanto cada alternativa foi marcada;
+    - 'Distrator atrai melhores': no grupo superior, alguma alternativa errada foi mais marcada do que a questão
+      foi acertada;
+    - 'Classificação': da discriminação.
+    """
+    respostas = np.asarray(respostas, dtype=object)
+    gabarito = np.asarray(gabarito, dtype=object)
+    n_alunos, n_questoes = respostas.shape
+
+    # Um rótulo inteiro por valor distinto (gabarito e respostas juntos; vazio/NaN = -1): as comparações
+    # passam a ser entre inteiros, sem converter milhões de células em texto
+    rotulos, unicos = pd.factorize(np.concatenate([gabarito, respostas.ravel()]))
+    rotulos_gabarito, rotulos_respostas = rotulos[:n_questoes], rotulos[n_questoes:].reshape(n_alunos, n_questoes)
+    if acertos is None:
+        acertos = rotulos_respostas == rotulos_gabarito[np.newaxis, :]
+    acertos = np.asarray(acertos, dtype=bool)
+    totais = acertos.sum(axis=1)
+
+    # Códigos 0..6 das alternativas (ALTERNATIVAS_ITENS); vazio = 'Em branco', valores fora de A–E = 'Z'
+    codigo_unico = np.array([ALTERNATIVAS_ITENS.index(str(u)) if str(u) in ALTERNATIVAS_ITENS[:5] else
+                             5 if str(u) == "" else 6 for u in unicos] + [5], dtype=np.intp)
+    codigos = codigo_unico[rotulos_respostas]  # o rótulo -1 cai no último código, 'Em branco'
+    colunas = np.arange(n_questoes)[np.newaxis, :]
+    n_alt = len(ALTERNATIVAS_ITENS)
+
+    def frequencias(linhas):
+        """(questões × alternativas): quantos alunos de `linhas` marcaram cada alternativa em cada questão."""
+        return np.bincount((codigos[linhas] + n_alt * colunas).ravel(),
+                           minlength=n_alt * n_questoes).reshape(n_questoes, n_alt)
+
+    # Grupos superior e inferior pelo total de acertos
+    ordem = np.argsort(totais, kind="stable")
+    tamanho_grupo = max(1, int(round(FRACAO_GRUPOS_ITENS * n_alunos)))
+    inferior, superior = ordem[:tamanho_grupo], ordem[-tamanho_grupo:]
+    dificuldade = acertos.mean(axis=0)
+    discriminacao = acertos[superior].mean(axis=0) - acertos[inferior].mean(axis=0)
+
+    # Ponto-bisserial: correlação de Pearson entre cada coluna de acertos (0/1) e o total, para todas as colunas
+    desvio_total = totais.std()
+    covariancia = (acertos.T.astype(float) @ totais) / n_alunos - dificuldade * totais.mean()
+    desvio_itens = np.sqrt(dificuldade * (1 - dificuldade))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ponto_bisserial = np.where(desvio_itens * desvio_total > 0, covariancia / (desvio_itens * desvio_total), np.nan)
+
+    contagens = frequencias(slice(None))
+    # Distratores: no grupo superior, quantas vezes cada alternativa A–E foi marcada numa resposta errada. Contar pelas
+    # respostas erradas (e não pela letra do gabarito) vale também quando os alunos têm gabaritos de versões diferentes
+    codigos_superior, erradas = codigos[superior], ~acertos[superior] & (codigos[superior] < 5)
+    erradas_superior = np.bincount((codigos_superior + 5 * colunas)[erradas],
+                                   minlength=5 * n_questoes).reshape(n_questoes, 5)
+    distrator = erradas_superior.max(axis=1) > acertos[superior].sum(axis=0)
+
+    itens = pd.DataFrame({"Questão": numeros_questoes, "Gabarito": gabarito, "% Acerto": dificuldade * 100,
+                          "Discriminação": discriminacao, "Ponto-bisserial": ponto_bisserial})
+    for k, alternativa in enumerate(ALTERNATIVAS_ITENS):
+        itens[f"% {alternativa}"] = contagens[:, k] / n_alunos * 100
+    itens["Distrator atrai melhores"] = distrator
+    itens["Classificação"] = classificar_discriminacao(discriminacao)
+    return itens
+
+def analisar_itens(df_completo, pasta_saida):
+    """Análise de itens (discriminação, ponto-bisserial e distratores) de todas as questões."""
+    print("📊 Gerando análise de itens...")
+    gabarito = df_completo.iloc[0]
+    respostas_alunos = df_completo.iloc[1:]
+    if 'Acertos' in respostas_alunos.columns:
+        respostas_alunos = respostas_alunos[respostas_alunos['Acertos'].notna()]  # só quem tem respostas
+    questoes = [q for q in df_completo.columns if isinstance(q, int)]
+    if len(respostas_alunos) < 2 or not questoes:
+        print("⚠️ Alunos insuficientes para a análise de itens. Análise pulada.")
+        return
+    itens = calcular_analise_itens(respostas_alunos[questoes].to_numpy(dtype=object),
+                                   gabarito[questoes].to_numpy(dtype=object), questoes,
+                                   acertos_da_aba(respostas_alunos, questoes, gabarito))
+    itens.to_csv(os.path.join(pasta_saida, 'analise_itens.csv'), index=False, encoding='utf-8-sig', float_format='%.3f')
+
+    caminho_txt = os.path.join(pasta_saida, 'analise_itens.txt')
+    with open(caminho_txt, 'w', encoding='utf-8') as f:
+        f.write(f"Alunos analisados: {len(respostas_alunos)}\n")
+        for classe in ["Ótima", "Boa", "Regular", "Fraca"]:
+            f.write(f"Discriminação {classe.lower()}: {int((itens['Classificação'] == classe).sum())} questões\n")
+        revisar = itens[(itens['Classificação'] == "Fraca") | itens['Distrator atrai melhores']]
+        revisar = revisar.sort_values('Discriminação')
+        f.write("\nQuestões para revisar (discriminação fraca ou\ndistrator que atrai o grupo superior):\n")
+        if revisar.empty:
+            f.write("  Nenhuma.\n")
+        for _, item in revisar.head(MAX_ITENS_REVISAR).iterrows():
+            erradas = item[[f"% {a}" for a in ALTERNATIVAS_ITENS[:5] if a != item['Gabarito']]].astype(float)
+            f.write(f"  - Q{item['Questão']}: acerto {item['% Acerto']:.0f}%, D={item['Discriminação']:.2f}, "
+                    f"rpb={item['Ponto-bisserial']:.2f}, mais marcada errada: {erradas.idxmax()[2:]} "
+                    f"({erradas.max():.0f}%)\n")
+        if len(revisar) > MAX_ITENS_REVISAR:
+            f.write(f"  ... e mais {len(revisar) - MAX_ITENS_REVISAR} (ver analise_itens.csv)\n")
+
+    plt.figure(figsize=(10, 6))
+    cores = itens['Classificação'].map({"Ótima": "tab:green", "Boa": "tab:blue", "Regular": "tab:orange", "Fraca": "tab:red"})
+    plt.scatter(itens['% Acerto'], itens['Discriminação'], c=cores)
+    for _, item in itens.iterrows():
+        plt.annotate(str(item['Questão']), (item['% Acerto'], item['Discriminação']), fontsize=7,
+                     xytext=(3, 3), textcoords='offset points')
+    plt.axhline(0.2, color='gray', linestyle='--', linewidth=1)
+    plt.title('Dificuldade x Discriminação das Questões'); plt.xlabel('Acertos (%)'); plt.ylabel('Índice de Discriminação')
+    plt.xlim(0, 100); plt.grid(linestyle='--', alpha=0.5)
+    caminho_img = os.path.join(pasta_saida, 'analise_itens.png'); plt.tight_layout(); salvar_figura(caminho_img); plt.close()
+    print(f"✅ Análise de itens concluída.")
+
 # --- NOVAS FUNÇÕES DE ANÁLISE SOCIOECONÔMICA ---
 
+# Colunas da planilha socioeconômica usadas pelas análises
+COLUNA_FAIXA_SALARIAL = 'FAIXA SALARIAL'
+COLUNA_IDADE = 'Qual a sua idade?'
+COLUNA_DISTANCIA = 'Quantos quilômetros aproximadamente são de distância da sua residência até o Insper (Rua Quatá, 200 - Vila Olímpia)? (Escreva apenas números)'
+COLUNA_LOCOMOCAO = 'Qual meio de locomoção será usado para sua ida ao Insper?'
+COLUNA_REGIAO = 'Distribuição geográfica'
+
 def analisar_desempenho_por_faixa_salarial(df_merged, pasta_saida):
     """Gera um boxplot do desempenho por faixa salarial."""
     print("📊 Gerando análise de desempenho por faixa salarial...")
-    coluna_analise = 'FAIXA SALARIAL'
+    coluna_analise = COLUNA_FAIXA_SALARIAL
     if coluna_analise not in df_merged.columns:
         print(f"⚠️ Coluna '{coluna_analise}' não encontrada. Análise pulada.")
         return
@@ -154,13 +319,13 @@ def analisar_desempenho_por_faixa_salarial(df_merged, pasta_saida):
     plt.grid(axis='y', linestyle='--', alpha=0.7)
 
     caminho_arquivo = os.path.join(pasta_saida, 'desempenho_por_faixa_salarial.png')
-    plt.tight_layout(); plt.savefig(caminho_arquivo); plt.close()
+    plt.tight_layout(); salvar_figura(caminho_arquivo); plt.close()
     print(f"✅ Gráfico por faixa salarial salvo.")
 
 def analisar_desempenho_por_faixa_etaria(df_merged, pasta_saida):
     """Gera um boxplot do desempenho por faixa etária."""
     print("📊 Gerando análise de desempenho por faixa etária...")
-    coluna_analise = 'Qual a sua idade?'
+    coluna_analise = COLUNA_IDADE
     if coluna_analise not in df_merged.columns:
         print(f"⚠️ Coluna '{coluna_analise}' não encontrada. Análise pulada.")
         return
@@ -178,13 +343,13 @@ def analisar_desempenho_por_faixa_etaria(df_merged, pasta_saida):
     plt.grid(axis='y', linestyle='--', alpha=0.7)
 
     caminho_arquivo = os.path.join(pasta_saida, 'desempenho_por_faixa_etaria.png')
-    plt.tight_layout(); plt.savefig(caminho_arquivo); plt.close()
+    plt.tight_layout(); salvar_figura(caminho_arquivo); plt.close()
     print(f"✅ Gráfico por faixa etária salvo.")
 
 def analisar_correlacao_distancia_nota(df_merged, pasta_saida):
     """Gera um gráfico de dispersão entre distância e nota."""
     print("📊 Gerando análise de correlação Distância x Nota...")
-    coluna_analise = 'Quantos quilômetros aproximadamente são de distância da sua residência até o Insper (Rua Quatá, 200 - Vila Olímpia)? (Escreva apenas números)'
+    coluna_analise = COLUNA_DISTANCIA
     if coluna_analise not in df_merged.columns:
         print(f"⚠️ Coluna '{coluna_analise}' não encontrada. Análise pulada.")
         return
@@ -201,13 +366,13 @@ def analisar_correlacao_distancia_nota(df_merged, pasta_saida):
     plt.grid(True, linestyle='--', alpha=0.6)
 
     caminho_arquivo = os.path.join(pasta_saida, 'correlacao_distancia_nota.png')
-    plt.tight_layout(); plt.savefig(caminho_arquivo); plt.close()
+    plt.tight_layout(); salvar_figura(caminho_arquivo); plt.close()
     print(f"✅ Gráfico de correlação Distância x Nota salvo.")
 
 def analisar_desempenho_por_locomocao(df_merged, pasta_saida):
     """Gera um boxplot do desempenho por meio de locomoção."""
     print("📊 Gerando análise de desempenho por meio de locomoção...")
-    coluna_analise = 'Qual meio de locomoção será usado para sua ida ao Insper?'
+    coluna_analise = COLUNA_LOCOMOCAO
     if coluna_analise not in df_merged.columns:
         print(f"⚠️ Coluna '{coluna_analise}' não encontrada. Análise pulada.")
         return
@@ -221,7 +386,7 @@ def analisar_desempenho_por_locomocao(df_merged, pasta_saida):
     plt.grid(axis='y', linestyle='--', alpha=0.7)
 
     caminho_arquivo = os.path.join(pasta_saida, 'desempenho_por_locomocao.png')
-    plt.tight_layout(); plt.savefig(caminho_arquivo); plt.close()
+    plt.tight_layout(); salvar_figura(caminho_arquivo); plt.close()
     print(f"✅ Gráfico por meio de locomoção salvo.")
 
 def analisar_desempenho_por_regiao(df_merged, pasta_saida):
@@ -230,7 +395,7 @@ def analisar_desempenho_por_regiao(df_merged, pasta_saida):
     agrupando regiões menos comuns em 'Outros'.
     """
     print("📊 Gerando análise de desempenho por região geográfica (agrupada)...")
-    coluna_analise = 'Distribuição geográfica'
+    coluna_analise = COLUNA_REGIAO
 
     # Verifica se a coluna necessária existe no DataFrame
     if coluna_analise not in df_merged.columns:
@@ -281,36 +446,205 @@ def analisar_desempenho_por_regiao(df_merged, pasta_saida):
     caminho_arquivo = os.path.join(pasta_saida, 'desempenho_por_regiao.png')
     try:
         plt.tight_layout()
-        plt.savefig(caminho_arquivo)
+        salvar_figura(caminho_arquivo)
         plt.close()
         print(f"✅ Gráfico de desempenho por região (agrupada) salvo.")
     except Exception as e:
         print(f"❌ ERRO ao salvar o gráfico de desempenho por região: {e}")
 
+# --- Registro das Análises ---
+# Cada análise declara o DataFrame que usa ('alunos', 'notas' ou 'socio'), as colunas que lê
+# (None = todas), se usa o mapeamento de matérias e os arquivos que gera. É com isso que
+# `executar_analises` decide o que precisa ser gerado de novo (ver `cache_analises.py`).
+REGISTRO_ANALISES = [
+    ("boxplot por matéria", gerar_boxplot_por_materia, "alunos", None, True,
+     ["boxplot_desempenho_por_materia.png"]),
+    ("estatísticas gerais", analisar_estatisticas_gerais, "notas", ['% de Acertos'], False,
+     ["estatisticas_gerais.txt"]),
+    ("distribuição das notas", gerar_distribuicao_notas, "notas", ['% de Acertos'], False,
+     ["distribuicao_notas.png"]),
+    ("dificuldade das questões", analisar_dificuldade_questoes, "alunos", None, False,
+     ["dificuldade_questoes.txt", "dificuldade_questoes.png"]),
+    ("análise de itens", analisar_itens, "alunos", None, False,
+     ["analise_itens.csv", "analise_itens.txt", "analise_itens.png"]),
+    ("faixa salarial", analisar_desempenho_por_faixa_salarial, "socio", [COLUNA_FAIXA_SALARIAL, '% de Acertos'], False,
+     ["desempenho_por_faixa_salarial.png"]),
+    ("faixa etária", analisar_desempenho_por_faixa_etaria, "socio", [COLUNA_IDADE, '% de Acertos'], False,
+     ["desempenho_por_faixa_etaria.png"]),
+    ("distância x nota", analisar_correlacao_distancia_nota, "socio", [COLUNA_DISTANCIA, '% de Acertos'], False,
+     ["correlacao_distancia_nota.png"]),
+    ("meio de locomoção", analisar_desempenho_por_locomocao, "socio", [COLUNA_LOCOMOCAO, '% de Acertos'], False,
+     ["desempenho_por_locomocao.png"]),
+    ("região", analisar_desempenho_por_regiao, "socio", [COLUNA_REGIAO, '% de Acertos'], False,
+     ["desempenho_por_regiao.png"]),
+]
+
+# --- Carregamento e Execução das Análises ---
+
+def unir_resultados_socio(df_resultados, df_socio, pareamento=None):
+    """
+    Une resultados e dados socioeconômicos pelo nome do aluno e prepara os DataFrames das análises.
+    Os nomes são pareados por `correspondencia_nomes.parear_nomes` (exato, normalizado ou aproximado);
+    `pareamento` pode ser passado já calculado.
+    """
+    if pareamento is None:
+        pareamento = parear_nomes(df_resultados['Aluno/Questões'].iloc[1:], df_socio[COLUNA_NOME_SOCIO])
+    # As primeiras linhas do pareamento seguem a ordem dos alunos; a linha 0 dos resultados é o gabarito
+    pareados = pareamento['Nome Referência'].iloc[:len(df_resultados) - 1].tolist()
+    chave = pd.Series([None, *pareados], index=df_resultados.index, dtype=object)
+
+    # Une as duas tabelas pelo nome da planilha socioeconômica pareado a cada aluno
+    df_merged = pd.merge(
+        df_resultados.assign(_nome_pareado=chave),
+        df_socio.drop_duplicates(subset=[COLUNA_NOME_SOCIO]),
+        left_on='_nome_pareado',
+        right_on=COLUNA_NOME_SOCIO,
+        how='inner' # 'inner' une apenas alunos presentes em ambas as planilhas
+    ).drop(columns=['_nome_pareado'])
+    print("✅ Dados de resultados e socioeconômicos unidos com sucesso.")
+
+    # Prepara DataFrames para as funções antigas
+    df_alunos = df_resultados.drop(columns=['Aluno/Questões'])
+    df_resultados_finais = df_resultados[df_resultados['Aluno/Questões'] != 'Gabarito'][['Acertos', '% de Acertos']]
+    return df_merged, df_alunos, df_resultados_finais
+
+def parametros_analises():
+    """
+    Configurações e código auxiliar de que todas as análises dependem além da própria função: renderização e
+    conversão dos gráficos, pareamento de nomes, acertos por questão e constantes da análise de itens. Entram no
+    hash de cada análise (`parametros` de `hash_entradas`), então mudar qualquer um deles gera as análises de novo.
+    """
+    funcoes = [salvar_figura, unir_resultados_socio, calcular_analise_itens, classificar_discriminacao,
+               gerar_relatorio.renderizar_png, gerar_relatorio.compactar_png, gerar_relatorio.figura_para_buffer,
+               gerar_relatorio._usar_svg, gerar_relatorio._renderizar_svg, gerar_relatorio._pontos_na_figura,
+               gerar_relatorio.caminho_versao_relatorio]
+    return {
+        "DPI_GRAFICOS_RELATORIO": DPI_GRAFICOS_RELATORIO,
+        "FORMATO_GRAFICOS_RELATORIO": FORMATO_GRAFICOS_RELATORIO,
+        "QUALIDADE_JPEG_RELATORIO": QUALIDADE_JPEG_RELATORIO,
+        "MAX_PONTOS_SVG": gerar_relatorio.MAX_PONTOS_SVG,
+        "LIMIAR_CORRESPONDENCIA_NOMES": LIMIAR_CORRESPONDENCIA_NOMES,
+        "itens": [ALTERNATIVAS_ITENS, FRACAO_GRUPOS_ITENS, MAX_ITENS_REVISAR],
+        "codigo": [inspect.getsource(f) for f in funcoes] +
+                  [inspect.getsource(m) for m in (pontuacao, correspondencia_nomes)],
+    }
+
+def _inicializar_worker_graficos():
+    # Backend sem janela: os gráficos só são salvos em arquivo
+    plt.switch_backend('Agg')
+
+def _executar_tarefa(tarefa, capturar=False):
+    """
+    Executa uma análise sem deixar a exceção escapar. Devolve (nome, None ou mensagem de erro, figuras),
+    com as figuras salvas por ela ({nome do arquivo: bytes}) quando `capturar` for verdadeiro.
+    """
+    global _figuras_capturadas
+    nome, funcao, argumentos = tarefa
+    _figuras_capturadas = {} if capturar else None
+    try:
+        funcao(*argumentos)
+        return nome, None, _figuras_capturadas or {}
+    except Exception as e:
+        plt.close('all')
+        return nome, f"{type(e).__name__}: {e}", _figuras_capturadas or {}
+    finally:
+        _figuras_capturadas = None
+
+def executar_tarefas(tarefas, workers=WORKERS_GRAFICOS, figuras=None):
+    """
+    Executa as análises (lista de (nome, função, argumentos)), em paralelo num pool de processos quando
+    `workers` for maior que 1. A falha de uma análise não interrompe as outras. Devolve a lista de (nome, erro).
+    Se `figuras` for um dicionário, recebe os gráficos gerados, já prontos para o relatório.
+    """
+    capturar = figuras is not None
+    workers = min(workers or os.cpu_count() or 1, len(tarefas))
+    if workers <= 1:
+        resultados = [_executar_tarefa(tarefa, capturar) for tarefa in tarefas]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_inicializar_worker_graficos) as pool:
+            resultados = list(pool.map(_executar_tarefa, tarefas, [capturar] * len(tarefas)))
+    if capturar:
+        for _, _, figuras_tarefa in resultados:
+            figuras.update(figuras_tarefa)
+    return [(nome, erro) for nome, erro, _ in resultados if erro is not None]
+
+def executar_analises(df_resultados, df_socio, mapeamento_materias, pasta_saida=PASTA_ANALISES, workers=WORKERS_GRAFICOS,
+                      incremental=True, figuras=None):
+    """
+    Gera todas as análises a partir dos DataFrames já em memória: `df_resultados` no formato
+    da aba de resultados (ver `processar_provas`) e `df_socio` da planilha socioeconômica.
+    Os gráficos são renderizados em `workers` processos (0 = todos os núcleos, 1 = sequencial).
+    Com `incremental`, só são geradas as análises cujas entradas declaradas em `REGISTRO_ANALISES`
+    mudaram desde a última execução (ou cujos arquivos sumiram).
+    Se `figuras` for um dicionário, recebe os gráficos gerados em memória, prontos para `criar_pdf_consolidado`.
+    Devolve a lista de (análise, erro) das que falharam, ou None se resultados e dados socioeconômicos não puderem
+    ser unidos (nenhuma análise roda e os arquivos da pasta ficam os da execução anterior).
+    """
+    os.makedirs(pasta_saida, exist_ok=True)
+    try:
+        pareamento = parear_nomes(df_resultados['Aluno/Questões'].iloc[1:], df_socio[COLUNA_NOME_SOCIO])
+        resumir_pareamento(pareamento)
+        pareamento.sort_values('Confiança').to_csv(os.path.join(pasta_saida, ARQUIVO_CORRESPONDENCIA_NOMES),
+                                                   index=False, encoding='utf-8-sig')
+        df_merged, df_alunos, df_resultados_finais = unir_resultados_socio(df_resultados, df_socio, pareamento)
+    except KeyError as e:
+        print(f"❌ ERRO ao unir os dados: coluna {e} não encontrada.")
+        return None
+    dados = {"alunos": df_alunos, "notas": df_resultados_finais, "socio": df_merged}
+
+    if df_merged.empty:
+        print("⚠️ Nenhum aluno em comum encontrado entre as planilhas de resultados e socioeconômica. Análises socioeconômicas puladas.")
+
+    # --- EXECUÇÃO DAS ANÁLISES ---
+    # Os hashes são calculados antes de qualquer análise rodar (algumas alteram o DataFrame recebido)
+    manifesto = carregar_manifesto(pasta_saida) if incremental else {}
+    parametros = parametros_analises()
+    tarefas, hashes, atualizadas = [], {}, []
+    for nome, funcao, origem, colunas, usa_mapeamento, saidas in REGISTRO_ANALISES:
+        # As versões dos gráficos para o relatório também são saídas: sem elas, a análise roda de novo
+        saidas = saidas + [caminho_versao_relatorio(s) for s in saidas if s.endswith('.png')]
+        if origem == "socio" and df_merged.empty:
+            continue
+        if usa_mapeamento and not mapeamento_materias:
+            continue
+        mapeamento = mapeamento_materias if usa_mapeamento else None
+        hashes[nome] = hash_entradas(dados[origem], colunas, mapeamento, funcao, parametros)
+        if incremental and esta_atualizada(manifesto, nome, hashes[nome], pasta_saida, saidas):
+            atualizadas.append(nome)
+            continue
+        argumentos = (dados[origem], mapeamento, pasta_saida) if usa_mapeamento else (dados[origem], pasta_saida)
+        tarefas.append((nome, funcao, argumentos))
+
+    if atualizadas:
+        print(f"♻️ {len(atualizadas)} análises sem mudanças nas entradas foram reaproveitadas: {', '.join(atualizadas)}.")
+    print(f"\n--- Iniciando {len(tarefas)} Análises de Desempenho e Socioeconômicas ---")
+    erros = executar_tarefas(tarefas, workers, figuras) if tarefas else []
+
+    # Só as análises concluídas entram no manifesto; as que falharam rodam de novo na próxima vez
+    falhas = {nome for nome, _ in erros}
+    for nome, funcao, origem, colunas, usa_mapeamento, saidas in REGISTRO_ANALISES:
+        if nome in hashes and nome not in falhas:
+            manifesto[nome] = {"hash": hashes[nome], "saidas": saidas}
+    salvar_manifesto(pasta_saida, manifesto)
+
+    if erros:
+        print(f"\n⚠️ {len(tarefas) - len(erros)} de {len(tarefas)} análises concluídas. Falharam:")
+        for nome, erro in erros:
+            print(f"  - {nome}: {erro}")
+    else:
+        print("\n🚀 Todas as análises foram concluídas com sucesso!")
+    return erros
+
 # --- Ponto de Entrada Principal ---
 if __name__ == "__main__":
-    if not os.path.exists(PASTA_ANALISES):
-        os.makedirs(PASTA_ANALISES)
+    parser = argparse.ArgumentParser(description="Gera as análises e gráficos dos resultados")
+    parser.add_argument("--forcar", action="store_true", help="gera todas as análises de novo, mesmo sem mudanças")
+    args = parser.parse_args()
 
-    # --- CARREGAMENTO E UNIÃO DOS DADOS ---
+    # --- CARREGAMENTO DOS DADOS ---
     try:
-        df_resultados = pd.read_excel(ARQUIVO_EXCEL, sheet_name=NOME_DA_PLANILHA_RESULTADOS, header=4)
-        df_socio = pd.read_excel(ARQUIVO_SOCIOECONOMICO, sheet_name=NOME_DA_PLANILHA_SOCIO)
-
-        # Une as duas tabelas usando o nome do aluno como chave
-        df_merged = pd.merge(
-            df_resultados,
-            df_socio,
-            left_on='Aluno/Questões',
-            right_on='Nome Completo',
-            how='inner' # 'inner' une apenas alunos presentes em ambas as planilhas
-        )
-        print("✅ Dados de resultados e socioeconômicos unidos com sucesso.")
-        
-        # Prepara DataFrames para as funções antigas
-        df_alunos = df_resultados.drop(columns=['Aluno/Questões'])
-        df_resultados_finais = df_resultados[df_resultados['Aluno/Questões'] != 'Gabarito'][['Acertos', '% de Acertos']]
-
+        df_resultados = ler_planilha(ARQUIVO_EXCEL, NOME_DA_PLANILHA_RESULTADOS, header=4)
+        df_socio = ler_planilha(ARQUIVO_SOCIOECONOMICO, NOME_DA_PLANILHA_SOCIO)
     except FileNotFoundError as e:
         print(f"❌ ERRO: Arquivo não encontrado: {e.filename}. Verifique os nomes e caminhos.")
         exit()
@@ -321,26 +655,5 @@ if __name__ == "__main__":
         print(f"❌ ERRO ao carregar ou unir os dados: {e}")
         exit()
 
-    # --- EXECUÇÃO DAS ANÁLISES ---
-    print("\n--- Iniciando Análises de Desempenho ---")
-    mapeamento_materias = ler_mapeamento_materias(ARQUIVO_EXCEL, NOME_DA_PLANILHA_MATERIAS)
-    if mapeamento_materias:
-        gerar_boxplot_por_materia(df_alunos, mapeamento_materias, PASTA_ANALISES)
-    
-    analisar_estatisticas_gerais(df_resultados_finais, PASTA_ANALISES)
-    gerar_distribuicao_notas(df_resultados_finais, PASTA_ANALISES)
-    analisar_dificuldade_questoes(df_alunos, PASTA_ANALISES)
-    print("✅ Análises de desempenho concluídas com sucesso.")
-
-    print("\n--- Iniciando Análises Socioeconômicas ---")
-    if not df_merged.empty:
-        analisar_desempenho_por_faixa_salarial(df_merged, PASTA_ANALISES)
-        analisar_desempenho_por_faixa_etaria(df_merged, PASTA_ANALISES)
-        analisar_correlacao_distancia_nota(df_merged, PASTA_ANALISES)
-        analisar_desempenho_por_locomocao(df_merged, PASTA_ANALISES)
-        analisar_desempenho_por_regiao(df_merged, PASTA_ANALISES)
-        print("✅ Análises socioeconômicas concluídas com sucesso.")
-    else:
-        print("⚠️ Nenhum aluno em comum encontrado entre as planilhas de resultados e socioeconômica. Análises socioeconômicas puladas.")
-
-    print("\n🚀 Todas as análises foram concluídas com sucesso!")
\ No newline at end of file
+    executar_analises(df_resultados, df_socio, ler_mapeamento_materias(ARQUIVO_EXCEL, NOME_DA_PLANILHA_MATERIAS),
+                      incremental=not args.forcar)
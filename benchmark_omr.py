@@ -0,0 +1,174 @@
+import os
+import io
+import json
+import time
+import argparse
+import tracemalloc
+import contextlib
+from datetime import datetime
+import numpy as np
+import corretor
+from config import DPI_RASTERIZACAO
+from folhas_sinteticas import gerar_lote, salvar_lote
+
+# Pasta onde os resultados do benchmark são salvos (para comparar execuções)
+PASTA_BENCHMARKS = 'benchmarks'
+
+# --- Benchmark do corretor (OMR) com folhas sintéticas ---
+# Mede páginas/s e pico de memória de cada etapa (rasterização, recorte/registro, detecção por
+# contornos e pontuação por template) e a precisão por questão, comparando com as respostas
+# verdadeiras das folhas geradas. Com --comparar, aponta etapas que ficaram mais lentas.
+
+def _medir(funcao, entradas):
+    """Executa `funcao` em cada entrada e devolve (saídas, segundos). As mensagens do corretor são silenciadas."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        inicio = time.perf_counter()
+        saidas = [funcao(entrada) for entrada in entradas]
+        duracao = time.perf_counter() - inicio
+    return saidas, duracao
+
+
+def _pico_memoria(funcao, entrada):
+    """Pico de memória (MB) alocada pelo Python/NumPy durante uma chamada de `funcao`."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        tracemalloc.start()
+        funcao(entrada)
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return pico / 1e6
+
+
+def _precisao(respostas, respostas_reais):
+    """
+    Acerto por questão, considerando só as questões com exatamente uma marcação verdadeira
+    (em branco e duplas não têm resposta única). Devolve (acerto geral, acerto por questão).
+    """
+    detectadas = np.array(respostas)
+    reais = np.array(respostas_reais)
+    validas = np.char.str_len(reais) == 1
+    acertos = (detectadas == reais) & validas
+    por_questao = acertos.sum(axis=0) / np.maximum(validas.sum(axis=0), 1)
+    return acertos.sum() / max(validas.sum(), 1), por_questao
+
+
+def executar_benchmark(num_paginas=40, dpi=DPI_RASTERIZACAO, workers=1, usar_pdf=False, semente=0):
+    """Roda todas as etapas sobre um lote sintético e devolve um dicionário com os resultados."""
+    print(f"🧪 Gerando {num_paginas} folhas sintéticas a {dpi} dpi...")
+    folhas, respostas_reais = gerar_lote(num_paginas, semente=semente, dpi=dpi, ruido=0.05, inclinacao=1.0,
+                                         deslocamento=30, prob_branco=0.02, prob_dupla=0.02, prob_parcial=0.05)
+    gabarito_img, paginas = folhas[0], folhas[1:]
+    etapas = {}
+
+    # Rasterização (precisa do poppler)
+    if usar_pdf:
+        caminho_pdf, _ = salvar_lote(folhas, respostas_reais, dpi=dpi, nome='benchmark')
+        inicio = time.perf_counter()
+        total = sum(1 for _ in corretor.rasterizar_pdf(caminho_pdf, dpi=dpi))
+        duracao = time.perf_counter() - inicio
+        etapas["rasterizacao"] = {"paginas_por_s": total / duracao}
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        _, opcoes = corretor.preparar_gabarito(gabarito_img, dpi, caminho_layout=None)
+        layout = corretor.extrair_layout(corretor.recortar_bloco(gabarito_img, opcoes["bloco"]))
+
+    # Recorte do bloco (com registro, se houver referência)
+    def recortar(imagem):
+        if opcoes["referencia"] is not None:
+            return corretor.registrar_bloco(imagem, opcoes["referencia"], opcoes["bloco"])
+        return corretor.recortar_bloco(imagem, opcoes["bloco"])
+
+    blocos, duracao = _medir(recortar, paginas)
+    etapas["recorte"] = {"paginas_por_s": len(paginas) / duracao, "pico_mb": _pico_memoria(recortar, paginas[0])}
+
+    # Detecção por contornos (uma passada por página)
+    respostas_contornos, duracao = _medir(corretor.detectar_respostas_pagina, blocos)
+    etapas["deteccao"] = {"paginas_por_s": len(blocos) / duracao,
+                          "pico_mb": _pico_memoria(corretor.detectar_respostas_pagina, blocos[0])}
+
+    # Pontuação por template (imagem integral)
+    if layout is not None:
+        pontuar = lambda bloco: corretor.detectar_respostas_template(bloco, layout)
+        respostas_template, duracao = _medir(pontuar, blocos)
+        etapas["pontuacao_template"] = {"paginas_por_s": len(blocos) / duracao,
+                                        "pico_mb": _pico_memoria(pontuar, blocos[0])}
+    else:
+        respostas_template = None
+
+    # Fim a fim (gabarito + alunos, com o pool de processos)
+    lote = [("benchmark", f"p{i}", folha) for i, folha in enumerate(folhas, start=1)]
+    (resultado,), duracao = _medir(lambda l: corretor.corrigir_lote(l, dpi=dpi, workers=workers, caminho_layout=None), [lote])
+    etapas["fim_a_fim"] = {"paginas_por_s": len(folhas) / duracao, "workers": workers}
+
+    precisao_contornos, por_questao = _precisao(respostas_contornos, respostas_reais[1:])
+    resultado_final = {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "paginas": num_paginas,
+        "dpi": dpi,
+        "etapas": etapas,
+        "precisao_contornos": precisao_contornos,
+        "precisao_por_questao": np.round(por_questao, 4).tolist(),
+        "questoes_Z": int((np.array(respostas_contornos) == "Z").sum()),
+    }
+    if respostas_template is not None:
+        resultado_final["precisao_template"] = _precisao(respostas_template, respostas_reais[1:])[0]
+    return resultado_final
+
+
+def imprimir_resultado(resultado):
+    print(f"\n📊 Benchmark OMR — {resultado['paginas']} páginas a {resultado['dpi']} dpi")
+    print(f"{'Etapa':<20} {'págs/s':>9} {'pico MB':>9}")
+    for etapa, medidas in resultado["etapas"].items():
+        pico = f"{medidas['pico_mb']:.1f}" if "pico_mb" in medidas else "-"
+        print(f"{etapa:<20} {medidas['paginas_por_s']:>9.1f} {pico:>9}")
+
+    print(f"\nPrecisão (contornos): {resultado['precisao_contornos'] * 100:.2f}%  |  questões Z: {resultado['questoes_Z']}")
+    if "precisao_template" in resultado:
+        print(f"Precisão (template):  {resultado['precisao_template'] * 100:.2f}%")
+    piores = sorted(enumerate(resultado["precisao_por_questao"], start=1), key=lambda x: x[1])[:5]
+    print("Questões com menor acerto: " + ", ".join(f"{q} ({p * 100:.0f}%)" for q, p in piores))
+
+
+def comparar_resultados(atual, anterior, tolerancia=0.2):
+    """Aponta etapas cujo desempenho caiu mais que `tolerancia` (fração) em relação a uma execução anterior."""
+    regressoes = []
+    for etapa, medidas in atual["etapas"].items():
+        if etapa in anterior["etapas"]:
+            antes = anterior["etapas"][etapa]["paginas_por_s"]
+            agora = medidas["paginas_por_s"]
+            if agora < antes * (1 - tolerancia):
+                regressoes.append(f"{etapa}: {antes:.1f} → {agora:.1f} págs/s")
+    if atual["precisao_contornos"] < anterior["precisao_contornos"]:
+        regressoes.append(f"precisão: {anterior['precisao_contornos']:.4f} → {atual['precisao_contornos']:.4f}")
+
+    if regressoes:
+        print("\n❌ Regressões encontradas:")
+        for r in regressoes:
+            print(f"  - {r}")
+    else:
+        print("\n✅ Nenhuma regressão em relação à execução anterior.")
+    return regressoes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de velocidade e precisão do corretor")
+    parser.add_argument("--paginas", type=int, default=40)
+    parser.add_argument("--dpi", type=int, default=DPI_RASTERIZACAO)
+    parser.add_argument("--workers", type=int, default=1, help="processos na etapa fim a fim (0 = todos os núcleos)")
+    parser.add_argument("--pdf", action="store_true", help="inclui a rasterização (exige o poppler)")
+    parser.add_argument("--comparar", metavar="JSON", help="resultado anterior para detectar regressões")
+    args = parser.parse_args()
+
+    resultado = executar_benchmark(args.paginas, args.dpi, args.workers, args.pdf)
+    imprimir_resultado(resultado)
+
+    os.makedirs(PASTA_BENCHMARKS, exist_ok=True)
+    caminho = os.path.join(PASTA_BENCHMARKS, f"benchmark_{datetime.now():%Y%m%d_%H%M%S}.json")
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(resultado, f, indent=2)
+    print(f"\n✅ Resultado salvo em '{caminho}'.")
+
+    if args.comparar:
+        with open(args.comparar, 'r', encoding='utf-8') as f:
+            regressoes = comparar_resultados(resultado, json.load(f))
+        if regressoes:
+            raise SystemExit(1)
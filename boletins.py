@@ -0,0 +1,342 @@
+import os
+import re
+import zipfile
+import argparse
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from fpdf.enums import XPos, YPos # type: ignore
+from gerar_relatorio import PDF, figura_para_buffer
+from cache_planilhas import ler_planilha
+from pontuacao import acertos_da_aba, gabaritos_da_aba
+from config import (ARQUIVO_EXCEL, NOME_DA_PLANILHA_RESULTADOS, NOME_DA_PLANILHA_MATERIAS, PASTA_BOLETINS,
+                    WORKERS_BOLETINS, BOLETINS_POR_LOTE)
+
+# --- Boletins individuais ---
+# Um PDF por aluno: as respostas comparadas ao gabarito, os acertos por matéria e a posição na turma.
+# O que é igual em todos os boletins (gabarito, matérias, médias e o histograma da turma) é preparado uma
+# única vez em `preparar_turma` e chega a cada processo uma só vez, pelo inicializador do pool. O
+# histograma é o mesmo PNG em todos os boletins; a nota do aluno é uma linha desenhada por cima dele.
+# Cada processo monta os PDFs em memória e devolve os bytes, gravados numa pasta ou direto num .zip.
+
+VERDE_CLARO = (198, 239, 206)  # mesmas cores da aba de resultados
+VERMELHO_CLARO = (255, 199, 206)
+# Posição dos eixos do histograma na figura (esquerda, base, largura, altura), em frações; fixa para que a
+# nota do aluno possa ser marcada sobre a imagem já pronta
+EIXOS_HISTOGRAMA = (0.08, 0.2, 0.9, 0.7)
+PROPORCAO_HISTOGRAMA = 3 / 8  # altura / largura da figura
+LARGURA_HISTOGRAMA = 130  # mm no boletim
+LINHAS_POR_BLOCO = 15  # respostas em blocos de 15 linhas, como na folha
+
+
+class Boletim(PDF):
+    titulo = 'Boletim Individual - Cursinho Insper'
+
+
+def _texto(valor):
+    """Texto seguro para as fontes padrão do PDF (latin-1): caracteres fora dele viram '?'."""
+    return str(valor).encode('latin-1', 'replace').decode('latin-1')
+
+
+def _resposta(valor):
+    return '' if pd.isna(valor) else str(valor)
+
+
+def _histograma_turma(notas, media):
+    figura = plt.figure(figsize=(8, 8 * PROPORCAO_HISTOGRAMA))
+    eixo = figura.add_axes(EIXOS_HISTOGRAMA)
+    eixo.hist(notas, bins=range(0, 105, 5), color='skyblue', edgecolor='white')
+    eixo.axvline(media, color='gray', linestyle='--', linewidth=1)
+    eixo.set_xlim(0, 100)
+    eixo.set_xlabel('Porcentagem de Acertos (%)')
+    eixo.set_ylabel('Número de Alunos')
+    eixo.grid(axis='y', linestyle='--', alpha=0.7)
+    buffer = figura_para_buffer(figura, formato='png')
+    plt.close(figura)
+    return buffer.getvalue()
+
+
+def preparar_turma(df_resultados, mapeamento_materias):
+    """
+    Separa os dados da aba de resultados (formato de `processar_provas`) em:
+    - o contexto comum a todos os boletins (gabarito, matérias com total de questões e média da turma,
+      média geral, total de alunos e o histograma da turma já renderizado);
+    - a lista de alunos, um dicionário por aluno com respostas, acertos e posição na turma. Quais questões o
+      aluno acertou vêm das colunas 'Certa <questão>' gravadas na pontuação (anuladas contam como certas) e o
+      gabarito mostrado é o da versão do aluno ('gabarito' fica None quando é igual ao comum).
+    Só entram alunos com nome e com respostas.
+    """
+    numeros = [c for c in df_resultados.columns if isinstance(c, (int, np.integer))]
+    gabarito = [_resposta(v) for v in df_resultados.iloc[0][numeros]]
+    df = df_resultados.iloc[1:]
+    df = df[df['Aluno/Questões'].notna() & df['Acertos'].notna()]
+    certas = acertos_da_aba(df, numeros, df_resultados.iloc[0])
+    gabaritos = gabaritos_da_aba(df, numeros, df_resultados.iloc[0])
+
+    notas = df['% de Acertos'].to_numpy(dtype=float)
+    # Posição: 1 + quantos tiraram nota maior; superados: quantos tiraram nota menor
+    ordenadas = np.sort(notas)
+    posicoes = len(notas) - np.searchsorted(ordenadas, notas, side='right') + 1
+    superados = np.searchsorted(ordenadas, notas, side='left')
+
+    materias = [m for m in mapeamento_materias if f'Acertos {m}' in df.columns]
+    contexto = {
+        'gabarito': gabarito,
+        'numeros': [int(n) for n in numeros],
+        'materias': [(m, len(mapeamento_materias[m]), float(df[f'% Acertos {m}'].mean())) for m in materias],
+        'media': float(notas.mean()) if len(notas) else 0.0,
+        'total_alunos': len(notas),
+        'histograma': _histograma_turma(notas, notas.mean() if len(notas) else 0.0),
+        'grade': _modelo_grade([int(n) for n in numeros], gabarito),
+        'data': datetime.now().strftime('%d/%m/%Y'),
+    }
+
+    respostas = df[numeros].to_numpy(dtype=object)
+    por_materia = (df[[f'Acertos {m}' for m in materias]].to_numpy(dtype=float),
+                   df[[f'% Acertos {m}' for m in materias]].to_numpy(dtype=float))
+    alunos = [{
+        'nome': nome,
+        'respostas': [_resposta(r) for r in respostas[i]],
+        'certas': certas[i].tolist(),
+        'gabarito': None if gabaritos[i].tolist() == gabarito else [str(c) for c in gabaritos[i]],
+        'acertos': int(acertos),
+        'percentual': float(notas[i]),
+        'materias': list(zip(por_materia[0][i].astype(int).tolist(), por_materia[1][i].tolist())),
+        'posicao': int(posicoes[i]),
+        'superados': int(superados[i]),
+    } for i, (nome, acertos) in enumerate(zip(df['Aluno/Questões'], df['Acertos']))]
+    return contexto, alunos
+
+
+def _modelo_grade(numeros, gabarito):
+    """
+    Pré-calcula a grade de respostas, igual em todos os boletins: a posição de cada célula (relativa ao canto
+    da grade) e dos textos fixos já centralizados (títulos, número da questão e gabarito). Cada boletim só
+    desenha os retângulos e escreve as próprias respostas, sem passar pelo `cell` do fpdf, que é bem mais lento.
+    """
+    medidor = Boletim()
+    total_questoes = len(gabarito)
+    blocos = -(-total_questoes // LINHAS_POR_BLOCO)
+    largura_bloco = (medidor.w - medidor.l_margin - medidor.r_margin) / blocos
+    largura = largura_bloco / 3 - 1
+    altura = 5
+    centro = lambda x, texto: x + (largura - medidor.get_string_width(texto)) / 2
+
+    medidor.set_font('Helvetica', 'B', 8)
+    titulos = [(centro(b * largura_bloco + k * largura, titulo), titulo)
+               for b in range(blocos) for k, titulo in enumerate(('Questão', 'Sua', 'Gabarito'))]
+    medidor.set_font('Helvetica', '', 8)
+    questoes = []
+    for j, (numero, correta) in enumerate(zip(numeros, gabarito)):
+        x = (j // LINHAS_POR_BLOCO) * largura_bloco
+        y = (j % LINHAS_POR_BLOCO + 1) * altura
+        questoes.append((x, y, centro(x, str(numero)), str(numero), centro(x + 2 * largura, correta), correta))
+    letras = {letra: (largura - medidor.get_string_width(letra)) / 2 for letra in ['', *'ABCDEZ']}
+    return {'blocos': blocos, 'largura_bloco': largura_bloco, 'largura': largura, 'altura_linha': altura,
+            'altura': altura * (LINHAS_POR_BLOCO + 1), 'titulos': titulos, 'questoes': questoes, 'letras': letras}
+
+
+def _desenhar_grade(pdf, respostas, certas, grade, gabarito=None):
+    """
+    Desenha a grade de respostas de um aluno a partir do modelo de `_modelo_grade`, a partir da posição atual.
+    `certas` diz quais respostas pintar de verde; `gabarito` substitui o gabarito do modelo (aluno de outra versão).
+    """
+    x0, y0 = pdf.l_margin, pdf.get_y()
+    largura, altura = grade['largura'], grade['altura_linha']
+    base = altura / 2 + 1  # deslocamento da linha de base do texto (fonte 8) dentro da célula
+
+    pdf.set_draw_color(0, 0, 0)
+    pdf.set_line_width(0.2)
+    for b in range(grade['blocos']):
+        for k in range(3):
+            pdf.rect(x0 + b * grade['largura_bloco'] + k * largura, y0, largura, altura)
+    pdf.set_font('Helvetica', 'B', 8)
+    for x, titulo in grade['titulos']:
+        pdf.text(x0 + x, y0 + base, titulo)
+
+    # Células da resposta agrupadas por cor, para trocar a cor de preenchimento só duas vezes
+    for cor, acertou in ((VERDE_CLARO, True), (VERMELHO_CLARO, False)):
+        pdf.set_fill_color(*cor)
+        for (x, y, *_), certo in zip(grade['questoes'], certas):
+            if certo == acertou:
+                pdf.rect(x0 + x + largura, y0 + y, largura, altura, style='DF')
+    pdf.set_font('Helvetica', '', 8)
+    for j, ((x, y, x_numero, numero, x_gabarito, correta), resposta) in enumerate(zip(grade['questoes'], respostas)):
+        pdf.rect(x0 + x, y0 + y, largura, altura)
+        pdf.rect(x0 + x + 2 * largura, y0 + y, largura, altura)
+        pdf.text(x0 + x_numero, y0 + y + base, numero)
+        if resposta:
+            pdf.text(x0 + x + largura + grade['letras'].get(resposta, 0), y0 + y + base, _texto(resposta))
+        if gabarito is not None and gabarito[j] != correta:
+            correta = gabarito[j]
+            x_gabarito = x + 2 * largura + grade['letras'].get(correta, 0)
+        if correta:
+            pdf.text(x0 + x_gabarito, y0 + y + base, _texto(correta))
+    pdf.set_y(y0 + grade['altura'])
+
+
+def montar_boletim(aluno, contexto):
+    """Monta o boletim de um aluno e devolve o PDF (ainda não gravado)."""
+    pdf = Boletim()
+    pdf.set_auto_page_break(True, margin=15)
+    pdf.add_page()
+
+    # --- Identificação e resumo ---
+    pdf.set_font('Helvetica', 'B', 16)
+    pdf.cell(0, 10, _texto(aluno['nome']), new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    pdf.set_font('Helvetica', '', 11)
+    total_questoes = len(contexto['gabarito'])
+    total_alunos = contexto['total_alunos']
+    superou = aluno['superados'] / (total_alunos - 1) * 100 if total_alunos > 1 else 0
+    pdf.cell(0, 7, f"Acertos: {aluno['acertos']} de {total_questoes} ({aluno['percentual']:.1f}%)   |   "
+                   f"Média da turma: {contexto['media']:.1f}%", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    pdf.cell(0, 7, f"Posição: {aluno['posicao']}º de {total_alunos}   |   Nota maior que a de {superou:.0f}% da turma",
+             new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    pdf.set_font('Helvetica', 'I', 9)
+    pdf.cell(0, 6, f"Gerado em: {contexto['data']}", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    pdf.ln(3)
+
+    # --- Acertos por matéria ---
+    pdf.chapter_title('Desempenho por Matéria')
+    larguras = (70, 35, 35, 50)
+    pdf.set_font('Helvetica', 'B', 10)
+    for largura, titulo in zip(larguras, ('Matéria', 'Acertos', '% de Acertos', 'Média da turma (%)')):
+        pdf.cell(largura, 7, titulo, border=1, align='C', fill=False)
+    pdf.ln()
+    pdf.set_font('Helvetica', '', 10)
+    for (materia, total, media), (acertos, percentual) in zip(contexto['materias'], aluno['materias']):
+        pdf.cell(larguras[0], 6, _texto(materia), border=1)
+        pdf.cell(larguras[1], 6, f"{acertos} de {total}", border=1, align='C')
+        pdf.cell(larguras[2], 6, f"{percentual:.1f}%", border=1, align='C')
+        pdf.cell(larguras[3], 6, f"{media:.1f}%", border=1, align='C')
+        pdf.ln()
+    pdf.ln(5)
+
+    # --- Respostas x gabarito ---
+    pdf.chapter_title('Suas Respostas')
+    if pdf.get_y() + contexto['grade']['altura'] > pdf.page_break_trigger:
+        pdf.add_page()
+    _desenhar_grade(pdf, aluno['respostas'], aluno['certas'], contexto['grade'], aluno['gabarito'])
+    pdf.ln(5)
+
+    # --- Posição na turma: histograma comum + linha com a nota do aluno ---
+    largura = LARGURA_HISTOGRAMA
+    altura = largura * PROPORCAO_HISTOGRAMA
+    if pdf.get_y() + altura + 22 > pdf.page_break_trigger:  # título + gráfico + legenda na mesma página
+        pdf.add_page()
+    pdf.chapter_title('Sua Nota na Turma')
+    x, y = (pdf.w - largura) / 2, pdf.get_y()
+    pdf.image(contexto['histograma'], x=x, y=y, w=largura)
+    esquerda, base, largura_eixos, altura_eixos = EIXOS_HISTOGRAMA
+    x_nota = x + largura * (esquerda + largura_eixos * min(max(aluno['percentual'], 0), 100) / 100)
+    topo, fundo = y + altura * (1 - base - altura_eixos), y + altura * (1 - base)
+    pdf.set_draw_color(200, 0, 0)
+    pdf.set_line_width(0.7)
+    pdf.line(x_nota, topo, x_nota, fundo)
+    pdf.set_text_color(200, 0, 0)
+    pdf.set_font('Helvetica', 'B', 8)
+    pdf.text(x_nota + 1, topo + 3, 'Você')
+    pdf.set_text_color(0, 0, 0)
+    pdf.set_y(y + altura + 2)
+    pdf.set_font('Helvetica', 'I', 8)
+    pdf.cell(0, 5, 'Linha vermelha: sua nota. Linha tracejada: média da turma.', align='C')
+    return pdf
+
+
+# --- Geração em lote ---
+
+_contexto = None
+
+def _inicializar_worker_boletins(contexto):
+    global _contexto
+    _contexto = contexto
+
+def _gerar_lote(lote):
+    """Monta os boletins de um lote de (nome do arquivo, aluno) e devolve [(nome do arquivo, bytes do PDF)]."""
+    return [(arquivo, bytes(montar_boletim(aluno, _contexto).output())) for arquivo, aluno in lote]
+
+
+def nome_arquivo_boletim(nome, usados):
+    """Nome de arquivo a partir do nome do aluno, sem caracteres problemáticos e sem repetir os já `usados`."""
+    base = re.sub(r'[^\w\-]+', '_', str(nome)).strip('_') or 'aluno'
+    arquivo, n = f"{base}.pdf", 2
+    while arquivo.lower() in usados:
+        arquivo, n = f"{base}_{n}.pdf", n + 1
+    usados.add(arquivo.lower())
+    return arquivo
+
+
+def gerar_boletins(df_resultados, mapeamento_materias, destino=PASTA_BOLETINS, workers=WORKERS_BOLETINS,
+                   por_lote=BOLETINS_POR_LOTE):
+    """
+    Gera um boletim por aluno a partir da aba de resultados (ver `processar_provas`).
+    `destino` é uma pasta ou, se terminar em '.zip', um arquivo zip com todos os PDFs.
+    Os boletins são montados em `workers` processos (0 = todos os núcleos, 1 = sequencial), em lotes de
+    `por_lote` alunos. Devolve o número de boletins gerados.
+    """
+    contexto, alunos = preparar_turma(df_resultados, mapeamento_materias)
+    if not alunos:
+        print("⚠️ Nenhum aluno com nome e respostas encontrado. Nenhum boletim gerado.")
+        return 0
+    print(f"📄 Gerando {len(alunos)} boletins em '{destino}'...")
+
+    usados = set()
+    itens = [(nome_arquivo_boletim(aluno['nome'], usados), aluno) for aluno in alunos]
+    lotes = [itens[i:i + por_lote] for i in range(0, len(itens), por_lote)]
+    workers = min(workers or os.cpu_count() or 1, len(lotes))
+
+    em_zip = destino.lower().endswith('.zip')
+    pasta = os.path.dirname(destino) if em_zip else destino
+    if pasta:
+        os.makedirs(pasta, exist_ok=True)
+    # Os PDFs já saem comprimidos; no zip eles só são armazenados
+    arquivo_zip = zipfile.ZipFile(destino, 'w', compression=zipfile.ZIP_STORED) if em_zip else None
+
+    def gravar(resultado_lote):
+        for arquivo, conteudo in resultado_lote:
+            if arquivo_zip is not None:
+                arquivo_zip.writestr(arquivo, conteudo)
+            else:
+                with open(os.path.join(destino, arquivo), 'wb') as f:
+                    f.write(conteudo)
+
+    try:
+        if workers <= 1:
+            _inicializar_worker_boletins(contexto)
+            for lote in lotes:
+                gravar(_gerar_lote(lote))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_inicializar_worker_boletins,
+                                     initargs=(contexto,)) as pool:
+                for resultado_lote in pool.map(_gerar_lote, lotes):
+                    gravar(resultado_lote)
+    finally:
+        if arquivo_zip is not None:
+            arquivo_zip.close()
+
+    print(f"✅ {len(alunos)} boletins gerados em '{destino}'.")
+    return len(alunos)
+
+
+if __name__ == "__main__":
+    from analise_resultados import ler_mapeamento_materias
+
+    parser = argparse.ArgumentParser(description="Gera um boletim em PDF para cada aluno")
+    parser.add_argument("--destino", default=PASTA_BOLETINS, help="pasta de saída ou arquivo .zip")
+    parser.add_argument("--workers", type=int, default=WORKERS_BOLETINS, help="processos (0 = todos os núcleos)")
+    args = parser.parse_args()
+
+    try:
+        df_resultados = ler_planilha(ARQUIVO_EXCEL, NOME_DA_PLANILHA_RESULTADOS, header=4)
+    except FileNotFoundError as e:
+        print(f"❌ ERRO: Arquivo não encontrado: {e.filename}. Rode o 'processar_provas.py' primeiro.")
+        exit()
+    except PermissionError:
+        print(f"❌ ERRO: O arquivo '{ARQUIVO_EXCEL}' está aberto em outro programa. Feche-o e tente novamente.")
+        exit()
+
+    mapeamento_materias = ler_mapeamento_materias(ARQUIVO_EXCEL, NOME_DA_PLANILHA_MATERIAS)
+    if mapeamento_materias:
+        gerar_boletins(df_resultados, mapeamento_materias, args.destino, args.workers)
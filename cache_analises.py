@@ -0,0 +1,59 @@
+import os
+import json
+import hashlib
+import inspect
+import pandas as pd
+
+# --- Regeneração incremental das análises ---
+# Cada análise declara de que depende: as colunas do DataFrame que ela lê, o mapeamento de matérias
+# e o próprio código. O hash dessas entradas fica num manifesto dentro da pasta de análises; na
+# próxima execução, a análise só roda de novo se o hash mudou ou se algum arquivo gerado sumiu.
+
+NOME_MANIFESTO = '.manifesto_analises.json'
+
+
+def hash_entradas(df, colunas=None, mapeamento=None, funcao=None, parametros=None):
+    """
+    Hash das entradas de uma análise: as `colunas` de `df` (None = todas), o `mapeamento`,
+    o código de `funcao` e outros `parametros` serializáveis. Colunas ausentes entram como ausentes.
+    """
+    h = hashlib.sha256()
+    if df is not None:
+        presentes = list(df.columns) if colunas is None else [c for c in colunas if c in df.columns]
+        h.update(json.dumps([str(c) for c in presentes]).encode('utf-8'))
+        if presentes:
+            subconjunto = df[presentes].astype(str)  # tipos mistos (ex.: 'A' e NaN) viram texto estável
+            h.update(pd.util.hash_pandas_object(subconjunto, index=False).to_numpy().tobytes())
+        h.update(str(len(df)).encode('utf-8'))
+    h.update(json.dumps(mapeamento, sort_keys=True, default=str).encode('utf-8'))
+    h.update(json.dumps(parametros, sort_keys=True, default=str).encode('utf-8'))
+    if funcao is not None:
+        h.update(inspect.getsource(funcao).encode('utf-8'))
+    return h.hexdigest()
+
+
+def carregar_manifesto(pasta):
+    """Lê o manifesto da pasta de análises ({nome: {'hash', 'saidas'}}); ausente ou corrompido = vazio."""
+    caminho = os.path.join(pasta, NOME_MANIFESTO)
+    if os.path.exists(caminho):
+        try:
+            with open(caminho, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Manifesto '{caminho}' ignorado: {e}")
+    return {}
+
+
+def salvar_manifesto(pasta, manifesto):
+    caminho = os.path.join(pasta, NOME_MANIFESTO)
+    temporario = caminho + '.tmp'
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(manifesto, f, indent=2, ensure_ascii=False)
+    os.replace(temporario, caminho)
+
+
+def esta_atualizada(manifesto, nome, hash_atual, pasta, saidas):
+    """Indica se a análise `nome` já foi gerada com estas entradas e todos os seus arquivos ainda existem."""
+    registro = manifesto.get(nome)
+    return (registro is not None and registro["hash"] == hash_atual
+            and all(os.path.exists(os.path.join(pasta, s)) for s in saidas))
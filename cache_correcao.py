@@ -0,0 +1,55 @@
+import os
+import json
+import hashlib
+from config import PASTA_CACHE_CORRECAO
+
+# --- Cache de correção endereçado por conteúdo ---
+# Cada arquivo do cache guarda o preenchimento das bolinhas medido nas páginas de um PDF para um
+# conjunto de parâmetros de correção: '<hash do PDF>_<hash dos parâmetros>.json'. Se o PDF mudar ou
+# algum parâmetro (DPI, coordenadas, thresholds no código etc.) mudar, o nome do arquivo muda e as
+# páginas são corrigidas de novo automaticamente. As regras que transformam os preenchimentos em
+# respostas não fazem parte da chave: mudá-las não obriga a corrigir as imagens de novo.
+
+def hash_arquivo(caminho, tamanho_bloco=1 << 20):
+    """Calcula o SHA-256 do conteúdo do arquivo."""
+    h = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(tamanho_bloco), b''):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def hash_parametros(parametros):
+    """Calcula um hash estável para um dicionário de parâmetros (serializado em JSON ordenado)."""
+    texto = json.dumps(parametros, sort_keys=True, default=str)
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()[:16]
+
+
+def _caminho_cache(hash_pdf, hash_params, pasta=PASTA_CACHE_CORRECAO):
+    return os.path.join(pasta, f"{hash_pdf[:32]}_{hash_params}.json")
+
+
+def carregar_cache(hash_pdf, hash_params, pasta=PASTA_CACHE_CORRECAO):
+    """
+    Lê o cache de um PDF. Devolve {'total_paginas': int ou None, 'paginas': {numero (str): preenchimentos}},
+    com os preenchimentos (60 × 5) de cada página em listas.
+    Um arquivo ausente ou corrompido é tratado como cache vazio.
+    """
+    caminho = _caminho_cache(hash_pdf, hash_params, pasta)
+    if os.path.exists(caminho):
+        try:
+            with open(caminho, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Cache '{caminho}' ignorado: {e}")
+    return {"total_paginas": None, "paginas": {}}
+
+
+def salvar_cache(hash_pdf, hash_params, dados, pasta=PASTA_CACHE_CORRECAO):
+    """Grava o cache de um PDF de forma atômica (arquivo temporário + rename)."""
+    os.makedirs(pasta, exist_ok=True)
+    caminho = _caminho_cache(hash_pdf, hash_params, pasta)
+    temporario = caminho + '.tmp'
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(dados, f)
+    os.replace(temporario, caminho)
@@ -0,0 +1,77 @@
+import os
+import pickle
+import hashlib
+import pandas as pd
+from config import PASTA_CACHE_PLANILHAS
+from cache_correcao import hash_arquivo
+
+# --- Cache de planilhas já interpretadas ---
+# Ler um .xlsx é a parte mais lenta da entrada de dados, e as mesmas abas são lidas por vários
+# scripts. Cada aba lida com `ler_planilha` é guardada em pickle, junto com o mtime, o tamanho e o
+# SHA-256 do arquivo de origem. Se o mtime e o tamanho não mudaram, o pickle é usado direto; se
+# mudaram, o hash decide (um arquivo salvo sem alterações continua válido). Qualquer mudança no
+# conteúdo faz a aba ser lida de novo. Uma aba que não existe (ValueError do read_excel) também fica
+# guardada, para que abas opcionais ausentes não obriguem a abrir a planilha a cada execução.
+
+def _caminho_cache(caminho, aba, header, pasta):
+    chave = f"{os.path.abspath(caminho)}|{aba}|{header}"
+    nome = os.path.splitext(os.path.basename(caminho))[0]
+    return os.path.join(pasta, f"{nome}_{hashlib.sha256(chave.encode('utf-8')).hexdigest()[:16]}.pkl")
+
+
+def _carregar(caminho_cache):
+    try:
+        with open(caminho_cache, 'rb') as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError) as e:
+        print(f"⚠️ Cache '{caminho_cache}' ignorado: {e}")
+        return None
+
+
+def _salvar(caminho_cache, dados):
+    try:
+        os.makedirs(os.path.dirname(caminho_cache), exist_ok=True)
+        temporario = caminho_cache + '.tmp'
+        with open(temporario, 'wb') as f:
+            pickle.dump(dados, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporario, caminho_cache)
+    except OSError as e:
+        print(f"⚠️ Não foi possível gravar o cache '{caminho_cache}': {e}")
+
+
+def _resultado(dados):
+    """Devolve uma cópia da aba guardada ou levanta de novo o ValueError guardado (aba inexistente)."""
+    if dados.get("erro") is not None:
+        raise ValueError(dados["erro"])
+    return dados["df"].copy()
+
+
+def ler_planilha(caminho, aba, header=0, pasta=PASTA_CACHE_PLANILHAS):
+    """
+    Equivale a `pd.read_excel(caminho, sheet_name=aba, header=header)`, mas reaproveita a aba já
+    interpretada enquanto o arquivo não mudar. Devolve uma cópia, que pode ser alterada à vontade.
+    Levanta ValueError, como o read_excel, se a aba não existir.
+    """
+    estado = os.stat(caminho)  # FileNotFoundError/PermissionError como no read_excel
+    caminho_cache = _caminho_cache(caminho, aba, header, pasta)
+    dados = _carregar(caminho_cache) if os.path.exists(caminho_cache) else None
+
+    if dados is not None:
+        if (dados["mtime_ns"], dados["tamanho"]) == (estado.st_mtime_ns, estado.st_size):
+            return _resultado(dados)
+        hash_atual = hash_arquivo(caminho)
+        if dados["hash"] == hash_atual:
+            # Arquivo regravado sem mudanças: só atualiza o mtime guardado
+            dados["mtime_ns"], dados["tamanho"] = estado.st_mtime_ns, estado.st_size
+            _salvar(caminho_cache, dados)
+            return _resultado(dados)
+    else:
+        hash_atual = hash_arquivo(caminho)
+
+    dados = {"mtime_ns": estado.st_mtime_ns, "tamanho": estado.st_size, "hash": hash_atual, "df": None, "erro": None}
+    try:
+        dados["df"] = pd.read_excel(caminho, sheet_name=aba, header=header)
+    except ValueError as e:
+        dados["erro"] = str(e)
+    _salvar(caminho_cache, dados)
+    return _resultado(dados)
@@ -0,0 +1,137 @@
+import os
+import json
+import time
+import argparse
+import threading
+import urllib.error
+import urllib.request
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from config import DPI_RASTERIZACAO, HOST_SERVICO, PORTA_SERVICO
+from folhas_sinteticas import gerar_lote, salvar_lote
+from benchmark_omr import PASTA_BENCHMARKS
+
+# --- Teste de carga do serviço de correção ---
+# Simula vários coordenadores enviando provas ao mesmo tempo para o servico_correcao.py (que precisa estar
+# rodando). Gera um gabarito e um PDF de alunos sintéticos, envia o gabarito e depois `envios` cópias do PDF
+# de `concorrencia` clientes em paralelo; cada cópia recebe um byte diferente no fim para não sair do cache.
+# Um envio recusado por fila cheia (503) espera o Retry-After e tenta de novo. Mede páginas/s, a latência de
+# cada envio (do POST ao resultado) e confere as respostas com as verdadeiras.
+
+
+def _requisitar(url, metodo="GET", corpo=None, timeout=300):
+    """Devolve (status, JSON da resposta, cabeçalhos); erros HTTP também são devolvidos, não levantados."""
+    requisicao = urllib.request.Request(url, data=corpo, method=metodo,
+                                        headers={"Content-Type": "application/pdf"} if corpo else {})
+    try:
+        with urllib.request.urlopen(requisicao, timeout=timeout) as resposta:
+            return resposta.status, json.load(resposta), resposta.headers
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e), e.headers
+
+
+def _esperado(respostas_reais):
+    """Resposta que o corretor deve dar: marcação dupla vira 'Z'."""
+    return [r if len(r) <= 1 else "Z" for r in respostas_reais]
+
+
+def executar_carga(url, envios=20, concorrencia=4, paginas_por_envio=10, dpi=DPI_RASTERIZACAO, semente=0):
+    """Roda o teste de carga contra o serviço em `url` e devolve um dicionário com os resultados."""
+    print(f"🧪 Gerando {paginas_por_envio} folhas sintéticas a {dpi} dpi...")
+    folhas, respostas_reais = gerar_lote(paginas_por_envio, semente=semente, dpi=dpi, ruido=0.05, inclinacao=1.0,
+                                         deslocamento=30, prob_branco=0.02, prob_dupla=0.02)
+    caminho_gabarito, _ = salvar_lote(folhas[:1], respostas_reais[:1], nome="carga_gabarito", dpi=dpi)
+    caminho_alunos, _ = salvar_lote(folhas[1:], respostas_reais[1:], nome="carga_alunos", dpi=dpi)
+    esperadas = [_esperado(r) for r in respostas_reais[1:]]
+
+    with open(caminho_gabarito, 'rb') as f:
+        status, resposta, _ = _requisitar(f"{url}/gabarito", "POST", f.read())
+    if status != 200:
+        raise SystemExit(f"❌ Gabarito recusado ({status}): {resposta.get('erro')}")
+    with open(caminho_alunos, 'rb') as f:
+        pdf_alunos = f.read()
+
+    recusas = 0
+    trava = threading.Lock()
+
+    def enviar(i):
+        nonlocal recusas
+        corpo = pdf_alunos + f"\n% envio {i} {time.time_ns()}\n".encode()  # outro hash: não sai do cache
+        inicio = time.perf_counter()
+        while True:
+            status, resposta, cabecalhos = _requisitar(f"{url}/provas?nome=envio{i}", "POST", corpo)
+            if status != 503:
+                break
+            with trava:
+                recusas += 1
+            time.sleep(float(cabecalhos.get("Retry-After", 1)))
+        if status != 202:
+            return None, f"envio {i}: {status} {resposta.get('erro')}"
+        while resposta.get("estado") not in ("pronto", "erro"):
+            _, resposta, _ = _requisitar(f"{url}/provas/{resposta['id']}?esperar=30")
+        latencia = time.perf_counter() - inicio
+        if resposta["estado"] == "erro":
+            return latencia, f"envio {i}: {resposta.get('erro')}"
+        respostas = [r["respostas"] for r in resposta["resultados"]]
+        erradas = int((np.array(respostas) != np.array(esperadas)).sum())
+        return latencia, f"envio {i}: {erradas} respostas diferentes das verdadeiras" if erradas else None
+
+    print(f"📤 Enviando {envios} PDFs de {paginas_por_envio} páginas com {concorrencia} clientes em paralelo...")
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        saidas = list(executor.map(enviar, range(envios)))
+    duracao = time.perf_counter() - inicio
+
+    latencias = np.array([latencia for latencia, _ in saidas if latencia is not None])
+    problemas = [problema for _, problema in saidas if problema]
+    percentis = np.percentile(latencias, [50, 90, 99]) if len(latencias) else [np.nan] * 3
+    return {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "envios": envios,
+        "concorrencia": concorrencia,
+        "paginas_por_envio": paginas_por_envio,
+        "dpi": dpi,
+        "segundos": round(duracao, 2),
+        "paginas_por_segundo": round(len(latencias) * paginas_por_envio / duracao, 2),
+        "latencia_s": {"p50": round(float(percentis[0]), 2), "p90": round(float(percentis[1]), 2),
+                       "p99": round(float(percentis[2]), 2),
+                       "max": round(float(latencias.max()), 2) if len(latencias) else None},
+        "recusas_fila_cheia": recusas,
+        "problemas": problemas,
+        "estado_servico": _requisitar(f"{url}/estado")[1],
+    }
+
+
+def imprimir_resultado(resultado):
+    latencia = resultado["latencia_s"]
+    print(f"\n📊 {resultado['envios']} envios × {resultado['paginas_por_envio']} páginas em {resultado['segundos']} s "
+          f"({resultado['paginas_por_segundo']} páginas/s, {resultado['concorrencia']} clientes)")
+    print(f"   Latência por envio: p50 {latencia['p50']} s | p90 {latencia['p90']} s | p99 {latencia['p99']} s | "
+          f"máx {latencia['max']} s")
+    print(f"   Recusas por fila cheia (503): {resultado['recusas_fila_cheia']}")
+    for problema in resultado["problemas"]:
+        print(f"⚠️ {problema}")
+    if not resultado["problemas"]:
+        print("✅ Todas as respostas conferem com as folhas sintéticas.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Teste de carga do servico_correcao.py com folhas sintéticas")
+    parser.add_argument("--url", default=f"http://{HOST_SERVICO}:{PORTA_SERVICO}")
+    parser.add_argument("--envios", type=int, default=20, help="quantos PDFs enviar")
+    parser.add_argument("--concorrencia", type=int, default=4, help="clientes enviando ao mesmo tempo")
+    parser.add_argument("--paginas", type=int, default=10, help="páginas (alunos) por PDF")
+    parser.add_argument("--dpi", type=int, default=DPI_RASTERIZACAO)
+    args = parser.parse_args()
+
+    resultado = executar_carga(args.url.rstrip("/"), args.envios, args.concorrencia, args.paginas, args.dpi)
+    imprimir_resultado(resultado)
+
+    os.makedirs(PASTA_BENCHMARKS, exist_ok=True)
+    caminho = os.path.join(PASTA_BENCHMARKS, f"carga_servico_{datetime.now():%Y%m%d_%H%M%S}.json")
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(resultado, f, indent=2, ensure_ascii=False)
+    print(f"\n✅ Resultado salvo em '{caminho}'.")
+    if resultado["problemas"]:
+        raise SystemExit(1)
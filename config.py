@@ -2,15 +2,97 @@
 ARQUIVO_EXCEL = 'utils/planilha_final.xlsx'
 NOME_DA_PLANILHA_RESULTADOS = 'Resultados'
 NOME_DA_PLANILHA_MATERIAS = 'Materias'
+# Aba opcional com os gabaritos de cada versão da prova (tipos A/B/C...), pesos e questões anuladas (ver gabaritos.py)
+NOME_DA_PLANILHA_GABARITOS = 'Gabaritos'
+# Escreve a aba de resultados em bloco, com verde/vermelho por formatação condicional (bem mais rápido)
+ESCRITA_RAPIDA_EXCEL = True
 
 # Planilha de Socioeconômicos, abas e colunas
 ARQUIVO_SOCIOECONOMICO = 'utils/socioeconomica.xlsx'
 NOME_DA_PLANILHA_SOCIO = 'Socio'
 COLUNA_NOME_SOCIO = 'Nome Completo' 
+COLUNA_TIPO_PROVA_SOCIO = 'Tipo de Prova'  # versão da prova de cada aluno, quando há mais de uma
+# Nomes escritos de forma diferente nas duas planilhas são pareados por similaridade (0 a 1) a partir deste valor
+LIMIAR_CORRESPONDENCIA_NOMES = 0.85
+ARQUIVO_CORRESPONDENCIA_NOMES = 'correspondencia_nomes.csv'  # salvo na pasta de análises
 
 # Pasta geração de análises
 PASTA_ANALISES = 'analises'
+# Gráficos no Relatorio_Final.pdf: 'svg' (vetor), 'png' (paleta de 256 cores) ou 'jpeg', nos DPI abaixo
+FORMATO_GRAFICOS_RELATORIO = 'png'
+DPI_GRAFICOS_RELATORIO = 150
+QUALIDADE_JPEG_RELATORIO = 85
+# Processos usados para gerar os gráficos das análises (0 = todos os núcleos, 1 = sequencial)
+WORKERS_GRAFICOS = 0
+
+# Boletins individuais (um PDF por aluno): pasta de saída, processos (0 = todos os núcleos) e boletins por tarefa
+PASTA_BOLETINS = 'boletins'
+WORKERS_BOLETINS = 0
+BOLETINS_POR_LOTE = 50
+
+# Cache das abas já lidas das planilhas (invalidado quando o arquivo muda)
+PASTA_CACHE_PLANILHAS = 'cache_planilhas'
 
 # Arquivo de Respostas vindo da visão computacional
 ARQUIVO_RESPOSTAS = 'utils/respostas.csv'
+# Mesmas respostas numa matriz binária (uint8), mais rápida de ler; o CSV fica como exportação
+ARQUIVO_MATRIZ_RESPOSTAS = 'utils/respostas.npz'
+
+
 
+# Correção (visão computacional)
+# Pasta dos executáveis do poppler (pdfinfo, pdftoppm). None usa os do PATH do sistema; a variável de ambiente
+# POPPLER_PATH, se existir, tem prioridade. No Windows, ex.: r"C:\poppler\Library\bin"
+POPPLER_PATH = None
+# Quando True, grava as páginas em 'imagens_gabaritos' e os recortes das questões em 'temp'/'debug_temp' para depuração
+SALVAR_RECORTES_DEBUG = False
+# Número de processos usados para corrigir as páginas dos alunos (0 = todos os núcleos, 1 = sequencial)
+WORKERS_CORRECAO = 0
+# Rasterização dos PDFs em blocos: páginas renderizadas por vez e processos do poppler por bloco (0 = todos os núcleos)
+PAGINAS_POR_BLOCO_RASTER = 8
+THREADS_RASTERIZACAO = 0
+# Modo template: as posições das bolinhas são detectadas uma vez no gabarito e reutilizadas em todas as folhas
+USAR_TEMPLATE_BOLINHAS = False
+ARQUIVO_LAYOUT_BOLINHAS = 'utils/layout_bolinhas.json'
+# Resolução usada para rasterizar os PDFs (em tons de cinza). Use `python corretor.py --relatorio-dpi <pdf>`
+# para encontrar o menor DPI que mantém a precisão
+DPI_RASTERIZACAO = 150
+# Coordenadas (x1, y1, x2, y2) do bloco de questões medidas no gabarito rasterizado a DPI_REFERENCIA.
+# Na correção elas são convertidas em frações da página, então valem para qualquer DPI
+DPI_REFERENCIA = 150
+BLOCO_QUESTOES = (270, 1430, 3480, 4580)
+ARQUIVO_RELATORIO_DPI = 'utils/relatorio_dpi.csv'
+# Registro: alinha cada folha à grade de bolinhas do gabarito antes de recortar o bloco
+REGISTRAR_PAGINAS = True
+LARGURA_REGISTRO = 1000  # largura (px) da cópia reduzida usada para localizar a grade
+MIN_BOLINHAS_REGISTRO = 250  # abaixo disso, usa o recorte fixo
+# Cache de correção: reaproveita as respostas de páginas já corrigidas (mesmo PDF e mesmos parâmetros)
+USAR_CACHE_CORRECAO = True
+PASTA_CACHE_CORRECAO = 'cache_correcao'
+# Regras que transformam o preenchimento das bolinhas (0 a 1) em resposta (None desliga a regra). Com
+# `python recorrecao.py` elas podem ser mudadas e reaplicadas sem corrigir as imagens de novo
+LIMIAR_BRANCO = 0.45  # a bolinha mais preenchida abaixo disto: questão em branco
+LIMIAR_DUPLA = 0.45   # a segunda bolinha a partir disto: marcação dupla (Z)
+MARGEM_MINIMA = 0.2   # diferença entre as duas mais preenchidas abaixo disto: questão listada para revisão
+ARQUIVO_PREENCHIMENTOS = 'utils/preenchimentos.npz'
+ARQUIVO_QUESTOES_AMBIGUAS = 'utils/questoes_ambiguas.csv'
+# Correção contínua (`python vigiar_pasta.py`): intervalo (s) entre as verificações da pasta e tempo (s) que um PDF
+# precisa ficar sem mudar de tamanho para ser considerado completo
+INTERVALO_VIGIA = 1.0
+TEMPO_ESTAVEL_VIGIA = 2.0
+# Serviço local de correção (`python servico_correcao.py`): endereço, pasta dos PDFs recebidos, processos
+# (0 = todos os núcleos), páginas por tarefa enviada a um processo, limite de páginas aguardando correção (acima
+# dele, novos envios recebem 503 e devem tentar de novo), tamanho máximo de um envio e quantos envios concluídos
+# (e por quantos segundos) o serviço guarda para consulta
+HOST_SERVICO = '127.0.0.1'
+PORTA_SERVICO = 8765
+PASTA_SERVICO = 'servico_uploads'
+WORKERS_SERVICO = 0
+PAGINAS_POR_LOTE_SERVICO = 8
+MAX_PAGINAS_FILA_SERVICO = 2000
+MAX_MB_ENVIO_SERVICO = 200
+MAX_ENVIOS_GUARDADOS_SERVICO = 500
+TEMPO_GUARDA_ENVIOS_SERVICO = 3600
+# Instrumentação: tempo por etapa e por página e contadores de anomalias (também com `--instrumentar`)
+INSTRUMENTAR_CORRECAO = False
+ARQUIVO_TRACE_CORRECAO = 'utils/trace_correcao.jsonl'
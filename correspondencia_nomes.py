@@ -0,0 +1,160 @@
+import re
+import unicodedata
+from difflib import SequenceMatcher
+from collections import defaultdict, Counter
+import pandas as pd
+from config import LIMIAR_CORRESPONDENCIA_NOMES
+
+# --- Correspondência de nomes entre planilhas ---
+# Os nomes da aba de resultados e da planilha socioeconômica nem sempre são escritos igual: acentos,
+# maiúsculas, espaços a mais e erros de digitação. Cada nome é normalizado (sem acentos, minúsculo, sem
+# pontuação, espaços simples) e a correspondência é feita em duas etapas:
+# 1. exata sobre o nome normalizado, por consulta a um dicionário;
+# 2. aproximada, só para quem sobrou: os candidatos vêm de um índice de blocos (palavras do nome e seus
+#    4 primeiros caracteres e pares de palavras vizinhas), e não da comparação com todos os nomes. Só os poucos candidatos que mais
+#    compartilham blocos recebem uma nota de similaridade (0 a 1), então o custo cresce de forma
+#    aproximadamente linear com a turma.
+# Cada nome é usado no máximo uma vez dos dois lados; os que ficam sem par vão para o relatório.
+
+PARTICULAS = {"de", "da", "do", "das", "dos", "e"}
+# Blocos muito comuns (ex.: 'silva') quase não separam candidatos; acima deste tamanho são ignorados,
+# a não ser que sejam os únicos blocos do nome
+MAX_TAMANHO_BLOCO = 200
+# Só os candidatos que mais compartilham blocos com o nome são comparados por similaridade
+MAX_CANDIDATOS = 20
+METODO_EXATO, METODO_NORMALIZADO, METODO_APROXIMADO = "exato", "normalizado", "aproximado"
+
+
+def normalizar_nome(nome):
+    """'  José  da SILVA-Souza ' → 'jose da silva souza'. Valores vazios viram ''."""
+    if nome is None or (not isinstance(nome, str) and pd.isna(nome)):
+        return ""
+    texto = unicodedata.normalize("NFKD", str(nome))
+    texto = "".join(c for c in texto if not unicodedata.combining(c)).lower()
+    return " ".join(re.sub(r"[^\w\s]|_", " ", texto).split())
+
+
+def _blocos(normalizado):
+    """Chaves de bloco de um nome: cada palavra, seus 4 primeiros caracteres e cada par de palavras vizinhas."""
+    palavras = [p for p in normalizado.split() if p not in PARTICULAS]
+    return (set(palavras) | {"~" + p[:4] for p in palavras if len(p) > 4}
+            | {a + "|" + b for a, b in zip(palavras, palavras[1:])})
+
+
+def similaridade(a, b):
+    """
+    Similaridade entre dois nomes já normalizados (0 a 1): a maior entre a comparação direta e a comparação
+    com as palavras em ordem alfabética (nomes invertidos, como 'Silva Ana').
+    """
+    direta = SequenceMatcher(None, a, b, autojunk=False).ratio()
+    ordenados = SequenceMatcher(None, " ".join(sorted(a.split())), " ".join(sorted(b.split())), autojunk=False).ratio()
+    return max(direta, ordenados)
+
+
+class IndiceNomes:
+    """Índice dos nomes de referência: nome normalizado → posições e bloco → posições."""
+
+    def __init__(self, nomes):
+        self.nomes = list(nomes)
+        self.normalizados = [normalizar_nome(n) for n in self.nomes]
+        self.exatos = defaultdict(list)
+        self.blocos = defaultdict(list)
+        for i, normalizado in enumerate(self.normalizados):
+            if not normalizado:
+                continue
+            self.exatos[normalizado].append(i)
+            for bloco in _blocos(normalizado):
+                self.blocos[bloco].append(i)
+
+    def candidatos(self, normalizado, ignorar=(), limite=MAX_CANDIDATOS):
+        """
+        Posições (fora de `ignorar`) dos até `limite` nomes que mais compartilham blocos com `normalizado`.
+        Cada bloco em comum vale 1/tamanho do bloco: dividir uma palavra rara pesa mais que um sobrenome comum.
+        """
+        listas = [self.blocos[b] for b in _blocos(normalizado) if b in self.blocos]
+        pequenas = [lista for lista in listas if len(lista) <= MAX_TAMANHO_BLOCO]
+        if not pequenas and listas:
+            pequenas = [min(listas, key=len)]
+        pontos = Counter()
+        for lista in pequenas:
+            peso = 1 / len(lista)
+            for j in lista:
+                if j not in ignorar:
+                    pontos[j] += peso
+        return [j for j, _ in pontos.most_common(limite)]
+
+
+def parear_nomes(nomes, nomes_referencia, limiar=LIMIAR_CORRESPONDENCIA_NOMES):
+    """
+    Encontra, para cada nome de `nomes`, o nome correspondente em `nomes_referencia`.
+    Devolve um DataFrame com uma linha por nome de qualquer um dos lados: 'Nome', 'Nome Referência',
+    'Método' ('exato', 'normalizado', 'aproximado' ou vazio quando não há par) e 'Confiança' (0 a 1).
+    Os pares aproximados só são aceitos com confiança a partir de `limiar`.
+    """
+    nomes = list(nomes)
+    indice = IndiceNomes(nomes_referencia)
+    usados = set()
+    pares = {}  # posição em `nomes` → (posição na referência, método, confiança)
+
+    # 1. Nome normalizado idêntico (o nome escrito igual tem prioridade entre homônimos normalizados)
+    normalizados = [normalizar_nome(n) for n in nomes]
+    for i, normalizado in enumerate(normalizados):
+        livres = [j for j in indice.exatos.get(normalizado, []) if j not in usados]
+        if livres:
+            j = next((j for j in livres if indice.nomes[j] == nomes[i]), livres[0])
+            usados.add(j)
+            pares[i] = (j, METODO_EXATO if indice.nomes[j] == nomes[i] else METODO_NORMALIZADO, 1.0)
+
+    # 2. Aproximado, só entre os que sobraram: os pares mais parecidos são aceitos primeiro
+    possiveis = []
+    for i, normalizado in enumerate(normalizados):
+        if i in pares or not normalizado:
+            continue
+        for j in indice.candidatos(normalizado, usados):
+            nota = similaridade(normalizado, indice.normalizados[j])
+            if nota >= limiar:
+                possiveis.append((nota, i, j))
+    for nota, i, j in sorted(possiveis, key=lambda p: (-p[0], p[1], p[2])):
+        if i not in pares and j not in usados:
+            usados.add(j)
+            pares[i] = (j, METODO_APROXIMADO, round(nota, 3))
+
+    linhas = []
+    for i, nome in enumerate(nomes):
+        j, metodo, confianca = pares.get(i, (None, "", 0.0))
+        linhas.append((nome, indice.nomes[j] if j is not None else None, metodo, confianca))
+    linhas += [(None, nome, "", 0.0) for j, nome in enumerate(indice.nomes) if j not in usados]
+    return pd.DataFrame(linhas, columns=["Nome", "Nome Referência", "Método", "Confiança"])
+
+
+def resumir_pareamento(pareamento, origem="resultados", referencia="socioeconômica"):
+    """Imprime quantos nomes foram pareados por método e lista os que ficaram sem par."""
+    pareados = pareamento[pareamento["Método"] != ""]
+    contagem = pareados["Método"].value_counts()
+    print(f"🔗 {len(pareados)} alunos pareados entre as planilhas "
+          f"({', '.join(f'{n} {m}' for m, n in contagem.items()) or 'nenhum'}).")
+    aproximados = pareados[pareados["Método"] == METODO_APROXIMADO]
+    for _, linha in aproximados.sort_values("Confiança").iterrows():
+        print(f"   ≈ '{linha['Nome']}' → '{linha['Nome Referência']}' (confiança {linha['Confiança']:.2f})")
+    for coluna, outra, nome_lado in (("Nome", "Nome Referência", origem), ("Nome Referência", "Nome", referencia)):
+        sem_par = pareamento.loc[pareamento[outra].isna() & pareamento[coluna].notna(), coluna]
+        if len(sem_par):
+            print(f"⚠️ {len(sem_par)} nomes da planilha {nome_lado} sem correspondência: "
+                  f"{', '.join(map(str, sem_par.head(10)))}{' ...' if len(sem_par) > 10 else ''}")
+
+
+def remover_duplicados(nomes):
+    """
+    Remove nomes repetidos considerando a forma normalizada ('Ana  Silva' e 'ana silva' são o mesmo nome),
+    mantendo a primeira grafia. Devolve (nomes únicos, lista de (nome descartado, nome mantido)).
+    """
+    mantidos, descartados, vistos = [], [], {}
+    for nome in nomes:
+        chave = normalizar_nome(nome)
+        if chave in vistos:
+            if nome != vistos[chave]:
+                descartados.append((nome, vistos[chave]))
+            continue
+        vistos[chave] = nome
+        mantidos.append(nome)
+    return mantidos, descartados
@@ -1,17 +1,39 @@
 import cv2
 import numpy as np
 import os
-from pdf2image import convert_from_path
+from pdf2image import convert_from_path, pdfinfo_from_path
 import shutil
 import csv
+import json
+import time
+import argparse
+import inspect
+from collections import deque
+from contextlib import nullcontext
+from itertools import groupby
+from concurrent.futures import ProcessPoolExecutor
+from config import (SALVAR_RECORTES_DEBUG, WORKERS_CORRECAO, PAGINAS_POR_BLOCO_RASTER, THREADS_RASTERIZACAO,
+                    USAR_TEMPLATE_BOLINHAS, ARQUIVO_LAYOUT_BOLINHAS, BLOCO_QUESTOES, REGISTRAR_PAGINAS,
+                    LARGURA_REGISTRO, MIN_BOLINHAS_REGISTRO, DPI_RASTERIZACAO, DPI_REFERENCIA,
+                    ARQUIVO_RELATORIO_DPI, USAR_CACHE_CORRECAO, INSTRUMENTAR_CORRECAO, ARQUIVO_TRACE_CORRECAO,
+                    POPPLER_PATH)
+from cache_correcao import hash_arquivo, hash_parametros, carregar_cache, salvar_cache
+from matriz_respostas import salvar_matriz
+from recorrecao import (decidir_respostas, salvar_preenchimentos, aplicar_regras, resumir_situacoes, EM_BRANCO,
+                        MARCACAO_DUPLA, SEM_BOLINHAS)
+import instrumentacao
+from instrumentacao import etapa, contar
 
 entrada_pdf = "imagens_pdf"
 saida_img = "imagens_gabaritos"
 temp_dir = "temp"
 csv_saida = "utils/respostas.csv"
+poppler_path = os.environ.get("POPPLER_PATH") or POPPLER_PATH  # None = poppler do PATH
 
-os.makedirs(saida_img, exist_ok=True)
-os.makedirs(temp_dir, exist_ok=True)
+# As páginas e os recortes ficam em memória; os arquivos só são gravados no modo debug
+if SALVAR_RECORTES_DEBUG:
+    os.makedirs(saida_img, exist_ok=True)
+    os.makedirs(temp_dir, exist_ok=True)
 
 def remove_readonly(func, path, _):
     os.chmod(path, 0o777)
@@ -19,189 +41,868 @@ def remove_readonly(func, path, _):
 
 
 # -------- NOVA FUNÇÃO DE DETECÇÃO AUTOMÁTICA DE CÍRCULOS --------
-def detectar_respostas(temp_folder):
-    respostas = []
-    alternativas = ["A", "B", "C", "D", "E"]
-
-    for i in range(1, 61):
-        caminho = os.path.join(temp_folder, f"questao_{i:02d}.jpg")
-        imagem = cv2.imread(caminho)
-        if imagem is None:
-            respostas.append("")
+ALTERNATIVAS = ["A", "B", "C", "D", "E"]
+
+
+def _escala_bloco(bloco):
+    """Razão entre a largura do bloco e a largura de referência (BLOCO_QUESTOES, a DPI_REFERENCIA)."""
+    return bloco.shape[1] / (BLOCO_QUESTOES[2] - BLOCO_QUESTOES[0])
+
+
+def _preprocessar(imagem, escala=1.0):
+    """Converte para cinza (se preciso), suaviza e binariza (bolinhas e marcações ficam brancas)."""
+    gray = imagem if imagem.ndim == 2 else cv2.cvtColor(imagem, cv2.COLOR_BGR2GRAY)
+    gray = cv2.medianBlur(gray, max(3, int(5 * escala) | 1))
+    _, thresh = cv2.threshold(gray, 180, 255, cv2.THRESH_BINARY_INV)
+    return thresh
+
+
+def _centro_bolinha(cnt, escala=1.0):
+    """
+    Devolve o centroide (cx, cy) se o contorno tiver a forma e o tamanho de uma bolinha, senão None.
+    Os limites de área valem para DPI_REFERENCIA e são ajustados pelo quadrado de `escala`.
+    """
+    area = cv2.contourArea(cnt)
+    perimetro = cv2.arcLength(cnt, True)
+    if perimetro == 0:
+        return None
+    circularidade = 4 * np.pi * (area / (perimetro ** 2))
+
+    if 0.5 < circularidade < 1.2 and 3000 * escala ** 2 < area < 12000 * escala ** 2: # ← ajuste novo
+        M = cv2.moments(cnt)
+        if M["m00"] == 0:
+            return None
+        return int(M["m10"] / M["m00"]), int(M["m01"] / M["m00"])
+    return None
+
+
+def _preenchimento(thresh, cnt):
+    """Média do threshold dentro do contorno (quanto mais branco, mais marcada)."""
+    # A máscara cobre só o retângulo da bolinha, e não a imagem inteira
+    x, y, w, h = cv2.boundingRect(cnt)
+    mask = np.zeros((h, w), dtype=np.uint8)
+    cv2.drawContours(mask, [cnt], -1, 255, -1, offset=(-x, -y))
+    return cv2.mean(thresh[y:y + h, x:x + w], mask=mask)[0]
+
+
+def _preenchimentos_questao(bolinhas, thresh):
+    """Preenchimento (0 a 1) das 5 bolinhas da questão, da esquerda para a direita (mais branca = marcada)."""
+    # Ordenar da esquerda pra direita
+    bolinhas.sort(key=lambda x: x[0])
+    return [_preenchimento(thresh, cnt) / 255 for cx, cy, cnt in bolinhas]
+
+
+def _salvar_erro(pasta_erros, questao, imagem, thresh):
+    # Salva a imagem e o threshold da questão com erro na pasta "erros"
+    erro_dir = os.path.join(pasta_erros, f"questao_{questao:02d}")
+    os.makedirs(erro_dir, exist_ok=True)
+    cv2.imwrite(os.path.join(erro_dir, "imagem.jpg"), imagem)
+    cv2.imwrite(os.path.join(erro_dir, "thresh.jpg"), thresh)
+
+
+def detectar_respostas(recortes, pasta_erros=None, escala=1.0):
+    """
+    Detecta a alternativa marcada em cada recorte de questão.
+    Os recortes são arrays NumPy (ou views do bloco da página) já em memória, em tons de cinza ou BGR.
+    Se `pasta_erros` for informada, as questões sem 5 bolinhas são salvas para depuração.
+    """
+    preenchimentos = np.full((len(recortes), 5), np.nan)
+
+    for i, imagem in enumerate(recortes, start=1):
+        if imagem is None or imagem.size == 0:
+            preenchimentos[i - 1] = 0  # recorte vazio: nenhuma bolinha marcada
             continue
 
         # Cortar para remover número da questão (ajuste conforme necessário)
         h, w = imagem.shape[:2]
         imagem = imagem[:, int(w * 0.1):-int(w * 0.02)]  # ← ajuste novo
 
-        # Pré-processamento
-        gray = cv2.cvtColor(imagem, cv2.COLOR_BGR2GRAY)
-        gray = cv2.medianBlur(gray, 5)
-        _, thresh = cv2.threshold(gray, 180, 255, cv2.THRESH_BINARY_INV)
-
-        # Contornos
+        thresh = _preprocessar(imagem, escala)
         contornos, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         bolinhas = []
-
         for cnt in contornos:
-            area = cv2.contourArea(cnt)
-            perimetro = cv2.arcLength(cnt, True)
-            if perimetro == 0:
-                continue
-            circularidade = 4 * np.pi * (area / (perimetro ** 2))
-
-            if 0.5 < circularidade < 1.2 and 3000 < area < 12000: # ← ajuste novo
-                M = cv2.moments(cnt)
-                if M["m00"] == 0:
-                    continue
-                cx = int(M["m10"] / M["m00"])
-                cy = int(M["m01"] / M["m00"])
-                bolinhas.append((cx, cy, cnt))
+            centro = _centro_bolinha(cnt, escala)
+            if centro is not None:
+                bolinhas.append((*centro, cnt))
 
         if len(bolinhas) != 5:
             print(f"⚠️ Questão {i}: detectou {len(bolinhas)} bolinhas (esperado: 5)")
-            respostas.append("Z")
+            if pasta_erros:
+                _salvar_erro(pasta_erros, i, imagem, thresh)
             continue
 
-        # Ordenar da esquerda pra direita
-        bolinhas.sort(key=lambda x: x[0])
+        preenchimentos[i - 1] = _preenchimentos_questao(bolinhas, thresh)
 
-        # Calcular o preenchimento (quanto mais branco na máscara, mais marcada)
-        preenchimentos = []
-        for cx, cy, cnt in bolinhas:
-            mask = np.zeros_like(gray)
-            cv2.drawContours(mask, [cnt], -1, 255, -1)
-            media = cv2.mean(thresh, mask=mask)[0]
-            preenchimentos.append(media)
+    return decidir_respostas(preenchimentos)
 
-        idx = np.argmax(preenchimentos)  # maior preenchimento = mais branca = marcada
-        respostas.append(alternativas[idx])
 
+def _limites_recorte(coluna, linha, h, w, altura, largura, margem=10):
+    """Coordenadas (ry1, ry2, rx1, rx2) do recorte da questão na grade 15×4, com margem."""
+    y_ini = linha * altura
+    y_fim = (linha + 1) * altura
+    x_ini = coluna * largura
+    x_fim = (coluna + 1) * largura
 
+    ry1 = max(0, y_ini - margem)
+    ry2 = min(h, y_fim + margem)
+    rx1 = x_ini if coluna == 0 else max(0, x_ini - margem)
+    rx2 = min(w, x_fim + margem)
+    return ry1, ry2, rx1, rx2
 
-    #Salvas as questões com erro na pasta "erros"
-    # Se não detectou 5 bolinhas, salva a imagem e o threshold na pasta de erros
-    if len(bolinhas) != 5:
-        erro_dir = os.path.join("erros", f"questao_{i:02d}")
-        os.makedirs(erro_dir, exist_ok=True)
-        cv2.imwrite(os.path.join(erro_dir, "imagem.jpg"), imagem)
-        cv2.imwrite(os.path.join(erro_dir, "thresh.jpg"), thresh)
 
-    return respostas
+def _agrupar_bolinhas(thresh, escala=1.0):
+    """
+    Busca os contornos do bloco binarizado uma única vez e atribui cada bolinha à sua questão
+    pelo centroide na grade 15×4. Devolve celulas[coluna][linha] com listas de (cx, cy, contorno).
+    """
+    h, w = thresh.shape[:2]
+    altura = h // 15
+    largura = int(w / 4)
+    margem = round(10 * escala)
 
+    # RETR_CCOMP mantém como externas as bolinhas que estejam dentro de uma moldura do bloco
+    contornos, hierarquia = cv2.findContours(thresh, cv2.RETR_CCOMP, cv2.CHAIN_APPROX_SIMPLE)
 
-# ---------------------------------------------------------------
+    celulas = [[[] for _ in range(15)] for _ in range(4)]  # [coluna][linha]
+    if hierarquia is None:
+        return celulas
+    for cnt, (_, _, _, pai) in zip(contornos, hierarquia[0]):
+        if pai != -1:
+            continue
+        centro = _centro_bolinha(cnt, escala)
+        if centro is None:
+            continue
+        cx, cy = centro
+        coluna = min(cx // largura, 3)
+        linha = cy // altura
+        if linha >= 15:
+            continue
 
+        # Descarta o número da questão e a borda direita, como no corte dos recortes
+        _, _, rx1, rx2 = _limites_recorte(coluna, linha, h, w, altura, largura, margem)
+        largura_recorte = rx2 - rx1
+        if not (rx1 + int(largura_recorte * 0.1) <= cx < rx2 - int(largura_recorte * 0.02)):
+            continue
+        celulas[coluna][linha].append((cx, cy, cnt))
+    return celulas
 
-# função que processa a imagem do aluno, recorta a área de questões, aplica a máscara e salva na temp
-def processar_imagem(path_img, temp_dir="temp"):
-    image = cv2.imread(path_img)
 
-    # Coordenadas do bloco onde estão as questões
-    x1, x2 = 270, 3480
-    y1, y2 = 1430, 4580
-    bloco = image[y1:y2, x1:x2]
+def medir_preenchimentos_pagina(bloco, pasta_erros=None):
+    """
+    Mede o preenchimento das 300 bolinhas com um único pré-processamento e uma única busca de
+    contornos no bloco inteiro. Cada bolinha é atribuída à sua questão pelo centroide na grade 15×4
+    (colunas primeiro), com os mesmos limites usados nos recortes de `detectar_respostas`.
+    Devolve um array (60, 5) em [0, 1]; as questões sem exatamente 5 bolinhas ficam com NaN.
+    """
+    h, w = bloco.shape[:2]
+    altura = h // 15
+    largura = int(w / 4)
+    escala = _escala_bloco(bloco)
+
+    with etapa("preprocessamento"):
+        thresh = _preprocessar(bloco, escala)
+    with etapa("contornos"):
+        celulas = _agrupar_bolinhas(thresh, escala)
+
+    preenchimentos = np.full((60, 5), np.nan)
+    questao = 1
+    with etapa("pontuacao"):
+        for coluna in range(4):           # ← percorre colunas primeiro
+            for linha in range(15):       # ← depois percorre as linhas
+                bolinhas = celulas[coluna][linha]
+                contar(f"questoes_com_{len(bolinhas)}_bolinhas")
+                if len(bolinhas) != 5:
+                    print(f"⚠️ Questão {questao}: detectou {len(bolinhas)} bolinhas (esperado: 5)")
+                    if pasta_erros:
+                        ry1, ry2, rx1, rx2 = _limites_recorte(coluna, linha, h, w, altura, largura, round(10 * escala))
+                        _salvar_erro(pasta_erros, questao, bloco[ry1:ry2, rx1:rx2], thresh[ry1:ry2, rx1:rx2])
+                else:
+                    preenchimentos[questao - 1] = _preenchimentos_questao(bolinhas, thresh)
+                questao += 1
+
+    return preenchimentos
+
+
+def detectar_respostas_pagina(bloco, pasta_erros=None):
+    """Detecta as 60 respostas pela busca de contornos (ver `medir_preenchimentos_pagina`)."""
+    return decidir_respostas(medir_preenchimentos_pagina(bloco, pasta_erros))
+
+
+# -------- MODO TEMPLATE: POSIÇÕES DAS BOLINHAS APRENDIDAS NO GABARITO --------
+def extrair_layout(bloco):
+    """
+    Detecta as 300 bolinhas no bloco do gabarito e devolve um array (60, 5, 3) com
+    (cx, cy, raio) de cada alternativa, em frações da largura/altura do bloco, de modo
+    que o mesmo layout sirva para qualquer DPI.
+    Devolve None se alguma questão não tiver exatamente 5 bolinhas.
+    """
+    h, w = bloco.shape[:2]
+    escala = _escala_bloco(bloco)
+    celulas = _agrupar_bolinhas(_preprocessar(bloco, escala), escala)
+
+    layout = []
+    questao = 1
+    for coluna in range(4):
+        for linha in range(15):
+            bolinhas = sorted(celulas[coluna][linha], key=lambda x: x[0])
+            if len(bolinhas) != 5:
+                print(f"❌ ERRO: questão {questao} do gabarito tem {len(bolinhas)} bolinhas; não é possível montar o template.")
+                return None
+            layout.append([(cx / w, cy / h, np.sqrt(cv2.contourArea(cnt) / np.pi) / w) for cx, cy, cnt in bolinhas])
+            questao += 1
+
+    return np.array(layout, dtype=np.float32)
+
+
+def salvar_layout(layout, caminho=ARQUIVO_LAYOUT_BOLINHAS):
+    """Salva o layout das bolinhas em JSON para ser reutilizado em outras execuções."""
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump({"bolinhas": np.round(layout, 6).tolist()}, f)
+    print(f"✅ Layout das bolinhas salvo em '{caminho}'.")
+
+
+def carregar_layout(caminho=ARQUIVO_LAYOUT_BOLINHAS):
+    """Lê o layout salvo por `salvar_layout`, ou devolve None se o arquivo não existir."""
+    if not os.path.exists(caminho):
+        return None
+    with open(caminho, 'r', encoding='utf-8') as f:
+        return np.array(json.load(f)["bolinhas"], dtype=np.float32)
+
+
+def preenchimentos_por_template(bloco, layout):
+    """
+    Mede o preenchimento das 300 bolinhas de uma vez: soma o threshold binário (0/1) dentro de
+    um quadrado inscrito em cada bolinha usando a imagem integral. Devolve um array (60, 5) em [0, 1].
+    O layout está em frações do bloco (ver `extrair_layout`).
+    """
+    gray = bloco if bloco.ndim == 2 else cv2.cvtColor(bloco, cv2.COLOR_BGR2GRAY)
+    # Sem medianBlur: a média sobre a área da bolinha já absorve o ruído de pixels isolados
+    _, binaria = cv2.threshold(gray, 180, 1, cv2.THRESH_BINARY_INV)
+    integral = cv2.integral(binaria)  # (h + 1, w + 1), int32 sem risco de overflow com valores 0/1
+
+    h, w = binaria.shape
+    cx, cy, raio = layout[..., 0] * w, layout[..., 1] * h, layout[..., 2] * w
+    meio_lado = raio * 0.6  # quadrado dentro do anel da bolinha
+    xa = np.clip(np.rint(cx - meio_lado), 0, w).astype(np.intp)
+    xb = np.clip(np.rint(cx + meio_lado) + 1, 0, w).astype(np.intp)
+    ya = np.clip(np.rint(cy - meio_lado), 0, h).astype(np.intp)
+    yb = np.clip(np.rint(cy + meio_lado) + 1, 0, h).astype(np.intp)
+
+    soma = integral[yb, xb] - integral[ya, xb] - integral[yb, xa] + integral[ya, xa]
+    area = np.maximum((xb - xa) * (yb - ya), 1)
+    return soma / area
+
+
+def detectar_respostas_template(bloco, layout):
+    """Decide a resposta de cada questão pelos preenchimentos medidos no template."""
+    with etapa("pontuacao_template"):
+        preenchimentos = preenchimentos_por_template(bloco, layout)
+    return decidir_respostas(preenchimentos)
+
+
+# ---------------------------------------------------------------
 
-    # Máscara para isolar círculos pretos
-    hsv = cv2.cvtColor(bloco, cv2.COLOR_BGR2HSV)
-    lower_black = np.array([0, 0, 0])
-    upper_black = np.array([180, 255, 80])
-    mask_hsv = cv2.inRange(hsv, lower_black, upper_black)
 
+def recortar_questoes(bloco):
+    """Devolve os recortes (views, sem cópia) das 60 questões do bloco, colunas primeiro."""
     h, w = bloco.shape[:2]
     altura = h // 15
     largura = int(w / 4)
+    margem = round(10 * _escala_bloco(bloco))
 
-    # Limpa a pasta temporária
-    if os.path.exists(temp_dir):
-        shutil.rmtree(temp_dir, onerror=remove_readonly)
-    os.makedirs(temp_dir)
-
-    margem = 10
     count = 1
+    recortes = []
     for coluna in range(4):           # ← percorre colunas primeiro
         for linha in range(15):       # ← depois percorre as linhas
-
-            y_ini = linha * altura
-            y_fim = (linha + 1) * altura
-            x_ini = coluna * largura
-            x_fim = (coluna + 1) * largura
-
-            ry1 = max(0, y_ini - margem)
-            ry2 = min(h, y_fim + margem)
-            rx1 = x_ini if coluna == 0 else max(0, x_ini - margem)
-            rx2 = min(w, x_fim + margem)
-
+            ry1, ry2, rx1, rx2 = _limites_recorte(coluna, linha, h, w, altura, largura, margem)
             recorte_img = bloco[ry1:ry2, rx1:rx2]
 
             if recorte_img.size == 0:
                 print(f"❌ ERRO: questão {count:02d} está vazia! Coordenadas: {rx1}:{rx2}, {ry1}:{ry2}")
                 continue
 
-            cv2.imwrite(f"{temp_dir}/questao_{count:02d}.jpg", recorte_img)
+            recortes.append(recorte_img)
             count += 1
+    return recortes
 
 
-    return detectar_respostas(temp_dir)
+# -------- GEOMETRIA DO BLOCO EM FRAÇÕES DA PÁGINA --------
+def fracoes_bloco(imagem_gabarito, dpi=DPI_RASTERIZACAO):
+    """
+    Converte BLOCO_QUESTOES (pixels medidos a DPI_REFERENCIA) em frações da página do gabarito
+    rasterizado a `dpi`. As frações valem para qualquer DPI e tamanho de página.
+    """
+    h, w = imagem_gabarito.shape[:2]
+    fator = dpi / DPI_REFERENCIA
+    x1, y1, x2, y2 = BLOCO_QUESTOES
+    return (x1 * fator / w, y1 * fator / h, x2 * fator / w, y2 * fator / h)
 
 
-
-# ----------------------------
-# Etapa 1 – Converter PDFs
-# ----------------------------
-imagens_convertidas = []
-
-for arquivo in sorted(os.listdir(entrada_pdf)):
-    if arquivo.endswith(".pdf"):
-        nome_base = os.path.splitext(arquivo)[0]
-        paginas = convert_from_path(
-        os.path.join(entrada_pdf, arquivo),
-        dpi=150,  # reduz o peso e acelera muito!
-        poppler_path=r"C:\poppler\Library\bin"  # ajuste se necessário
-        )
-
-        for i, pagina in enumerate(paginas):
-            img_nome = f"{nome_base}_p{i+1}.jpg"
-            caminho_img = os.path.join(saida_img, img_nome)
-            pagina.save(caminho_img, "JPEG")
-            imagens_convertidas.append((nome_base, caminho_img))
-        print(f"✅ {len(paginas)} páginas convertidas para imagens!")
+def _pixels_bloco(imagem, bloco=None):
+    """Coordenadas (x1, y1, x2, y2) do bloco na página; sem frações, usa BLOCO_QUESTOES direto."""
+    if bloco is None:
+        return BLOCO_QUESTOES
+    h, w = imagem.shape[:2]
+    fx1, fy1, fx2, fy2 = bloco
+    return round(fx1 * w), round(fy1 * h), round(fx2 * w), round(fy2 * h)
 
 
+# função que processa a imagem do aluno, recorta a área de questões e detecta as respostas
+def recortar_bloco(imagem, bloco=None):
+    """Devolve o bloco de questões da página (view, sem cópia). `bloco` são as frações de `fracoes_bloco`."""
+    # Coordenadas do bloco onde estão as questões
+    x1, y1, x2, y2 = _pixels_bloco(imagem, bloco)
+    return imagem[y1:y2, x1:x2]
+
+
+# -------- REGISTRO DA PÁGINA (ALINHAMENTO PELO CANTO DA GRADE DE BOLINHAS) --------
+def localizar_grade(imagem, largura_registro=LARGURA_REGISTRO):
+    """
+    Localiza os 4 cantos da grade de bolinhas numa cópia reduzida da página.
+    Devolve um array (4, 2) com os cantos (sup. esq., sup. dir., inf. dir., inf. esq.)
+    em coordenadas da página original, ou None se não encontrar bolinhas suficientes.
+    """
+    # Subamostragem simples (sem interpolação): barata e preserva o contorno das bolinhas
+    passo = max(1, imagem.shape[1] // largura_registro)
+    fator = 1 / passo
+    reduzida = imagem[::passo, ::passo]
+    if reduzida.ndim == 3:
+        reduzida = cv2.cvtColor(reduzida, cv2.COLOR_BGR2GRAY)
+    _, thresh = cv2.threshold(reduzida, 180, 255, cv2.THRESH_BINARY_INV)
+    contornos, hierarquia = cv2.findContours(thresh, cv2.RETR_CCOMP, cv2.CHAIN_APPROX_SIMPLE)
+    if hierarquia is None:
+        return None
+
+    # Faixa larga de área para tolerar DPIs de 1/4 a 2× o de referência; depois fica só o tamanho típico
+    area_min, area_max = 3000 * fator ** 2 / 16, 12000 * fator ** 2 * 4
+    candidatos = []
+    for cnt, (_, _, _, pai) in zip(contornos, hierarquia[0]):
+        if pai != -1:
+            continue
+        area = cv2.contourArea(cnt)
+        perimetro = cv2.arcLength(cnt, True)
+        if perimetro == 0 or not (area_min < area < area_max):
+            continue
+        if 0.5 < 4 * np.pi * area / perimetro ** 2 < 1.2:
+            M = cv2.moments(cnt)
+            candidatos.append((M["m10"] / M["m00"], M["m01"] / M["m00"], area))
+
+    if len(candidatos) < MIN_BOLINHAS_REGISTRO:
+        return None
+    candidatos = np.array(candidatos, dtype=np.float32)
+    mediana = np.median(candidatos[:, 2])
+    centros = candidatos[np.abs(candidatos[:, 2] - mediana) < 0.5 * mediana, :2]
+    if len(centros) < MIN_BOLINHAS_REGISTRO:
+        return None
+
+    cantos = cv2.boxPoints(cv2.minAreaRect(centros)) / fator
+    soma, diferenca = cantos.sum(axis=1), cantos[:, 1] - cantos[:, 0]
+    return np.array([
+        cantos[np.argmin(soma)],        # superior esquerdo
+        cantos[np.argmin(diferenca)],   # superior direito
+        cantos[np.argmax(soma)],        # inferior direito
+        cantos[np.argmax(diferenca)],   # inferior esquerdo
+    ], dtype=np.float32)
+
+
+def referencia_registro(imagem_gabarito, bloco=None):
+    """
+    Prepara a referência de registro a partir do gabarito: os cantos da grade de bolinhas
+    em coordenadas do bloco do gabarito e o tamanho (largura, altura) desse bloco.
+    Devolve None se a grade não for encontrada.
+    """
+    cantos = localizar_grade(imagem_gabarito)
+    if cantos is None:
+        return None
+    x1, y1, x2, y2 = _pixels_bloco(imagem_gabarito, bloco)
+    return {"cantos": cantos - np.array([x1, y1], dtype=np.float32), "tamanho": (x2 - x1, y2 - y1)}
+
+
+def registrar_bloco(imagem, referencia, bloco=None):
+    """
+    Alinha a página ao gabarito e devolve só o bloco de questões.
+    `referencia` vem de `referencia_registro`. Uma única transformação afim leva a grade desta
+    página para a posição da grade no bloco do gabarito; só os pixels do bloco são calculados.
+    Se a grade não for encontrada, usa o recorte fixo.
+    """
+    cantos = localizar_grade(imagem)
+    if cantos is None:
+        print("⚠️ Grade de bolinhas não encontrada; usando o recorte fixo do bloco.")
+        contar("registro_sem_grade")
+        return recortar_bloco(imagem, bloco)
+
+    destino = referencia["cantos"]
+    largura, altura = referencia["tamanho"]
+    # sup. esq., sup. dir. e inf. esq. definem a transformação afim
+    M = cv2.getAffineTransform(cantos[[0, 1, 3]], destino[[0, 1, 3]])
+
+    # Página só deslocada (sem rotação nem escala perceptíveis): basta um recorte deslocado, sem warp
+    if np.abs(M[:, :2] - np.eye(2)).max() < 1e-3:
+        dx, dy = int(round(-M[0, 2])), int(round(-M[1, 2]))
+        h, w = imagem.shape[:2]
+        if 0 <= dx and dx + largura <= w and 0 <= dy and dy + altura <= h:
+            return imagem[dy:dy + altura, dx:dx + largura]
+
+    return cv2.warpAffine(imagem, M, (largura, altura), flags=cv2.INTER_LINEAR,
+                          borderMode=cv2.BORDER_CONSTANT, borderValue=255)
+
+
+def medir_imagem(imagem, temp_dir=None, layout=None, referencia=None, bloco=None):
+    """
+    Recorta o bloco de questões da página e mede o preenchimento das bolinhas: devolve um array
+    (60, 5) float16 (o formato salvo em disco, para que a re-correção decida igual), NaN nas questões
+    sem 5 bolinhas.
+    `imagem` pode ser um array em tons de cinza (ou BGR) em memória ou o caminho de um arquivo de imagem.
+    `bloco` são as frações da página ocupadas pelo bloco (ver `fracoes_bloco`).
+    Com `layout` (modo template), as bolinhas são medidas nas posições aprendidas no gabarito,
+    sem busca de contornos.
+    Com `referencia` (ver `referencia_registro`), a página é alinhada ao gabarito antes do recorte.
+    Os recortes só são gravados em `temp_dir` quando ele é informado (modo debug).
+    """
+    if isinstance(imagem, str):
+        with etapa("leitura_imagem"):
+            imagem = cv2.imread(imagem, cv2.IMREAD_GRAYSCALE)
+
+    if referencia is not None:
+        with etapa("registro"):
+            bloco_img = registrar_bloco(imagem, referencia, bloco)
+    else:
+        with etapa("recorte"):
+            bloco_img = recortar_bloco(imagem, bloco)
+
+    # Grava os recortes na pasta temporária (somente no modo debug)
+    if temp_dir:
+        with etapa("gravacao_debug"):
+            if os.path.exists(temp_dir):
+                shutil.rmtree(temp_dir, onerror=remove_readonly)
+            os.makedirs(temp_dir)
+            for count, recorte_img in enumerate(recortar_questoes(bloco_img), start=1):
+                cv2.imwrite(f"{temp_dir}/questao_{count:02d}.jpg", recorte_img)
+
+    if layout is not None:
+        with etapa("pontuacao_template"):
+            preenchimentos = preenchimentos_por_template(bloco_img, layout)
+    else:
+        preenchimentos = medir_preenchimentos_pagina(bloco_img, pasta_erros="erros" if temp_dir else None)
+    preenchimentos = preenchimentos.astype(np.float16)
+    if instrumentacao.esta_ativo():
+        _contar_anomalias(preenchimentos)
+    return preenchimentos
+
+
+def _contar_anomalias(preenchimentos):
+    """
+    Conta as anomalias da página pelas situações da decisão final, iguais nos dois modos (contornos e template):
+    'questoes_Z' soma as marcações duplas e as questões sem as 5 bolinhas.
+    """
+    _, situacoes = aplicar_regras(preenchimentos)
+    contagem = np.bincount(situacoes.ravel(), minlength=SEM_BOLINHAS + 1)
+    for nome, quantidade in (("questoes_Z", contagem[MARCACAO_DUPLA] + contagem[SEM_BOLINHAS]),
+                             ("questoes_marcacao_dupla", contagem[MARCACAO_DUPLA]),
+                             ("questoes_sem_bolinhas", contagem[SEM_BOLINHAS]),
+                             ("questoes_em_branco", contagem[EM_BRANCO])):
+        if quantidade:
+            contar(nome, int(quantidade))
+
+
+def processar_imagem(imagem, temp_dir=None, layout=None, referencia=None, bloco=None):
+    """Detecta as respostas da página (ver `medir_imagem`), com as regras de `recorrecao`."""
+    return decidir_respostas(medir_imagem(imagem, temp_dir, layout, referencia, bloco))
+
+
+
+# função executada em cada processo do pool de correção
+def _inicializar_worker(instrumentar=False):
+    # Cada worker usa uma única thread do OpenCV para não disputar os núcleos com os demais
+    cv2.setNumThreads(1)
+    instrumentacao.ativar(instrumentar)
+    instrumentacao.coletar()  # descarta eventos herdados do processo principal (fork)
+
+
+def _corrigir_aluno(tarefa):
+    """Mede uma página e devolve (preenchimentos, eventos de instrumentação registrados nela)."""
+    idx, nome_pagina, imagem, opcoes = tarefa
+    temp_aluno = os.path.join("debug_temp", f"aluno_{idx:02d}") if SALVAR_RECORTES_DEBUG else None
+    with instrumentacao.pagina(nome_pagina):
+        preenchimentos = medir_imagem(imagem, temp_dir=temp_aluno, **opcoes)
+    return preenchimentos, instrumentacao.coletar()
+
+
+def criar_pool(workers=WORKERS_CORRECAO):
+    """Pool de processos de correção, para quem corrige vários lotes seguidos (ver `corrigir_alunos`)."""
+    return ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1, initializer=_inicializar_worker,
+                               initargs=(instrumentacao.esta_ativo(),))
+
+
+def corrigir_alunos(paginas, workers=WORKERS_CORRECAO, layout=None, referencia=None, bloco=None,
+                    preenchimentos=None, pool=None):
+    """
+    Corrige as páginas dos alunos, em paralelo quando `workers` for maior que 1.
+    `paginas` é um iterável de (nome_base, nome_pagina, imagem), consumido à medida que as
+    páginas são rasterizadas: no máximo alguns lotes ficam em memória ao mesmo tempo.
+    Com `layout`, as páginas são corrigidas no modo template (ver `extrair_layout`); com
+    `referencia`, cada página é alinhada ao gabarito antes (ver `registrar_bloco`); `bloco`
+    são as frações da página ocupadas pelo bloco (ver `fracoes_bloco`).
+    Devolve uma lista de (nome_base, nome_pagina, respostas) na mesma ordem de entrada,
+    independentemente do número de workers. Se `preenchimentos` for uma lista, o array (60, 5) de
+    cada página é acrescentado a ela, na mesma ordem. Com `pool` (ver `criar_pool`), as páginas vão
+    para esse pool, que continua aberto no fim, em vez de um pool criado só para esta chamada.
+    """
+    workers = workers or os.cpu_count() or 1
+    opcoes = {"layout": layout, "referencia": referencia, "bloco": bloco}
+
+    def _resultado(nome, pagina, saida):
+        medidos, eventos = saida
+        instrumentacao.registrar(eventos)
+        if preenchimentos is not None:
+            preenchimentos.append(medidos)
+        return nome, pagina, decidir_respostas(medidos)
+
+    if workers <= 1 and pool is None:
+        return [_resultado(nome, pagina, _corrigir_aluno((idx, pagina, imagem, opcoes)))
+                for idx, (nome, pagina, imagem) in enumerate(paginas, start=1)]
+
+    if pool is None:
+        print(f"⚙️ Corrigindo as páginas com {workers} processos...")
+    resultados = []
+    pendentes = deque()
+    max_pendentes = workers * 2  # limita as páginas aguardando correção (memória constante)
+    with nullcontext(pool) if pool is not None else criar_pool(workers) as pool:
+        for idx, (nome, pagina, imagem) in enumerate(paginas, start=1):
+            pendentes.append((nome, pagina, pool.submit(_corrigir_aluno, (idx, pagina, imagem, opcoes))))
+            if len(pendentes) >= max_pendentes:
+                nome_ok, pagina_ok, futuro = pendentes.popleft()
+                resultados.append(_resultado(nome_ok, pagina_ok, futuro.result()))
+
+        # Os resultados são coletados na ordem de envio, mantendo o CSV determinístico
+        while pendentes:
+            nome_ok, pagina_ok, futuro = pendentes.popleft()
+            resultados.append(_resultado(nome_ok, pagina_ok, futuro.result()))
+
+    return resultados
 
 
 # ----------------------------
-# Etapa 2 – Separar gabarito
+# Etapa 1 – Converter PDFs
 # ----------------------------
+def _faixas_paginas(numeros, tamanho_maximo):
+    """Agrupa números de página em faixas contíguas (inicio, fim) com no máximo `tamanho_maximo` páginas."""
+    faixas = []
+    for numero in sorted(numeros):
+        if faixas and faixas[-1][1] == numero - 1 and faixas[-1][1] - faixas[-1][0] + 1 < tamanho_maximo:
+            faixas[-1][1] = numero
+        else:
+            faixas.append([numero, numero])
+    return [tuple(f) for f in faixas]
+
+
+def rasterizar_pdf(caminho_pdf, dpi=DPI_RASTERIZACAO, paginas_por_bloco=PAGINAS_POR_BLOCO_RASTER, threads=THREADS_RASTERIZACAO, paginas=None):
+    """
+    Renderiza o PDF em tons de cinza, em blocos de `paginas_por_bloco` páginas, e gera
+    (numero_pagina, imagem PIL). Só um bloco fica em memória por vez; cada bloco é dividido
+    entre `threads` processos do poppler. Com `paginas`, só esses números de página são renderizados.
+    """
+    threads = threads or os.cpu_count() or 1
+    if paginas is None:
+        total_paginas = pdfinfo_from_path(caminho_pdf, poppler_path=poppler_path)["Pages"]
+        paginas = range(1, total_paginas + 1)
+
+    for inicio, fim in _faixas_paginas(paginas, paginas_por_bloco):
+        with etapa("rasterizacao"):
+            imagens = convert_from_path(
+                caminho_pdf,
+                dpi=dpi,  # reduz o peso e acelera muito!
+                grayscale=True,  # 1 byte por pixel: um terço da memória do RGB
+                first_page=inicio,
+                last_page=fim,
+                thread_count=min(threads, fim - inicio + 1),
+                poppler_path=poppler_path
+            )
+        contar("paginas_rasterizadas", len(imagens))
+        for numero, pagina in enumerate(imagens, start=inicio):
+            yield numero, pagina
+
+
+def paginas_pdf(caminho_pdf, numeros, dpi=DPI_RASTERIZACAO):
+    """Gera (nome_base, nome_pagina, imagem em tons de cinza) para as páginas `numeros` de um PDF."""
+    nome_base = os.path.splitext(os.path.basename(caminho_pdf))[0]
+    for numero, pagina in rasterizar_pdf(caminho_pdf, dpi=dpi, paginas=numeros):
+        yield nome_base, f"{nome_base}_p{numero}.jpg", np.asarray(pagina)
+
+
+def converter_pdfs(pasta_pdf=entrada_pdf, dpi=DPI_RASTERIZACAO):
+    """Gera (nome_base, nome_pagina, imagem em tons de cinza) para cada página de cada PDF, em ordem, sob demanda."""
+    for arquivo in sorted(os.listdir(pasta_pdf)):
+        if arquivo.endswith(".pdf"):
+            nome_base = os.path.splitext(arquivo)[0]
+            total = 0
+            for numero, pagina in rasterizar_pdf(os.path.join(pasta_pdf, arquivo), dpi=dpi):
+                img_nome = f"{nome_base}_p{numero}.jpg"
+                if SALVAR_RECORTES_DEBUG:
+                    with etapa("gravacao_debug"):
+                        pagina.save(os.path.join(saida_img, img_nome), "JPEG")
+                yield nome_base, img_nome, np.asarray(pagina)
+                total += 1
+            print(f"✅ {total} páginas convertidas para imagens! ({arquivo})")
 
-respostas_finais = []
 
-gabarito = processar_imagem(imagens_convertidas[0][1])  # primeira imagem é o gabarito
-
-for idx, (nome, caminho) in enumerate(imagens_convertidas[1:], start=1):
-    print(f"\n🔍 Processando aluno {idx} → {caminho}")
-    temp_aluno = os.path.join("debug_temp", f"aluno_{idx:02d}")
-    respostas = processar_imagem(caminho, temp_dir=temp_aluno)
-
-    if len(respostas) != 60:
-        print(f"⚠️ Alerta: Aluno {idx} teve {len(respostas)} respostas detectadas (esperado: 60)")
-    else:
-        print(f"✅ Aluno {idx}: 60 respostas detectadas.")
-
-    respostas_finais.append(respostas)
+# ----------------------------
+# Etapa 3 – Salvar CSV
+# ----------------------------
+def salvar_csv(gabarito, respostas_finais, caminho=csv_saida):
+    colunas = [f"{i+1}" for i in range(60)]
+    with open(caminho, mode='w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(colunas)
+        writer.writerow(gabarito)
+        for resp in respostas_finais:
+            writer.writerow(resp)
+
+    print(f"✅ Respostas salvas em '{caminho}' com sucesso!")
+
+
+def preparar_gabarito(imagem_gabarito, dpi=DPI_RASTERIZACAO, caminho_layout=ARQUIVO_LAYOUT_BOLINHAS,
+                      preenchimentos=None):
+    """
+    Corrige a página do gabarito e prepara o que as páginas dos alunos precisam: as frações do
+    bloco, o template das bolinhas e a referência de registro. Devolve (gabarito, opcoes), em que
+    `opcoes` são os argumentos nomeados de `corrigir_alunos`. O template é salvo em
+    `caminho_layout` (None para não salvar). Se `preenchimentos` for uma lista, os do gabarito
+    são acrescentados a ela.
+    """
+    bloco = fracoes_bloco(imagem_gabarito, dpi)
+    with instrumentacao.pagina("gabarito"):
+        medidos = medir_imagem(imagem_gabarito, temp_dir=temp_dir if SALVAR_RECORTES_DEBUG else None, bloco=bloco)
+    gabarito = decidir_respostas(medidos)
+    if preenchimentos is not None:
+        preenchimentos.append(medidos)
+
+    # Modo template: as posições das bolinhas do gabarito valem para todas as folhas
+    layout = None
+    if USAR_TEMPLATE_BOLINHAS:
+        layout = extrair_layout(recortar_bloco(imagem_gabarito, bloco))
+        if layout is not None:
+            if caminho_layout:
+                salvar_layout(layout, caminho_layout)
+        else:
+            print("⚠️ Template indisponível; as páginas serão corrigidas pela detecção de contornos.")
+
+    # Registro: as folhas dos alunos são alinhadas à grade de bolinhas do gabarito
+    referencia = None
+    if REGISTRAR_PAGINAS:
+        referencia = referencia_registro(imagem_gabarito, bloco)
+        if referencia is None:
+            print("⚠️ Grade do gabarito não encontrada; as páginas serão recortadas pelas coordenadas fixas.")
+
+    return gabarito, {"layout": layout, "referencia": referencia, "bloco": bloco}
+
+
+def corrigir_lote(paginas, dpi=DPI_RASTERIZACAO, workers=WORKERS_CORRECAO, caminho_layout=ARQUIVO_LAYOUT_BOLINHAS,
+                  preenchimentos=None):
+    """
+    Corrige um lote de páginas (iterável de (nome_base, nome_pagina, imagem)) cuja primeira
+    página é o gabarito. Devolve (gabarito, resultados), com os resultados de `corrigir_alunos`.
+    Se `preenchimentos` for uma lista, recebe os do gabarito e depois os de cada aluno.
+    """
+    # ----------------------------
+    # Etapa 2 – Separar gabarito
+    # ----------------------------
+    paginas = iter(paginas)
+    _, _, imagem_gabarito = next(paginas)  # primeira imagem é o gabarito
+    gabarito, opcoes = preparar_gabarito(imagem_gabarito, dpi, caminho_layout, preenchimentos)
+
+    # As demais páginas são corrigidas enquanto os próximos blocos ainda estão sendo rasterizados
+    resultados = corrigir_alunos(paginas, workers=workers, preenchimentos=preenchimentos, **opcoes)
+    return gabarito, resultados
 
 
+# ----------------------------
+# Correção incremental com cache
+# ----------------------------
+def parametros_correcao(dpi, hash_gabarito):
+    """
+    Tudo que influencia os preenchimentos medidos numa página: configuração, gabarito (que define
+    bloco, template e registro) e o código das funções de visão, para que qualquer ajuste de
+    threshold ou de recorte invalide o cache automaticamente. As regras de decisão (`recorrecao`)
+    não entram: elas são aplicadas aos preenchimentos do cache a cada execução.
+    """
+    funcoes = (_escala_bloco, _preprocessar, _centro_bolinha, _preenchimento, _preenchimentos_questao,
+               _limites_recorte, _agrupar_bolinhas, medir_preenchimentos_pagina, extrair_layout,
+               preenchimentos_por_template, fracoes_bloco, _pixels_bloco, recortar_bloco, localizar_grade,
+               referencia_registro, registrar_bloco, medir_imagem, preparar_gabarito)
+    return {
+        "dpi": dpi,
+        "dpi_referencia": DPI_REFERENCIA,
+        "bloco": BLOCO_QUESTOES,
+        "template": USAR_TEMPLATE_BOLINHAS,
+        "registro": REGISTRAR_PAGINAS,
+        "largura_registro": LARGURA_REGISTRO,
+        "min_bolinhas_registro": MIN_BOLINHAS_REGISTRO,
+        "gabarito": hash_gabarito,
+        "codigo": hash_parametros("".join(inspect.getsource(f) for f in funcoes)),
+    }
+
+
+def corrigir_pasta(pasta_pdf=entrada_pdf, dpi=DPI_RASTERIZACAO, workers=WORKERS_CORRECAO, usar_cache=USAR_CACHE_CORRECAO,
+                   preenchimentos=None):
+    """
+    Corrige todos os PDFs da pasta (o primeiro PDF começa pelo gabarito) e devolve (gabarito, resultados).
+    Com cache, só as páginas novas ou alteradas são rasterizadas e corrigidas; as demais vêm do
+    cache, chaveado pelo hash do PDF, pelo número da página e pelos parâmetros de correção.
+    O cache guarda os preenchimentos, e as respostas saem deles com as regras atuais.
+    Se `preenchimentos` for uma lista, recebe os do gabarito e depois os de cada aluno.
+    """
+    if not usar_cache:
+        return corrigir_lote(converter_pdfs(pasta_pdf, dpi), dpi=dpi, workers=workers, preenchimentos=preenchimentos)
+
+    arquivos = [a for a in sorted(os.listdir(pasta_pdf)) if a.endswith(".pdf")]
+    caminhos = {a: os.path.join(pasta_pdf, a) for a in arquivos}
+    hashes = {a: hash_arquivo(caminhos[a]) for a in arquivos}
+    hash_params = hash_parametros(parametros_correcao(dpi, hashes[arquivos[0]]))
+
+    caches = {}
+    for arquivo in arquivos:
+        caches[arquivo] = carregar_cache(hashes[arquivo], hash_params)
+        if caches[arquivo]["total_paginas"] is None:
+            caches[arquivo]["total_paginas"] = pdfinfo_from_path(caminhos[arquivo], poppler_path=poppler_path)["Pages"]
+
+    todas = [(a, n) for a in arquivos for n in range(1, caches[a]["total_paginas"] + 1)]
+    faltantes = [(a, n) for a, n in todas if str(n) not in caches[a]["paginas"]]
+    contar("paginas_do_cache", len(todas) - len(faltantes))
+    print(f"♻️ {len(todas) - len(faltantes)} páginas reaproveitadas do cache; {len(faltantes)} serão corrigidas.")
+
+    if faltantes:
+        # O gabarito é necessário para corrigir qualquer página (bloco, template e registro)
+        _, pagina_gabarito = next(rasterizar_pdf(caminhos[arquivos[0]], dpi=dpi, paginas=[1]))
+        medidos_gabarito = []
+        _, opcoes = preparar_gabarito(np.asarray(pagina_gabarito), dpi, preenchimentos=medidos_gabarito)
+        caches[arquivos[0]]["paginas"]["1"] = medidos_gabarito[0].tolist()
+        faltantes = [(a, n) for a, n in faltantes if (a, n) != (arquivos[0], 1)]
+
+        def paginas_faltantes():
+            for arquivo, grupo in groupby(faltantes, key=lambda x: x[0]):
+                yield from paginas_pdf(caminhos[arquivo], [n for _, n in grupo], dpi)
+
+        medidos = []
+        corrigir_alunos(paginas_faltantes(), workers=workers, preenchimentos=medidos, **opcoes)
+        # corrigir_alunos preserva a ordem de entrada, que é a ordem de `faltantes`
+        for (arquivo, numero), preenchimentos_pagina in zip(faltantes, medidos):
+            caches[arquivo]["paginas"][str(numero)] = preenchimentos_pagina.tolist()
+
+        for arquivo in arquivos:
+            salvar_cache(hashes[arquivo], hash_params, caches[arquivo])
+
+    def _preenchimentos(arquivo, numero):
+        return np.array(caches[arquivo]["paginas"][str(numero)], dtype=np.float16)
+
+    gabarito = decidir_respostas(_preenchimentos(arquivos[0], 1))
+    if preenchimentos is not None:
+        preenchimentos.append(_preenchimentos(arquivos[0], 1))
+    resultados = []
+    for arquivo, numero in todas:
+        if (arquivo, numero) == (arquivos[0], 1):
+            continue
+        nome_base = os.path.splitext(arquivo)[0]
+        medidos = _preenchimentos(arquivo, numero)
+        if preenchimentos is not None:
+            preenchimentos.append(medidos)
+        resultados.append((nome_base, f"{nome_base}_p{numero}.jpg", decidir_respostas(medidos)))
+    return gabarito, resultados
 
 
 # ----------------------------
-# Etapa 3 – Salvar CSV
+# Relatório de precisão por DPI
 # ----------------------------
-colunas = [f"{i+1}" for i in range(60)]
-with open(csv_saida, mode='w', newline='', encoding='utf-8') as file:
-    writer = csv.writer(file)
-    writer.writerow(colunas)
-    writer.writerow(gabarito)
-    for resp in respostas_finais:
-        writer.writerow(resp)
-
-print(f"✅ Respostas salvas em '{csv_saida}' com sucesso!")
\ No newline at end of file
+def relatorio_dpi(caminho_pdf, dpis=(150, 120, 100, 75), caminho_saida=ARQUIVO_RELATORIO_DPI):
+    """
+    Corrige o mesmo PDF (gabarito + alunos) em cada DPI e compara as respostas com as do maior DPI.
+    Mostra e salva em CSV a concordância, o tempo por página e a memória por página, para
+    encontrar o menor DPI que mantém a precisão.
+    """
+    dpis = sorted(dpis, reverse=True)
+    nome_base = os.path.splitext(os.path.basename(caminho_pdf))[0]
+    base = None
+    linhas = []
+
+    for dpi in dpis:
+        bytes_pagina = []
+
+        def paginas():
+            for numero, pagina in rasterizar_pdf(caminho_pdf, dpi=dpi):
+                imagem = np.asarray(pagina)
+                bytes_pagina.append(imagem.nbytes)
+                yield nome_base, f"{nome_base}_p{numero}", imagem
+
+        inicio = time.perf_counter()
+        # Diagnóstico: o template de cada DPI não substitui o layout_bolinhas.json da correção
+        gabarito, resultados = corrigir_lote(paginas(), dpi=dpi, caminho_layout=None)
+        duracao = time.perf_counter() - inicio
+
+        respostas = np.array([gabarito] + [r for _, _, r in resultados])
+        if base is None:
+            base = respostas
+        concordancia = (respostas == base).mean() * 100 if respostas.shape == base.shape else float("nan")
+        linhas.append({
+            "dpi": dpi,
+            "paginas": len(bytes_pagina),
+            "concordancia_%": round(concordancia, 2),
+            "questoes_Z": int((respostas == "Z").sum()),
+            "ms_por_pagina": round(duracao / max(len(bytes_pagina), 1) * 1000, 1),
+            "MB_por_pagina": round(np.mean(bytes_pagina) / 1e6, 2) if bytes_pagina else 0,
+        })
+
+    print(f"\n📏 Precisão x DPI (referência: {dpis[0]} dpi)")
+    print(f"{'DPI':>5} {'Páginas':>8} {'Concord. %':>11} {'Z':>5} {'ms/pág':>8} {'MB/pág':>7}")
+    for l in linhas:
+        print(f"{l['dpi']:>5} {l['paginas']:>8} {l['concordancia_%']:>11} {l['questoes_Z']:>5} {l['ms_por_pagina']:>8} {l['MB_por_pagina']:>7}")
+
+    with open(caminho_saida, mode='w', newline='', encoding='utf-8') as file:
+        writer = csv.DictWriter(file, fieldnames=list(linhas[0].keys()))
+        writer.writeheader()
+        writer.writerows(linhas)
+    print(f"✅ Relatório de DPI salvo em '{caminho_saida}'.")
+    return linhas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Corretor automático de gabaritos")
+    parser.add_argument("--relatorio-dpi", metavar="PDF",
+                        help="compara a precisão da correção deste PDF em vários DPIs")
+    parser.add_argument("--dpis", default="150,120,100,75",
+                        help="DPIs testados no relatório, separados por vírgula")
+    parser.add_argument("--sem-cache", action="store_true",
+                        help="ignora o cache e corrige todas as páginas de novo")
+    parser.add_argument("--instrumentar", action="store_true",
+                        help="mede o tempo de cada etapa e página e salva um trace em JSON lines")
+    args = parser.parse_args()
+    instrumentacao.ativar(INSTRUMENTAR_CORRECAO or args.instrumentar)
+
+    if args.relatorio_dpi:
+        relatorio_dpi(args.relatorio_dpi, [int(d) for d in args.dpis.split(",")])
+        return
+
+    preenchimentos = []
+    gabarito, resultados = corrigir_pasta(usar_cache=USAR_CACHE_CORRECAO and not args.sem_cache,
+                                          preenchimentos=preenchimentos)
+
+    for idx, (nome, pagina, respostas) in enumerate(resultados, start=1):
+        print(f"\n🔍 Aluno {idx} → {pagina}")
+        if len(respostas) != 60:
+            print(f"⚠️ Alerta: Aluno {idx} teve {len(respostas)} respostas detectadas (esperado: 60)")
+        else:
+            print(f"✅ Aluno {idx}: 60 respostas detectadas.")
+
+    with etapa("salvar_respostas"):
+        salvar_csv(gabarito, [respostas for _, _, respostas in resultados])
+        salvar_matriz(gabarito, resultados)  # depois do CSV: a matriz só é preferida se não for mais antiga
+        salvar_preenchimentos(preenchimentos, resultados)
+    _, situacoes = aplicar_regras(np.stack(preenchimentos))
+    print(f"🔎 Questões para revisar: {resumir_situacoes(situacoes)} (detalhes com `python recorrecao.py`).")
+
+    if instrumentacao.esta_ativo():
+        instrumentacao.imprimir_resumo()
+        instrumentacao.salvar_trace(ARQUIVO_TRACE_CORRECAO)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+import os
+import csv
+import argparse
+import numpy as np
+import cv2
+from PIL import Image
+from config import BLOCO_QUESTOES, DPI_REFERENCIA
+
+ALTERNATIVAS = ["A", "B", "C", "D", "E"]
+
+# Pasta padrão dos lotes sintéticos (fora do controle de versão)
+PASTA_SINTETICOS = 'sinteticos'
+
+# --- Geração de folhas de resposta sintéticas ---
+# As folhas seguem o layout real: 60 questões em 15 linhas × 4 colunas (colunas primeiro),
+# 5 bolinhas por questão, dentro de BLOCO_QUESTOES. Servem para medir velocidade e precisão
+# do corretor sem usar provas reais (que são confidenciais).
+
+def sortear_marcacoes(rng, prob_branco=0.0, prob_dupla=0.0, prob_parcial=0.0):
+    """
+    Sorteia as marcações de uma folha. Devolve uma lista de 60 tuplas (alternativas marcadas, parcial),
+    em que `alternativas marcadas` é uma lista de índices (vazia = em branco, 2 = marcação dupla).
+    """
+    marcacoes = []
+    for _ in range(60):
+        sorteio = rng.random()
+        if sorteio < prob_branco:
+            marcacoes.append(([], False))
+        elif sorteio < prob_branco + prob_dupla:
+            marcacoes.append((sorted(rng.choice(5, size=2, replace=False).tolist()), False))
+        else:
+            marcacoes.append(([int(rng.integers(5))], bool(rng.random() < prob_parcial)))
+    return marcacoes
+
+
+def resposta_real(marcacao):
+    """Texto da resposta verdadeira: '' (em branco), uma letra ou várias letras (marcação dupla)."""
+    alternativas, _ = marcacao
+    return "".join(ALTERNATIVAS[i] for i in alternativas)
+
+
+def gerar_folha(marcacoes, rng, dpi=DPI_REFERENCIA, ruido=0.0, inclinacao=0.0, deslocamento=0):
+    """
+    Desenha uma folha em tons de cinza com as `marcacoes` (ver `sortear_marcacoes`).
+    `ruido` é o desvio padrão do ruído gaussiano (fração de 255), `inclinacao` a rotação máxima
+    em graus e `deslocamento` o deslocamento máximo em pixels (na resolução de referência).
+    """
+    fator = dpi / DPI_REFERENCIA
+    x1, y1, x2, y2 = [round(c * fator) for c in BLOCO_QUESTOES]
+    largura_pagina, altura_pagina = x2 + x1, y2 + round(420 * fator)
+    folha = np.full((altura_pagina, largura_pagina), 255, dtype=np.uint8)
+
+    cv2.putText(folha, "CURSINHO INSPER - FOLHA DE RESPOSTAS", (x1, round(400 * fator)),
+                cv2.FONT_HERSHEY_SIMPLEX, 2.5 * fator, 0, max(1, round(5 * fator)))
+    cv2.putText(folha, "NOME: ______________________________", (x1, round(800 * fator)),
+                cv2.FONT_HERSHEY_SIMPLEX, 2 * fator, 0, max(1, round(4 * fator)))
+
+    altura = (y2 - y1) // 15
+    largura = (x2 - x1) // 4
+    raio = round(largura * 0.052)
+    espessura = max(1, round(5 * fator))
+
+    questao = 0
+    for coluna in range(4):
+        for linha in range(15):
+            cy = y1 + linha * altura + altura // 2
+            x_celula = x1 + coluna * largura
+            cv2.putText(folha, f"{questao + 1:02d}", (x_celula + round(largura * 0.02), cy + round(15 * fator)),
+                        cv2.FONT_HERSHEY_SIMPLEX, 1.4 * fator, 0, espessura)
+
+            alternativas, parcial = marcacoes[questao]
+            for k in range(5):
+                cx = x_celula + round(largura * (0.25 + 0.15 * k))
+                cv2.circle(folha, (cx, cy), raio, 0, espessura)
+                if k in alternativas:
+                    if parcial:
+                        # Marcação fraca: preenche só o miolo da bolinha
+                        cv2.circle(folha, (cx, cy), round(raio * 0.6), 0, -1)
+                    else:
+                        cv2.circle(folha, (cx, cy), raio, 0, -1)
+            questao += 1
+
+    if inclinacao or deslocamento:
+        angulo = rng.uniform(-inclinacao, inclinacao)
+        M = cv2.getRotationMatrix2D((largura_pagina / 2, altura_pagina / 2), angulo, 1.0)
+        M[:, 2] += rng.uniform(-deslocamento, deslocamento, size=2) * fator
+        folha = cv2.warpAffine(folha, M, (largura_pagina, altura_pagina), borderValue=255)
+
+    if ruido:
+        folha = np.clip(folha + rng.normal(0, ruido * 255, folha.shape), 0, 255).astype(np.uint8)
+
+    return folha
+
+
+def gerar_lote(num_alunos, semente=0, dpi=DPI_REFERENCIA, ruido=0.0, inclinacao=0.0, deslocamento=0,
+               prob_branco=0.0, prob_dupla=0.0, prob_parcial=0.0):
+    """
+    Gera o gabarito (primeira folha, sem ruído nem marcações ambíguas) e `num_alunos` folhas.
+    Devolve (folhas, respostas_reais), com as respostas verdadeiras de cada folha.
+    """
+    rng = np.random.default_rng(semente)
+    marcacoes_gabarito = sortear_marcacoes(rng)
+    folhas = [gerar_folha(marcacoes_gabarito, rng, dpi)]
+    respostas_reais = [[resposta_real(m) for m in marcacoes_gabarito]]
+
+    for _ in range(num_alunos):
+        marcacoes = sortear_marcacoes(rng, prob_branco, prob_dupla, prob_parcial)
+        folhas.append(gerar_folha(marcacoes, rng, dpi, ruido, inclinacao, deslocamento))
+        respostas_reais.append([resposta_real(m) for m in marcacoes])
+
+    return folhas, respostas_reais
+
+
+def salvar_lote(folhas, respostas_reais, pasta=PASTA_SINTETICOS, nome='lote_sintetico', dpi=DPI_REFERENCIA):
+    """Salva as folhas num PDF de várias páginas e as respostas verdadeiras num CSV no formato do respostas.csv."""
+    os.makedirs(pasta, exist_ok=True)
+    caminho_pdf = os.path.join(pasta, f"{nome}.pdf")
+    imagens = [Image.fromarray(folha) for folha in folhas]
+    # Com resolution=dpi, rasterizar o PDF nesse DPI devolve exatamente os pixels desenhados
+    imagens[0].save(caminho_pdf, save_all=True, append_images=imagens[1:], resolution=dpi)
+
+    caminho_csv = os.path.join(pasta, f"{nome}_respostas_reais.csv")
+    with open(caminho_csv, mode='w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow([f"{i+1}" for i in range(60)])
+        writer.writerows(respostas_reais)
+
+    print(f"✅ {len(folhas)} folhas sintéticas salvas em '{caminho_pdf}' (respostas em '{caminho_csv}').")
+    return caminho_pdf, caminho_csv
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera folhas de resposta sintéticas no layout real")
+    parser.add_argument("--alunos", type=int, default=30, help="número de folhas de alunos")
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--dpi", type=int, default=DPI_REFERENCIA)
+    parser.add_argument("--ruido", type=float, default=0.05, help="desvio do ruído gaussiano (fração de 255)")
+    parser.add_argument("--inclinacao", type=float, default=1.0, help="rotação máxima em graus")
+    parser.add_argument("--deslocamento", type=int, default=30, help="deslocamento máximo em pixels")
+    parser.add_argument("--branco", type=float, default=0.02, help="probabilidade de questão em branco")
+    parser.add_argument("--dupla", type=float, default=0.02, help="probabilidade de marcação dupla")
+    parser.add_argument("--parcial", type=float, default=0.05, help="probabilidade de marcação parcial")
+    parser.add_argument("--pasta", default=PASTA_SINTETICOS)
+    args = parser.parse_args()
+
+    folhas, respostas_reais = gerar_lote(args.alunos, args.semente, args.dpi, args.ruido, args.inclinacao,
+                                         args.deslocamento, args.branco, args.dupla, args.parcial)
+    salvar_lote(folhas, respostas_reais, args.pasta, dpi=args.dpi)
@@ -0,0 +1,109 @@
+import re
+import numpy as np
+import pandas as pd
+from cache_planilhas import ler_planilha
+
+# --- Versões da prova, pesos e questões anuladas ---
+# A aba 'Gabaritos' da planilha final é opcional. Ela tem uma linha por questão, na numeração padrão
+# (a mesma do mapeamento de matérias), com o cabeçalho na linha 5, como a aba 'Materias':
+#   Questão | Peso | Anulada | Gabarito A | Posição A | Gabarito B | Posição B | ...
+# - 'Peso' (padrão 1) e 'Anulada' ('Sim'/'X'; anulada conta como certa para todos) valem para todas as versões;
+# - 'Gabarito <tipo>' é a resposta certa da questão na versão <tipo>;
+# - 'Posição <tipo>' (opcional) é o número que a questão recebe na folha da versão <tipo>, nas provas embaralhadas.
+# Sem colunas 'Gabarito <tipo>', vale o gabarito lido pelo corretor (uma versão só), com os pesos e anulações.
+# A versão de cada aluno vem da coluna COLUNA_TIPO_PROVA_SOCIO da planilha socioeconômica.
+
+VALORES_ANULADA = {"SIM", "S", "X", "1", "TRUE", "VERDADEIRO", "ANULADA"}
+
+
+def _tipo(valor):
+    """'Tipo B', ' b ' e 'B' → 'B'. Vazio → ''."""
+    if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+        return ""
+    return re.sub(r"^TIPO\s*", "", str(valor).strip().upper()).strip()
+
+
+def _marcada(valor):
+    """Interpreta a coluna 'Anulada': 'Sim', 'X', 1, VERDADEIRO... contam como anulada."""
+    if isinstance(valor, (bool, np.bool_, int, float, np.number)) and not pd.isna(valor):
+        return bool(valor)
+    return isinstance(valor, str) and valor.strip().upper() in VALORES_ANULADA
+
+
+def _letra(valor):
+    return np.nan if pd.isna(valor) else str(valor).strip().upper()
+
+
+def ler_gabaritos(caminho_excel, nome_planilha, gabarito_padrao, numeros_questoes):
+    """
+    Lê a aba de gabaritos e devolve a tabela usada por `pontuacao.pontuar_versoes`:
+    {'tipos': [tipo, ...], 'chaves': (versões × questões) com as letras, 'posicoes': (versões × questões) com o índice
+    da coluna de cada questão na folha da versão, 'pesos': (questões,), 'anuladas': (questões,) booleano},
+    tudo na ordem de `numeros_questoes`. Devolve None se a aba não existir; levanta ValueError se ela estiver
+    incompleta.
+    """
+    try:
+        df = ler_planilha(caminho_excel, nome_planilha, header=4)
+    except ValueError:
+        return None  # aba inexistente: uma versão, pesos iguais
+
+    if "Questão" not in df.columns:
+        raise ValueError(f"a aba '{nome_planilha}' precisa de uma coluna 'Questão'")
+    df = df[pd.to_numeric(df["Questão"], errors="coerce").notna()].copy()
+    df.index = df["Questão"].astype(int)
+    if df.index.duplicated().any():
+        raise ValueError(f"a aba '{nome_planilha}' repete as questões {sorted(set(df.index[df.index.duplicated()]))}")
+    total = len(numeros_questoes)
+
+    pesos = np.ones(total)
+    if "Peso" in df.columns:
+        pesos = pd.to_numeric(df["Peso"], errors="coerce").reindex(numeros_questoes).fillna(1).to_numpy(dtype=float)
+    anuladas = np.zeros(total, dtype=bool)
+    if "Anulada" in df.columns:
+        anuladas = df["Anulada"].reindex(numeros_questoes).map(_marcada).to_numpy(dtype=bool)
+    if pesos.sum() <= 0:
+        raise ValueError(f"os pesos da aba '{nome_planilha}' somam zero")
+
+    colunas_gabarito = {_tipo(str(c)[len("Gabarito "):]): c for c in df.columns if str(c).startswith("Gabarito ")}
+    colunas_posicao = {_tipo(str(c)[len("Posição "):]): c for c in df.columns if str(c).startswith("Posição ")}
+    tipos = list(colunas_gabarito)
+    if not tipos:
+        chaves = np.asarray(gabarito_padrao, dtype=object)[np.newaxis, :]
+        return {"tipos": [""], "chaves": chaves, "posicoes": np.arange(total)[np.newaxis, :],
+                "pesos": pesos, "anuladas": anuladas}
+
+    faltando = [q for q in numeros_questoes if q not in df.index]
+    if faltando:
+        raise ValueError(f"a aba '{nome_planilha}' não tem as questões {faltando[:10]}")
+    chaves, posicoes = [], []
+    coluna_da_questao = {numero: j for j, numero in enumerate(numeros_questoes)}
+    for tipo in tipos:
+        chave = df[colunas_gabarito[tipo]].reindex(numeros_questoes).map(_letra)
+        chaves.append(chave.to_numpy(dtype=object))
+        coluna_posicao = colunas_posicao.get(tipo)
+        if coluna_posicao is None:
+            posicoes.append(np.arange(total))
+            continue
+        posicao = pd.to_numeric(df[coluna_posicao].reindex(numeros_questoes), errors="coerce")
+        if posicao.isna().any() or sorted(posicao.astype(int)) != sorted(numeros_questoes):
+            raise ValueError(f"a coluna '{coluna_posicao}' precisa trazer cada número de questão exatamente uma vez")
+        posicoes.append(np.array([coluna_da_questao[int(p)] for p in posicao]))
+
+    return {"tipos": tipos, "chaves": np.array(chaves, dtype=object), "posicoes": np.array(posicoes, dtype=np.intp),
+            "pesos": pesos, "anuladas": anuladas}
+
+
+def versoes_alunos(tabela, nomes, tipos_por_nome):
+    """
+    Índice da versão (em `tabela['tipos']`) de cada aluno, na ordem de `nomes`, a partir de {nome: tipo}.
+    Alunos sem tipo ou com um tipo que não está na tabela ficam com a primeira versão; com mais de uma
+    versão, eles são avisados.
+    """
+    indice = {tipo: k for k, tipo in enumerate(tabela["tipos"])}
+    tipos = pd.Series([tipos_por_nome.get(nome, "") for nome in nomes], dtype=object).map(_tipo)
+    versoes = tipos.map(indice)
+    if len(tabela["tipos"]) > 1 and versoes.isna().any():
+        sem_versao = versoes.isna()
+        print(f"⚠️ {int(sem_versao.sum())} alunos sem tipo de prova válido receberam o gabarito do tipo "
+              f"'{tabela['tipos'][0]}'.")
+    return versoes.fillna(0).to_numpy(dtype=np.intp)
@@ -1,15 +1,102 @@
 import os
+import io
+import re
 from fpdf import FPDF # type: ignore
 from fpdf.enums import XPos, YPos # type: ignore
 from datetime import datetime
-from config import PASTA_ANALISES
+from config import PASTA_ANALISES, FORMATO_GRAFICOS_RELATORIO, DPI_GRAFICOS_RELATORIO, QUALIDADE_JPEG_RELATORIO
+
+# --- Gráficos em memória ---
+
+# Acima deste número de marcadores/vértices, um gráfico 'svg' é embutido como 'png'
+MAX_PONTOS_SVG = 5000
+# Subpasta, ao lado de cada PNG das análises, com a versão do gráfico já convertida para o relatório: um relatório
+# montado a partir do disco (análises reaproveitadas do cache ou `gerar_relatorio.py` sozinho) fica igual ao gerado
+# com os gráficos em memória
+SUBPASTA_RELATORIO = '.relatorio'
+
+def _pontos_na_figura(figura):
+    """Conta os marcadores e vértices desenhados na figura (pontos de scatter/stripplot e linhas)."""
+    total = 0
+    for eixo in figura.axes:
+        total += sum(len(colecao.get_offsets()) for colecao in eixo.collections)
+        total += sum(len(linha.get_xydata()) for linha in eixo.lines)
+    return total
+
+def renderizar_png(figura, dpi=DPI_GRAFICOS_RELATORIO):
+    """Renderiza a figura uma vez em PNG (bytes), em `dpi`."""
+    buffer = io.BytesIO()
+    figura.savefig(buffer, format='png', dpi=dpi)
+    return buffer.getvalue()
+
+
+def compactar_png(png, formato=FORMATO_GRAFICOS_RELATORIO, qualidade=QUALIDADE_JPEG_RELATORIO):
+    """
+    Converte um PNG já renderizado para o relatório, sem renderizar a figura de novo: 'jpeg' com a `qualidade`
+    dada e os demais formatos em PNG com paleta de 256 cores.
+    """
+    from PIL import Image
+    imagem = Image.open(io.BytesIO(png)).convert('RGB')
+    saida = io.BytesIO()
+    if formato == 'jpeg':
+        imagem.save(saida, 'JPEG', quality=qualidade, optimize=True)
+    else:
+        imagem.quantize(256).save(saida, 'PNG', optimize=True)
+    saida.seek(0)
+    return saida
+
+
+def _usar_svg(figura, formato):
+    # Nuvens de pontos grandes ficam pesadas demais como vetor e vão como 'png'
+    return formato == 'svg' and _pontos_na_figura(figura) <= MAX_PONTOS_SVG
+
+
+def _renderizar_svg(figura):
+    buffer = io.BytesIO()
+    figura.savefig(buffer, format='svg')
+    # O fpdf2 não interpreta <metadata>; removê-la evita um aviso por gráfico
+    return io.BytesIO(re.sub(rb'<metadata>.*?</metadata>', b'', buffer.getvalue(), flags=re.S))
+
+
+def figura_para_buffer(figura, formato=FORMATO_GRAFICOS_RELATORIO, dpi=DPI_GRAFICOS_RELATORIO,
+                       qualidade=QUALIDADE_JPEG_RELATORIO, png=None):
+    """
+    Converte uma figura do matplotlib num buffer pronto para o PDF, sem passar pelo disco:
+    'svg' embute o gráfico como vetor (nítido em qualquer impressão e geralmente o menor arquivo; gráficos
+    com mais de MAX_PONTOS_SVG pontos usam 'png'),
+    'png' rasteriza em `dpi` com paleta de 256 cores e 'jpeg' rasteriza em `dpi` com a `qualidade` dada.
+    Com `png` (bytes de `renderizar_png`), os formatos rasterizados reaproveitam essa renderização.
+    """
+    if _usar_svg(figura, formato):
+        return _renderizar_svg(figura)
+    return compactar_png(png if png is not None else renderizar_png(figura, dpi), formato, qualidade)
+
+def caminho_versao_relatorio(caminho_imagem):
+    """Onde `analise_resultados.salvar_figura` grava a versão para o relatório do gráfico `caminho_imagem`."""
+    return os.path.join(os.path.dirname(caminho_imagem), SUBPASTA_RELATORIO, os.path.basename(caminho_imagem))
+
+
+def ler_imagem_relatorio(caminho_imagem):
+    """
+    Buffer pronto para o PDF de um gráfico em disco: a versão para o relatório, se existir e não for mais antiga que
+    o PNG; senão, o próprio PNG convertido por `compactar_png`.
+    """
+    versao = caminho_versao_relatorio(caminho_imagem)
+    if os.path.exists(versao) and os.path.getmtime(versao) >= os.path.getmtime(caminho_imagem):
+        with open(versao, 'rb') as f:
+            return io.BytesIO(f.read())
+    with open(caminho_imagem, 'rb') as f:
+        return compactar_png(f.read())
 
 # --- Classe para o Relatório em PDF (com API moderna) ---
 class PDF(FPDF):
+    # Texto do cabeçalho; subclasses (ex.: `boletins.Boletim`) podem trocá-lo
+    titulo = 'Relatório de Análise de Provas do Cursinho Insper'
+
     def header(self):
         """Define o cabeçalho do PDF, que aparece em todas as páginas."""
         self.set_font('Helvetica', 'B', 12)
-        self.cell(0, 10, 'Relatório de Análise de Provas do Cursinho Insper', align='C', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+        self.cell(0, 10, self.titulo, align='C', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
         self.ln(10)
 
     def footer(self):
@@ -24,8 +111,12 @@ class PDF(FPDF):
         self.cell(0, 10, title, new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='L')
         self.ln(5)
 
-    def chapter_body(self, text_file_path=None, image_path=None, intro_text=""):
-        """Adiciona o corpo do capítulo, com texto introdutório, lendo de arquivos de texto e/ou imagem."""
+    def chapter_body(self, text_file_path=None, image_path=None, intro_text="", image=None):
+        """
+        Adiciona o corpo do capítulo, com texto introdutório, lendo de arquivos de texto e/ou imagem.
+        `image` (buffer, bytes ou figura do matplotlib) tem prioridade sobre `image_path` e evita ler o disco;
+        `image_path` é lido por `ler_imagem_relatorio`, no mesmo formato dos gráficos em memória.
+        """
         if intro_text:
             self.set_font('Helvetica', '', 12)
             self.multi_cell(0, 10, intro_text)
@@ -38,18 +129,27 @@ class PDF(FPDF):
             self.multi_cell(0, 8, text)
             self.ln()
 
-        if image_path and os.path.exists(image_path):
+        if image is None and image_path and os.path.exists(image_path):
+            image = ler_imagem_relatorio(image_path)
+        if image is not None:
+            if hasattr(image, 'savefig'):
+                image = figura_para_buffer(image)
+            elif isinstance(image, bytes):
+                image = io.BytesIO(image)
             # A centralização da imagem é feita calculando a posição x
             image_width = self.w - 40 # Largura da imagem
             x_position = (self.w - image_width) / 2
-            self.image(image_path, x=x_position, w=image_width)
+            self.image(image, x=x_position, w=image_width)
             self.ln(5)
             
 # --- Função Principal para Gerar o Relatório ---
-def criar_pdf_consolidado():
+def criar_pdf_consolidado(figuras=None, caminho_pdf='Relatorio_Final.pdf'):
     """
     Lê os arquivos da pasta 'analises' e os compila em um único relatório PDF.
+    `figuras` ({nome do arquivo: buffer}, ver `analise_resultados.executar_analises`) traz os gráficos já
+    em memória; os que não estiverem nele são lidos da pasta.
     """
+    figuras = figuras or {}
     print("📄 Iniciando a criação do relatório em PDF (versão atualizada)...")
     
     if not os.path.exists(PASTA_ANALISES):
@@ -77,7 +177,8 @@ def criar_pdf_consolidado():
             "que ilustra a distribuição das notas finais (em porcentagem de acertos)."
         ),
         text_file_path=os.path.join(PASTA_ANALISES, 'estatisticas_gerais.txt'),
-        image_path=os.path.join(PASTA_ANALISES, 'distribuicao_notas.png')
+        image_path=os.path.join(PASTA_ANALISES, 'distribuicao_notas.png'),
+        image=figuras.get('distribuicao_notas.png')
     )
     
     # --- Capítulo 2: Desempenho por Matéria ---
@@ -90,7 +191,8 @@ def criar_pdf_consolidado():
             "A linha no meio da caixa é a mediana. Isso ajuda a identificar matérias com maior ou menor "
             "desempenho geral e a variabilidade dos resultados."
         ),
-        image_path=os.path.join(PASTA_ANALISES, 'boxplot_desempenho_por_materia.png')
+        image_path=os.path.join(PASTA_ANALISES, 'boxplot_desempenho_por_materia.png'),
+        image=figuras.get('boxplot_desempenho_por_materia.png')
     )
 
     # --- Capítulo 3: Dificuldade das Questões ---
@@ -104,72 +206,95 @@ def criar_pdf_consolidado():
             "mais difícil para a mais fácil."
         ),
         text_file_path=os.path.join(PASTA_ANALISES, 'dificuldade_questoes.txt'),
-        image_path=os.path.join(PASTA_ANALISES, 'dificuldade_questoes.png')
+        image_path=os.path.join(PASTA_ANALISES, 'dificuldade_questoes.png'),
+        image=figuras.get('dificuldade_questoes.png')
+    )
+
+    # --- Capítulo 4: Análise de Itens ---
+    pdf.add_page()
+    pdf.chapter_title('4. Análise de Itens')
+    pdf.chapter_body(
+        intro_text=(
+            "Além do percentual de acerto, cada questão é avaliada pela sua capacidade de separar os alunos "
+            "de melhor e de pior desempenho. O índice de discriminação compara o acerto dos 27% de maior nota "
+            "com o dos 27% de menor nota (abaixo de 0,20 a questão discrimina pouco), e a correlação "
+            "ponto-bisserial mede a relação entre acertar a questão e a nota total. Também são destacadas as "
+            "questões em que uma alternativa errada atraiu mais os melhores alunos do que a correta, um sinal "
+            "de enunciado ambíguo ou gabarito incorreto. A tabela completa, com o percentual de cada "
+            "alternativa, está em 'analise_itens.csv'."
+        ),
+        text_file_path=os.path.join(PASTA_ANALISES, 'analise_itens.txt'),
+        image_path=os.path.join(PASTA_ANALISES, 'analise_itens.png'),
+        image=figuras.get('analise_itens.png')
     )
 
     # --- INÍCIO DAS NOVAS ANÁLISES SOCIOECONÔMICAS ---
 
-    # --- Capítulo 4: Desempenho por Faixa Salarial ---
+    # --- Capítulo 5: Desempenho por Faixa Salarial ---
     pdf.add_page()
-    pdf.chapter_title('4. Desempenho por Faixa Salarial Familiar')
+    pdf.chapter_title('5. Desempenho por Faixa Salarial Familiar')
     pdf.chapter_body(
         intro_text=(
             "Esta análise investiga se há uma relação entre a renda familiar dos alunos e seu desempenho na prova. "
             "O gráfico de boxplot abaixo compara a distribuição das notas para cada faixa salarial, permitindo "
             "observar tendências e a variabilidade dos resultados entre os diferentes grupos."
         ),
-        image_path=os.path.join(PASTA_ANALISES, 'desempenho_por_faixa_salarial.png')
+        image_path=os.path.join(PASTA_ANALISES, 'desempenho_por_faixa_salarial.png'),
+        image=figuras.get('desempenho_por_faixa_salarial.png')
     )
 
-    # --- Capítulo 5: Desempenho por Faixa Etária ---
+    # --- Capítulo 6: Desempenho por Faixa Etária ---
     pdf.add_page()
-    pdf.chapter_title('5. Desempenho por Faixa Etária')
+    pdf.chapter_title('6. Desempenho por Faixa Etária')
     pdf.chapter_body(
         intro_text=(
             "A seguir, o desempenho dos alunos é agrupado por faixa etária. Este gráfico de boxplot "
             "ajuda a entender se a idade dos candidatos tem alguma correlação com as notas obtidas no vestibulinho."
         ),
-        image_path=os.path.join(PASTA_ANALISES, 'desempenho_por_faixa_etaria.png')
+        image_path=os.path.join(PASTA_ANALISES, 'desempenho_por_faixa_etaria.png'),
+        image=figuras.get('desempenho_por_faixa_etaria.png')
     )
 
-    # --- Capítulo 6: Desempenho por Região Geográfica ---
+    # --- Capítulo 7: Desempenho por Região Geográfica ---
     pdf.add_page()
-    pdf.chapter_title('6. Desempenho por Região Geográfica')
+    pdf.chapter_title('7. Desempenho por Região Geográfica')
     pdf.chapter_body(
         intro_text=(
             "Analisamos aqui se a região de residência do aluno influencia seu desempenho. As principais "
             "zonas da cidade são comparadas, e as demais localidades foram agrupadas na categoria 'Outros' "
             "para uma visualização mais clara e focada."
         ),
-        image_path=os.path.join(PASTA_ANALISES, 'desempenho_por_regiao.png')
+        image_path=os.path.join(PASTA_ANALISES, 'desempenho_por_regiao.png'),
+        image=figuras.get('desempenho_por_regiao.png')
     )
 
-    # --- Capítulo 7: Desempenho por Meio de Locomoção ---
+    # --- Capítulo 8: Desempenho por Meio de Locomoção ---
     pdf.add_page()
-    pdf.chapter_title('7. Desempenho por Meio de Locomoção')
+    pdf.chapter_title('8. Desempenho por Meio de Locomoção')
     pdf.chapter_body(
         intro_text=(
             "Esta seção explora a relação entre o meio de transporte utilizado pelo aluno para chegar ao "
             "cursinho e seu desempenho. O gráfico compara a distribuição de notas entre os diferentes meios de locomoção."
         ),
-        image_path=os.path.join(PASTA_ANALISES, 'desempenho_por_locomocao.png')
+        image_path=os.path.join(PASTA_ANALISES, 'desempenho_por_locomocao.png'),
+        image=figuras.get('desempenho_por_locomocao.png')
     )
 
-    # --- Capítulo 8: Correlação Nota vs. Distância ---
+    # --- Capítulo 9: Correlação Nota vs. Distância ---
     pdf.add_page()
-    pdf.chapter_title('8. Correlação entre Nota e Distância da Residência')
+    pdf.chapter_title('9. Correlação entre Nota e Distância da Residência')
     pdf.chapter_body(
         intro_text=(
             "Este gráfico de dispersão investiga se existe uma correlação entre a distância (em km) que o aluno "
             "percorre de casa até o Insper e sua nota. A linha de regressão indica a tendência geral dos dados: "
             "uma linha plana, como a observada, sugere que não há uma correlação forte entre as duas variáveis."
         ),
-        image_path=os.path.join(PASTA_ANALISES, 'correlacao_distancia_nota.png')
+        image_path=os.path.join(PASTA_ANALISES, 'correlacao_distancia_nota.png'),
+        image=figuras.get('correlacao_distancia_nota.png')
     )
     
     # --- FIM DAS NOVAS ANÁLISES ---
 
-    caminho_pdf = os.path.join('Relatorio_Final.pdf')
     try:
         pdf.output(caminho_pdf)
         print(f"✅ Relatório em PDF gerado com sucesso!")
@@ -0,0 +1,122 @@
+import os
+import json
+import time
+import contextlib
+from collections import defaultdict
+
+# --- Instrumentação da correção ---
+# Registra o tempo de parede e o número de chamadas de cada etapa (rasterização, recorte, contornos,
+# pontuação...) por página, além de contadores de anomalias (questões Z, bolinhas por questão).
+# Desligada, `etapa` devolve um contexto nulo compartilhado e `contar` retorna na hora, então o custo
+# fica restrito a uma checagem de booleano por chamada.
+
+_ativo = False
+_eventos = []
+_pagina_atual = None
+_NULO = contextlib.nullcontext()
+
+
+def ativar(ativo=True):
+    """Liga (ou desliga) a coleta de eventos neste processo."""
+    global _ativo
+    _ativo = ativo
+
+
+def esta_ativo():
+    return _ativo
+
+
+@contextlib.contextmanager
+def _medir(nome):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        _eventos.append({"etapa": nome, "pagina": _pagina_atual, "ms": (time.perf_counter() - inicio) * 1000,
+                         "pid": os.getpid()})
+
+
+def etapa(nome):
+    """Contexto que mede o tempo de parede de uma etapa (`with etapa('contornos'): ...`)."""
+    return _medir(nome) if _ativo else _NULO
+
+
+@contextlib.contextmanager
+def _medir_pagina(nome):
+    global _pagina_atual
+    anterior, _pagina_atual = _pagina_atual, nome
+    try:
+        with _medir("pagina"):
+            yield
+    finally:
+        _pagina_atual = anterior
+
+
+def pagina(nome):
+    """Contexto que mede a página inteira e associa a ela as etapas e contadores registrados dentro dele."""
+    return _medir_pagina(nome) if _ativo else _NULO
+
+
+def contar(nome, quantidade=1):
+    """Soma `quantidade` ao contador `nome` da página atual."""
+    if _ativo:
+        _eventos.append({"contador": nome, "pagina": _pagina_atual, "valor": quantidade})
+
+
+def coletar():
+    """Devolve e esvazia os eventos deste processo (usado para enviar os eventos dos workers ao processo principal)."""
+    eventos = _eventos[:]
+    _eventos.clear()
+    return eventos
+
+
+def registrar(eventos):
+    """Acrescenta eventos vindos de outro processo."""
+    _eventos.extend(eventos)
+
+
+def salvar_trace(caminho, eventos=None):
+    """Grava os eventos em JSON lines (um evento por linha)."""
+    eventos = _eventos if eventos is None else eventos
+    pasta = os.path.dirname(caminho)
+    if pasta:
+        os.makedirs(pasta, exist_ok=True)
+    with open(caminho, 'w', encoding='utf-8') as f:
+        for evento in eventos:
+            f.write(json.dumps(evento, ensure_ascii=False) + "\n")
+    print(f"✅ Trace da correção salvo em '{caminho}' ({len(eventos)} eventos).")
+
+
+def resumir(eventos=None):
+    """
+    Agrega os eventos em (etapas, contadores): etapas[nome] = {'chamadas', 'total_ms', 'max_ms'} e
+    contadores[nome] = soma dos valores.
+    """
+    eventos = _eventos if eventos is None else eventos
+    etapas = defaultdict(lambda: {"chamadas": 0, "total_ms": 0.0, "max_ms": 0.0})
+    contadores = defaultdict(int)
+    for evento in eventos:
+        if "etapa" in evento:
+            medidas = etapas[evento["etapa"]]
+            medidas["chamadas"] += 1
+            medidas["total_ms"] += evento["ms"]
+            medidas["max_ms"] = max(medidas["max_ms"], evento["ms"])
+        else:
+            contadores[evento["contador"]] += evento["valor"]
+    return dict(etapas), dict(contadores)
+
+
+def imprimir_resumo(eventos=None):
+    """Mostra a tabela de tempo por etapa e os contadores ao fim da execução."""
+    etapas, contadores = resumir(eventos)
+    if not etapas and not contadores:
+        return
+    print("\n⏱️ Tempo por etapa")
+    print(f"{'Etapa':<22} {'Chamadas':>9} {'Total s':>9} {'Média ms':>9} {'Máx ms':>9}")
+    for nome, m in sorted(etapas.items(), key=lambda x: -x[1]["total_ms"]):
+        print(f"{nome:<22} {m['chamadas']:>9} {m['total_ms'] / 1000:>9.2f} "
+              f"{m['total_ms'] / m['chamadas']:>9.1f} {m['max_ms']:>9.1f}")
+    if contadores:
+        print("\n🔢 Contadores")
+        for nome, valor in sorted(contadores.items()):
+            print(f"{nome:<30} {valor:>9}")
@@ -0,0 +1,81 @@
+import os
+import csv
+import argparse
+import numpy as np
+from config import ARQUIVO_RESPOSTAS, ARQUIVO_MATRIZ_RESPOSTAS
+
+# --- Matriz de respostas em formato binário ---
+# As respostas ficam num .npz com uma matriz uint8 (alunos × questões) em vez de um CSV de strings:
+# 0 = vazio, 1–5 = A–E, 6 = Z (detecção incompleta ou marcação dupla). O arquivo guarda também o
+# gabarito codificado e, para cada linha, o PDF e a página de origem. Carregar é uma leitura direta de arrays, e a
+# comparação com o gabarito vira uma comparação de inteiros. O respostas.csv continua sendo gerado
+# como exportação.
+
+CODIGOS = ["", "A", "B", "C", "D", "E", "Z"]
+_CODIGO_POR_LETRA = {letra: codigo for codigo, letra in enumerate(CODIGOS)}
+
+
+def codificar(respostas):
+    """Converte uma lista de listas de letras numa matriz uint8 (letras desconhecidas viram 0)."""
+    return np.array([[_CODIGO_POR_LETRA.get(str(r), 0) for r in linha] for linha in respostas],
+                    dtype=np.uint8).reshape(len(respostas), -1)
+
+
+def decodificar(matriz):
+    """Converte a matriz uint8 de volta em letras (array de strings)."""
+    return np.array(CODIGOS, dtype=object)[matriz]
+
+
+def salvar_matriz(gabarito, resultados, caminho=ARQUIVO_MATRIZ_RESPOSTAS):
+    """
+    Salva o gabarito e as respostas dos alunos. `resultados` é a lista de (nome_base, nome_pagina, respostas)
+    devolvida pelo corretor; o nome do PDF e da página de cada linha são guardados como metadados.
+    """
+    respostas = codificar([r for _, _, r in resultados]) if resultados else np.zeros((0, len(gabarito)), np.uint8)
+    gravar_matriz({"respostas": respostas, "gabarito": codificar([gabarito])[0],
+                   "pdf": np.array([nome for nome, _, _ in resultados], dtype=str),
+                   "pagina": np.array([pagina for _, pagina, _ in resultados], dtype=str)}, caminho)
+
+
+def gravar_matriz(dados, caminho=ARQUIVO_MATRIZ_RESPOSTAS):
+    """Grava um dicionário no formato de `carregar_matriz` (respostas já codificadas)."""
+    pasta = os.path.dirname(caminho)
+    if pasta:
+        os.makedirs(pasta, exist_ok=True)
+    np.savez_compressed(caminho, **{chave: dados[chave] for chave in ("respostas", "gabarito", "pdf", "pagina")})
+    respostas = dados["respostas"]
+    print(f"✅ Matriz de respostas salva em '{caminho}' ({respostas.shape[0]} alunos × {respostas.shape[1]} questões).")
+
+
+def carregar_matriz(caminho=ARQUIVO_MATRIZ_RESPOSTAS):
+    """Lê o .npz e devolve um dicionário com 'respostas', 'gabarito' (uint8), 'pdf' e 'pagina'."""
+    with np.load(caminho) as dados:
+        return {chave: dados[chave] for chave in ("respostas", "gabarito", "pdf", "pagina")}
+
+
+def usar_matriz(caminho_matriz=ARQUIVO_MATRIZ_RESPOSTAS, caminho_csv=ARQUIVO_RESPOSTAS):
+    """
+    Indica se a matriz deve ser lida no lugar do CSV: ela precisa existir e não ser mais antiga que o CSV
+    (um CSV editado à mão depois da correção tem prioridade).
+    """
+    if not os.path.exists(caminho_matriz):
+        return False
+    return not os.path.exists(caminho_csv) or os.path.getmtime(caminho_matriz) >= os.path.getmtime(caminho_csv)
+
+
+def exportar_csv(dados, caminho=ARQUIVO_RESPOSTAS):
+    """Grava a matriz no formato do respostas.csv (cabeçalho 1..60, gabarito na primeira linha)."""
+    with open(caminho, mode='w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow([f"{i+1}" for i in range(dados["respostas"].shape[1])])
+        writer.writerow(decodificar(dados["gabarito"]))
+        writer.writerows(decodificar(dados["respostas"]))
+    print(f"✅ Respostas exportadas para '{caminho}'.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporta a matriz binária de respostas para CSV")
+    parser.add_argument("--matriz", default=ARQUIVO_MATRIZ_RESPOSTAS)
+    parser.add_argument("--csv", default=ARQUIVO_RESPOSTAS)
+    args = parser.parse_args()
+    exportar_csv(carregar_matriz(args.matriz), args.csv)
@@ -0,0 +1,74 @@
+import argparse
+import corretor
+from cache_planilhas import ler_planilha
+from matriz_respostas import salvar_matriz
+from recorrecao import salvar_preenchimentos
+from processar_provas import processar_provas, dataframe_respostas
+from analise_resultados import ler_mapeamento_materias, executar_analises
+from gerar_relatorio import criar_pdf_consolidado
+from boletins import gerar_boletins
+from config import (ARQUIVO_EXCEL, NOME_DA_PLANILHA_MATERIAS, ARQUIVO_SOCIOECONOMICO, NOME_DA_PLANILHA_SOCIO,
+                    PASTA_ANALISES, WORKERS_CORRECAO, USAR_CACHE_CORRECAO, PASTA_BOLETINS)
+
+# --- Pipeline completo em um único processo ---
+# Correção → planilha de resultados → análises → relatório, passando o gabarito, as respostas e os
+# resultados entre as etapas em memória. O respostas.csv/.npz, a planilha_final.xlsx, a pasta de análises
+# e o Relatorio_Final.pdf continuam sendo gravados, mas só como produtos finais: nenhuma etapa relê
+# o que a anterior gravou.
+
+def executar_pipeline(pasta_pdf=corretor.entrada_pdf, workers=WORKERS_CORRECAO, usar_cache=USAR_CACHE_CORRECAO,
+                      gerar_relatorio=True, destino_boletins=None):
+    """
+    Roda as quatro etapas em sequência e devolve o DataFrame de resultados (ou None se alguma etapa falhar).
+    Com `destino_boletins` (pasta ou .zip), gera também um boletim por aluno.
+    """
+    print("\n=== 1/4 Correção das folhas ===")
+    preenchimentos = []
+    gabarito, resultados = corretor.corrigir_pasta(pasta_pdf, workers=workers, usar_cache=usar_cache,
+                                                   preenchimentos=preenchimentos)
+    respostas = [r for _, _, r in resultados]
+    corretor.salvar_csv(gabarito, respostas)
+    salvar_matriz(gabarito, resultados)
+    salvar_preenchimentos(preenchimentos, resultados)
+
+    # Lidos uma única vez e compartilhados pelas etapas seguintes
+    try:
+        df_socio = ler_planilha(ARQUIVO_SOCIOECONOMICO, NOME_DA_PLANILHA_SOCIO)
+    except (FileNotFoundError, ValueError, PermissionError) as e:
+        print(f"❌ ERRO ao ler '{ARQUIVO_SOCIOECONOMICO}': {e}")
+        return None
+    mapeamento_materias = ler_mapeamento_materias(ARQUIVO_EXCEL, NOME_DA_PLANILHA_MATERIAS)
+
+    print("\n=== 2/4 Planilha de resultados ===")
+    df_resultados = processar_provas(df_respostas=dataframe_respostas(gabarito, respostas), df_socio=df_socio,
+                                     mapeamento_materias=mapeamento_materias)
+    if df_resultados is None:
+        return None
+
+    print("\n=== 3/4 Análises ===")
+    figuras = {}  # gráficos gerados nesta execução, entregues ao relatório sem reler os PNGs
+    if executar_analises(df_resultados, df_socio, mapeamento_materias, PASTA_ANALISES, figuras=figuras) is None:
+        print("❌ Análises não geradas; relatório e boletins não foram gerados para não usar gráficos antigos.")
+        return None
+
+    if gerar_relatorio:
+        print("\n=== 4/4 Relatório ===")
+        criar_pdf_consolidado(figuras)
+
+    if destino_boletins:
+        print("\n=== Boletins individuais ===")
+        gerar_boletins(df_resultados, mapeamento_materias, destino_boletins)
+    return df_resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Corrige as provas e gera planilha, análises e relatório de uma vez")
+    parser.add_argument("--workers", type=int, default=WORKERS_CORRECAO, help="processos de correção (0 = todos os núcleos)")
+    parser.add_argument("--sem-cache", action="store_true", help="ignora o cache e corrige todas as páginas de novo")
+    parser.add_argument("--sem-relatorio", action="store_true", help="não gera o Relatorio_Final.pdf")
+    parser.add_argument("--boletins", nargs="?", const=PASTA_BOLETINS, default=None, metavar="DESTINO",
+                        help="gera também um boletim por aluno (pasta ou arquivo .zip)")
+    args = parser.parse_args()
+
+    executar_pipeline(workers=args.workers, usar_cache=USAR_CACHE_CORRECAO and not args.sem_cache,
+                      gerar_relatorio=not args.sem_relatorio, destino_boletins=args.boletins)
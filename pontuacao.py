@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+
+# --- Pontuação vetorizada ---
+# Em vez de comparar aluno a aluno, questão a questão, monta uma única matriz booleana de acertos
+# (alunos × questões) contra o gabarito. Os acertos por matéria saem de um produto dessa matriz por
+# um índice questão → matéria (questões × matérias) calculado uma vez.
+# Com várias versões da prova, o gabarito de cada aluno é escolhido por indexação (`pontuar_versoes`),
+# e a turma inteira continua sendo pontuada numa única passada.
+
+def matriz_acertos(respostas, gabarito):
+    """
+    Compara as respostas (alunos × questões) com o gabarito e devolve a matriz booleana de acertos.
+    A comparação é feita sobre o texto, como `str(resposta) == str(gabarito)`.
+    """
+    respostas = np.asarray(respostas, dtype=object).astype(str)
+    gabarito = np.asarray(gabarito, dtype=object).astype(str)
+    return respostas == gabarito[np.newaxis, :]
+
+
+def indice_materias(numeros_questoes, mapeamento_materias):
+    """
+    Matriz (questões × matérias) com 1 onde a questão pertence à matéria e o total de questões de cada
+    matéria segundo o mapeamento (o denominador do percentual).
+    """
+    posicao = {numero: j for j, numero in enumerate(numeros_questoes)}
+    indice = np.zeros((len(numeros_questoes), len(mapeamento_materias)), dtype=np.int32)
+    for k, questoes in enumerate(mapeamento_materias.values()):
+        linhas = [posicao[q] for q in questoes if q in posicao]
+        indice[linhas, k] = 1
+    totais = np.array([len(questoes) for questoes in mapeamento_materias.values()])
+    return indice, totais
+
+
+def calcular_notas(acertos, numeros_questoes, mapeamento_materias, pesos=None):
+    """
+    Monta o DataFrame de notas a partir da matriz booleana de acertos: 'Acertos', '% de Acertos',
+    'Acertos <matéria>' e '% Acertos <matéria>', uma linha por aluno. Os acertos são contagens; com `pesos`
+    (um por questão), os percentuais são de pontos: soma dos pesos das questões certas / soma dos pesos.
+    Questões do mapeamento que não estão na prova contam com peso 1 no denominador, como sem pesos.
+    """
+    total = acertos.sum(axis=1)
+    indice, totais = indice_materias(numeros_questoes, mapeamento_materias)
+    por_materia = acertos.astype(np.int32) @ indice
+    if pesos is None:
+        notas = {"Acertos": total, "% de Acertos": total / acertos.shape[1] * 100}
+        pontos_materia, totais_materia = por_materia * 100, totais
+    else:
+        pesos = np.asarray(pesos, dtype=float)
+        notas = {"Acertos": total, "% de Acertos": acertos @ pesos / pesos.sum() * 100}
+        pontos_materia = (acertos * pesos) @ indice * 100
+        totais_materia = pesos @ indice + (totais - indice.sum(axis=0))
+    percentuais = np.divide(pontos_materia, totais_materia, out=np.zeros(por_materia.shape),
+                            where=totais_materia > 0)
+    for k, materia in enumerate(mapeamento_materias):
+        notas[f"Acertos {materia}"] = por_materia[:, k]
+        notas[f"% Acertos {materia}"] = percentuais[:, k]
+    return pd.DataFrame(notas)
+
+
+def pontuar(respostas, gabarito, numeros_questoes, mapeamento_materias):
+    """
+    Calcula os acertos gerais e por matéria de todos os alunos de uma vez.
+    Devolve (acertos, notas): a matriz booleana de acertos e um DataFrame com as colunas
+    'Acertos', '% de Acertos', 'Acertos <matéria>' e '% Acertos <matéria>', uma linha por aluno.
+    """
+    acertos = matriz_acertos(respostas, gabarito)
+    return acertos, calcular_notas(acertos, numeros_questoes, mapeamento_materias)
+
+
+def pontuar_versoes(respostas, versoes, tabela, numeros_questoes, mapeamento_materias):
+    """
+    Pontua de uma vez uma turma com várias versões da prova (ver `gabaritos.ler_gabaritos`).
+    `respostas` (alunos × questões) está na numeração da versão de cada aluno e `versoes` traz o índice
+    da versão de cada aluno em `tabela['tipos']`. Cada linha é reordenada para a numeração padrão e
+    comparada com o gabarito da sua versão por indexação, sem separar os alunos por versão.
+    Questões anuladas contam como certas para todos; os percentuais usam os pesos da tabela.
+    Devolve (respostas na numeração padrão, acertos, notas).
+    """
+    versoes = np.asarray(versoes, dtype=np.intp)
+    respostas = np.asarray(respostas, dtype=object)
+    padrao = np.take_along_axis(respostas, tabela["posicoes"][versoes], axis=1)
+    acertos = (padrao.astype(str) == tabela["chaves"].astype(str)[versoes]) | tabela["anuladas"]
+    notas = calcular_notas(acertos, numeros_questoes, mapeamento_materias, tabela["pesos"])
+    return padrao, acertos, notas
+
+
+# --- Resultado por questão na aba de resultados ---
+# A aba de resultados guarda, em colunas ocultas à direita das notas, o resultado de cada questão para cada aluno
+# ('Certa <questão>': 1 certa, 0 errada; anuladas contam como certas) e, com várias versões da prova, o gabarito
+# da versão do aluno ('Gabarito <questão>', na numeração padrão). A cor das respostas na planilha, as análises e
+# os boletins partem dessas colunas, e não da linha do gabarito, que só mostra a primeira versão.
+
+def coluna_certa(numero):
+    return f"Certa {numero}"
+
+
+def coluna_gabarito_aluno(numero):
+    return f"Gabarito {numero}"
+
+
+def colunas_por_questao(acertos, numeros_questoes, chaves_alunos=None):
+    """DataFrame com as colunas 'Certa <questão>' (0/1) e, com `chaves_alunos`, 'Gabarito <questão>'."""
+    colunas = pd.DataFrame(np.asarray(acertos, dtype=np.int8), columns=[coluna_certa(q) for q in numeros_questoes])
+    if chaves_alunos is not None:
+        chaves = pd.DataFrame(np.asarray(chaves_alunos, dtype=object),
+                              columns=[coluna_gabarito_aluno(q) for q in numeros_questoes])
+        colunas = colunas.join(chaves)
+    return colunas
+
+
+def acertos_da_aba(df_alunos, numeros_questoes, gabarito):
+    """
+    Matriz booleana de acertos (linhas de `df_alunos` × questões) lida das colunas 'Certa <questão>'.
+    Numa aba gravada antes dessas colunas existirem, compara as respostas com `gabarito` (a linha do gabarito).
+    """
+    colunas = [coluna_certa(q) for q in numeros_questoes]
+    if all(c in df_alunos.columns for c in colunas):
+        return df_alunos[colunas].apply(pd.to_numeric, errors="coerce").fillna(0).to_numpy() == 1
+    return df_alunos[list(numeros_questoes)].eq(gabarito[list(numeros_questoes)]).to_numpy()
+
+
+def gabaritos_da_aba(df_alunos, numeros_questoes, gabarito):
+    """
+    Gabarito de cada aluno (linhas de `df_alunos` × questões, texto), das colunas 'Gabarito <questão>' quando a
+    prova tem várias versões; senão, `gabarito` repetido em todas as linhas.
+    """
+    colunas = [coluna_gabarito_aluno(q) for q in numeros_questoes]
+    if all(c in df_alunos.columns for c in colunas):
+        chaves = df_alunos[colunas]
+    else:
+        chaves = pd.DataFrame([gabarito[list(numeros_questoes)].to_numpy(dtype=object)] * len(df_alunos))
+    return chaves.astype(object).where(chaves.notna(), "").to_numpy(dtype=object)
@@ -1,8 +1,16 @@
+from copy import copy
 import pandas as pd
 import openpyxl  # type: ignore
 from openpyxl.styles import PatternFill, Font, Alignment  # type: ignore
-from config import ARQUIVO_RESPOSTAS, ARQUIVO_SOCIOECONOMICO, ARQUIVO_EXCEL, NOME_DA_PLANILHA_RESULTADOS, NOME_DA_PLANILHA_SOCIO, COLUNA_NOME_SOCIO, NOME_DA_PLANILHA_MATERIAS
+from openpyxl.formatting.rule import FormulaRule  # type: ignore
+from openpyxl.utils import get_column_letter  # type: ignore
+from config import ARQUIVO_RESPOSTAS, ARQUIVO_SOCIOECONOMICO, ARQUIVO_EXCEL, NOME_DA_PLANILHA_RESULTADOS, NOME_DA_PLANILHA_SOCIO, COLUNA_NOME_SOCIO, NOME_DA_PLANILHA_MATERIAS, ESCRITA_RAPIDA_EXCEL, NOME_DA_PLANILHA_GABARITOS, COLUNA_TIPO_PROVA_SOCIO
 from analise_resultados import ler_mapeamento_materias
+from matriz_respostas import usar_matriz, carregar_matriz, decodificar
+from pontuacao import pontuar, pontuar_versoes, coluna_certa, colunas_por_questao
+from gabaritos import ler_gabaritos, versoes_alunos
+from cache_planilhas import ler_planilha
+from correspondencia_nomes import remover_duplicados
 
 # --- Funções de Processamento ---
 
@@ -49,15 +57,192 @@ def aplicar_estilos_base(ws, linha_cabecalho, total_colunas_formatar, total_alun
         ws.cell(row=linha, column=1).fill = FILL_ALUNO_COL
         ws.cell(row=linha, column=1).font = FONTE_NEGRITO
 
-def processar_provas(formatar_estilos=True):
+def dataframe_respostas(gabarito, respostas_alunos):
+    """
+    Monta em memória o mesmo DataFrame que `pd.read_csv(ARQUIVO_RESPOSTAS)` devolveria:
+    colunas '1'...'60', gabarito na primeira linha e respostas vazias como NaN.
+    """
+    colunas = [f"{i+1}" for i in range(len(gabarito))]
+    df = pd.DataFrame([list(gabarito)] + [list(r) for r in respostas_alunos], columns=colunas)
+    return df.replace("", pd.NA)
+
+
+def carregar_respostas():
+    """Lê as respostas da matriz binária quando ela está atualizada; senão, do respostas.csv."""
+    if usar_matriz():
+        dados = carregar_matriz()
+        return dataframe_respostas(decodificar(dados["gabarito"]), decodificar(dados["respostas"]))
+    return pd.read_csv(ARQUIVO_RESPOSTAS)
+
+
+def montar_resultados(gabarito, respostas_alunos, nomes_ordenados, numeros_questoes, df_notas):
+    """
+    Monta a aba de resultados como DataFrame (igual ao lido com `pd.read_excel(header=4)`): o gabarito
+    na primeira linha e, depois, um aluno por linha, pareando nomes e respostas pela posição.
+    """
+    num_linhas = max(len(nomes_ordenados), len(respostas_alunos))
+    corpo = pd.DataFrame(respostas_alunos.to_numpy(dtype=object), columns=numeros_questoes).join(df_notas)
+    corpo = corpo.reindex(range(num_linhas))
+    corpo.insert(0, "Aluno/Questões", pd.Series(nomes_ordenados, dtype=object).reindex(range(num_linhas)))
+    linha_gabarito = pd.DataFrame([["Gabarito", *gabarito.to_numpy(dtype=object)]],
+                                  columns=["Aluno/Questões"] + numeros_questoes)
+    return pd.concat([linha_gabarito, corpo], ignore_index=True)[corpo.columns]
+
+def escrever_resultados_celulas(ws, df_resultados, acertos, total_questoes, total_respostas, mapeamento_materias,
+                                linha_cabecalho, formatar_estilos=True):
+    """Escreve a aba de resultados célula a célula, pintando cada resposta de verde ou vermelho."""
+    VERDE_CLARO = PatternFill(start_color='C6EFCE', end_color='C6EFCE', fill_type='solid')
+    VERMELHO_CLARO = PatternFill(start_color='FFC7CE', end_color='FFC7CE', fill_type='solid')
+
+    # Cabeçalhos e linha do gabarito
+    for col_idx, valor in enumerate(df_resultados.columns[:total_questoes + 3], start=1):
+        ws.cell(row=linha_cabecalho, column=col_idx, value=valor)
+    for col_idx, valor in enumerate(df_resultados.iloc[0, :total_questoes + 1], start=1):
+        ws.cell(row=linha_cabecalho + 1, column=col_idx, value=_valor_celula(valor))
+
+    # Chama a função para criar os cabeçalhos das matérias
+    coluna_final = pinta_materias(ws, mapeamento_materias, linha_cabecalho, start_column=total_questoes + 4)
+    # Cabeçalhos das colunas ocultas com o resultado de cada questão (ver `pontuacao.colunas_por_questao`)
+    for col_idx, valor in enumerate(df_resultados.columns[coluna_final - 1:], start=coluna_final):
+        ws.cell(row=linha_cabecalho, column=col_idx, value=valor)
+    _ocultar_colunas_por_questao(ws, df_resultados)
+
+    colunas_notas = list(df_resultados.columns[total_questoes + 1:])
+    for i, linha in enumerate(df_resultados.iloc[1:].itertuples(index=False)):
+        linha_atual = linha_cabecalho + 2 + i
+        nome, respostas, notas = linha[0], linha[1:total_questoes + 1], linha[total_questoes + 1:]
+        if pd.notna(nome):
+            ws.cell(row=linha_atual, column=1, value=nome)
+
+        # Só as linhas com respostas têm notas
+        if i < total_respostas:
+            for col_idx, (resposta, correta) in enumerate(zip(respostas, acertos[i]), start=2):
+                celula_atual = ws.cell(row=linha_atual, column=col_idx, value=_valor_celula(resposta))
+                celula_atual.fill = VERDE_CLARO if correta else VERMELHO_CLARO
+
+            # 'Acertos', '% de Acertos' e, para cada matéria, 'Acertos <matéria>' e '% Acertos <matéria>'
+            for col_idx, (coluna, valor) in enumerate(zip(colunas_notas, notas), start=total_questoes + 2):
+                celula_atual = ws.cell(row=linha_atual, column=col_idx, value=_valor_celula(valor))
+                if coluna.startswith('%'):
+                    celula_atual.number_format = '0.00"%"'
+
+    if formatar_estilos:
+        # Passa o número total de colunas para formatação correta dos cabeçalhos
+        total_nomes = int(df_resultados['Aluno/Questões'].iloc[1:].notna().sum())
+        aplicar_estilos_base(ws, linha_cabecalho, coluna_final - 1, total_nomes)
+
+def escrever_resultados_em_bloco(workbook, df_resultados, total_questoes, total_respostas, linha_cabecalho,
+                                 formatar_estilos=True):
+    """
+    Recria a aba de resultados escrevendo as linhas em bloco (`ws.append`), sem estilo por célula:
+    o verde/vermelho das respostas vem de duas regras de formatação condicional que leem o resultado de
+    cada questão nas colunas ocultas 'Certa <questão>'. As linhas acima do cabeçalho e as demais abas são preservadas.
+    """
+    FILL_CABECALHO = PatternFill(start_color='568CB8', end_color='568CB8', fill_type='solid')
+    FILL_ALUNO_COL = PatternFill(start_color='90B3D0', end_color='90B3D0', fill_type='solid')
+    FONTE_NEGRITO = Font(bold=True)
+    ALINHAMENTO_CENTRO = Alignment(horizontal='center', vertical='center')
+
+    ws = _recriar_aba(workbook, NOME_DA_PLANILHA_RESULTADOS, linha_cabecalho - 1)
+
+    ws.append(list(df_resultados.columns))
+    valores = df_resultados.astype(object).where(df_resultados.notna(), None).to_numpy().tolist()
+    for linha in valores:
+        ws.append(linha)
+
+    # Formato de porcentagem só nas colunas de percentual das linhas com notas
+    linha_inicio = linha_cabecalho + 2
+    linha_fim = linha_cabecalho + 1 + total_respostas
+    for col_idx, coluna in enumerate(df_resultados.columns, start=1):
+        if str(coluna).startswith('%'):
+            for (celula,) in ws.iter_rows(min_row=linha_inicio, max_row=linha_fim, min_col=col_idx, max_col=col_idx):
+                celula.number_format = '0.00"%"'
+
+    # Verde se a questão está certa para o aluno, vermelho se não: as regras leem a coluna oculta 'Certa <questão>'
+    # da mesma linha, que já considera a versão da prova do aluno e as questões anuladas
+    if total_respostas:
+        ultima_coluna = get_column_letter(total_questoes + 1)
+        intervalo = f"B{linha_inicio}:{ultima_coluna}{linha_fim}"
+        primeira_certa = get_column_letter(df_resultados.columns.get_loc(coluna_certa(df_resultados.columns[1])) + 1)
+        ws.conditional_formatting.add(intervalo, FormulaRule(
+            formula=[f'{primeira_certa}{linha_inicio}=1'],
+            fill=PatternFill(start_color='C6EFCE', end_color='C6EFCE', fill_type='solid')))
+        ws.conditional_formatting.add(intervalo, FormulaRule(
+            formula=[f'{primeira_certa}{linha_inicio}<>1'],
+            fill=PatternFill(start_color='FFC7CE', end_color='FFC7CE', fill_type='solid')))
+    _ocultar_colunas_por_questao(ws, df_resultados)
+
+    # Cabeçalhos das matérias (como em `pinta_materias`) e, com `formatar_estilos`, os demais cabeçalhos e os nomes
+    for celula in ws[linha_cabecalho]:
+        if celula.column > total_questoes + 3 or formatar_estilos:
+            celula.fill = FILL_CABECALHO
+            celula.font = FONTE_NEGRITO
+        if celula.column > total_questoes + 3:
+            celula.alignment = ALINHAMENTO_CENTRO
+
+    if formatar_estilos:
+        print("Aplicando formatação estética...")
+        total_nomes = int(df_resultados['Aluno/Questões'].iloc[1:].notna().sum())
+        for (celula,) in ws.iter_rows(min_row=linha_cabecalho + 1, max_row=linha_cabecalho + total_nomes + 1,
+                                      max_col=1):
+            celula.fill = FILL_ALUNO_COL
+            celula.font = FONTE_NEGRITO
+
+def _ocultar_colunas_por_questao(ws, df_resultados):
+    """Oculta as colunas 'Certa <questão>' e 'Gabarito <questão>', que ficam no fim da aba, depois das notas."""
+    inicio = df_resultados.columns.get_loc(coluna_certa(df_resultados.columns[1])) + 1
+    ws.column_dimensions.group(get_column_letter(inicio), get_column_letter(len(df_resultados.columns)), hidden=True)
+
+def _recriar_aba(workbook, nome, linhas_preservadas):
+    """
+    Substitui a aba `nome` por uma aba vazia na mesma posição, copiando as `linhas_preservadas` primeiras
+    linhas (valores, estilos, mesclagens e larguras). Assim não sobram células nem estilos de execuções anteriores.
+    """
+    if nome not in workbook.sheetnames:
+        nova = workbook.create_sheet(nome)
+        nova._current_row = linhas_preservadas
+        return nova
+
+    antiga = workbook[nome]
+    nova = workbook.create_sheet(f"{nome}_nova", workbook.sheetnames.index(nome))
+    for linha in antiga.iter_rows(max_row=linhas_preservadas):
+        for celula in linha:
+            if celula.value is not None or celula.has_style:
+                copia = nova.cell(row=celula.row, column=celula.column, value=celula.value)
+                copia._style = copy(celula._style)
+    for intervalo in antiga.merged_cells.ranges:
+        if intervalo.max_row <= linhas_preservadas:
+            nova.merge_cells(str(intervalo))
+    for letra, dimensao in antiga.column_dimensions.items():
+        nova.column_dimensions[letra].width = dimensao.width
+    for numero in range(1, linhas_preservadas + 1):
+        if numero in antiga.row_dimensions:
+            nova.row_dimensions[numero].height = antiga.row_dimensions[numero].height
+
+    workbook.remove(antiga)
+    nova.title = nome
+    # As próximas linhas adicionadas com append começam logo abaixo das preservadas
+    nova._current_row = linhas_preservadas
+    return nova
+
+def _valor_celula(valor):
+    """Converte NaN/NA em célula vazia."""
+    return None if pd.isna(valor) else valor
+
+def processar_provas(formatar_estilos=True, df_respostas=None, df_socio=None, mapeamento_materias=None):
     """
     Lê nomes de um arquivo, respostas de outro, e os combina na planilha final
     existente, calculando resultados gerais e por matéria.
+    `df_respostas`, `df_socio` e `mapeamento_materias` podem ser passados já em memória
+    (ver `pipeline.py`); os que faltarem são lidos dos arquivos de `config.py`.
+    Devolve o DataFrame da aba de resultados, igual ao lido com `pd.read_excel(header=4)`.
     """
     # --- Passo 1: Carregar todos os dados de origem ---
     try:
-        df_respostas = pd.read_csv(ARQUIVO_RESPOSTAS)
-        df_socio = pd.read_excel(ARQUIVO_SOCIOECONOMICO, sheet_name=NOME_DA_PLANILHA_SOCIO)
+        if df_respostas is None:
+            df_respostas = carregar_respostas()
+        if df_socio is None:
+            df_socio = ler_planilha(ARQUIVO_SOCIOECONOMICO, NOME_DA_PLANILHA_SOCIO)
     except FileNotFoundError as e:
         print(f"❌ ERRO: Arquivo de entrada não encontrado: {e.filename}.")
         return
@@ -74,7 +259,11 @@ def processar_provas(formatar_estilos=True):
     # --- Passo 2: Preparar os dados ---
     gabarito = df_respostas.iloc[0]
     respostas_alunos = df_respostas.iloc[1:]
-    nomes_ordenados = sorted(df_socio[COLUNA_NOME_SOCIO].dropna().unique())
+    # Grafias do mesmo nome (acentos, maiúsculas, espaços) contam uma vez só, para não deslocar o pareamento por posição
+    nomes_unicos, repetidos = remover_duplicados(df_socio[COLUNA_NOME_SOCIO].dropna().unique())
+    for descartado, mantido in repetidos:
+        print(f"⚠️ '{descartado}' foi considerado o mesmo aluno que '{mantido}' na planilha socioeconômica.")
+    nomes_ordenados = sorted(nomes_unicos)
     total_questoes = len(gabarito)
 
     # --- Passo 3: Carregar a planilha Excel EXISTENTE ---
@@ -92,93 +281,62 @@ def processar_provas(formatar_estilos=True):
         print(f"❌ ERRO: O arquivo '{ARQUIVO_EXCEL}' está aberto. Feche-o e tente novamente.")
         return
     
-    mapeamento_materias = ler_mapeamento_materias(ARQUIVO_EXCEL, NOME_DA_PLANILHA_MATERIAS)
+    if mapeamento_materias is None:
+        mapeamento_materias = ler_mapeamento_materias(ARQUIVO_EXCEL, NOME_DA_PLANILHA_MATERIAS)
     if not mapeamento_materias:
         print(f"❌ ERRO: Não foi possível ler o mapeamento de matérias.")
         return
     
-    VERDE_CLARO = PatternFill(start_color='C6EFCE', end_color='C6EFCE', fill_type='solid')
-    VERMELHO_CLARO = PatternFill(start_color='FFC7CE', end_color='FFC7CE', fill_type='solid')
-    
-    # --- Passo 4: Escrever cabeçalhos ---
-
+    # --- Passo 4: Calcular todas as notas de uma vez ---
     linha_cabecalho = 5
     cabecalhos_questoes = df_respostas.columns
+    numeros_questoes = [int(q.split('_')[-1]) for q in cabecalhos_questoes]
+    try:
+        tabela = ler_gabaritos(ARQUIVO_EXCEL, NOME_DA_PLANILHA_GABARITOS, gabarito.to_numpy(), numeros_questoes)
+    except ValueError as e:
+        print(f"❌ ERRO: {e}. Corrija a aba '{NOME_DA_PLANILHA_GABARITOS}' ou remova-a para usar o gabarito do corretor.")
+        return
+    chaves_alunos = None
+    if tabela is None:
+        acertos, df_notas = pontuar(respostas_alunos.to_numpy(), gabarito.to_numpy(), numeros_questoes, mapeamento_materias)
+    else:
+        # Várias versões e/ou pesos: cada linha de respostas pertence ao aluno de mesma posição em `nomes_ordenados`
+        tipos_por_nome = {}
+        if COLUNA_TIPO_PROVA_SOCIO in df_socio.columns:
+            tipos_por_nome = dict(zip(df_socio[COLUNA_NOME_SOCIO], df_socio[COLUNA_TIPO_PROVA_SOCIO]))
+        nomes_linhas = [nomes_ordenados[i] if i < len(nomes_ordenados) else None for i in range(len(respostas_alunos))]
+        versoes = versoes_alunos(tabela, nomes_linhas, tipos_por_nome)
+        padrao, acertos, df_notas = pontuar_versoes(respostas_alunos.to_numpy(), versoes, tabela, numeros_questoes,
+                                                    mapeamento_materias)
+        # A aba de resultados mostra todas as respostas na numeração padrão, ao lado do gabarito da primeira versão;
+        # o gabarito de cada aluno vai para as colunas ocultas 'Gabarito <questão>'
+        respostas_alunos = pd.DataFrame(padrao, index=respostas_alunos.index, columns=respostas_alunos.columns)
+        gabarito = pd.Series(tabela["chaves"][0], index=gabarito.index, name=gabarito.name)
+        if len(tabela["tipos"]) > 1:
+            chaves_alunos = tabela["chaves"][versoes]
+        print(f"📝 Aba '{NOME_DA_PLANILHA_GABARITOS}': versões {', '.join(tabela['tipos']) or 'única'}, "
+              f"{int(tabela['anuladas'].sum())} questões anuladas, pesos de {tabela['pesos'].min():g} a {tabela['pesos'].max():g}.")
+    # Resultado de cada questão (e gabarito de cada aluno, com várias versões) em colunas ocultas depois das notas
+    df_notas = df_notas.join(colunas_por_questao(acertos, numeros_questoes, chaves_alunos))
+    df_resultados = montar_resultados(gabarito, respostas_alunos, nomes_ordenados, numeros_questoes, df_notas)
 
-    ws.cell(row=linha_cabecalho, column=1, value="Aluno/Questões")
-    for i, nome_coluna in enumerate(cabecalhos_questoes, start=2):
-        numero_questao = nome_coluna.split('_')[-1]
-        ws.cell(row=linha_cabecalho, column=i, value=int(numero_questao))
-        
-    ws.cell(row=linha_cabecalho, column=total_questoes + 2, value="Acertos")
-    ws.cell(row=linha_cabecalho, column=total_questoes + 3, value="% de Acertos")
-    
-    linha_atual = linha_cabecalho + 1
-    ws.cell(row=linha_atual, column=1, value="Gabarito")
-    for i, questao in enumerate(cabecalhos_questoes, start=2):
-        ws.cell(row=linha_atual, column=i, value=gabarito[questao])
-    
-    # Chama a função para criar os cabeçalhos das matérias
-    coluna_final = pinta_materias(ws, mapeamento_materias, linha_cabecalho, start_column=total_questoes + 4)
-    
-    # --- Passo 5: Iterar e preencher dados ---
-    num_max_linhas = max(len(nomes_ordenados), len(respostas_alunos))
-
-    for i in range(num_max_linhas):
-        linha_atual += 1
+    # --- Passo 5: Escrever a aba de resultados ---
+    if ESCRITA_RAPIDA_EXCEL:
+        escrever_resultados_em_bloco(workbook, df_resultados, total_questoes, len(respostas_alunos),
+                                     linha_cabecalho, formatar_estilos)
+    else:
+        escrever_resultados_celulas(ws, df_resultados, acertos, total_questoes, len(respostas_alunos),
+                                    mapeamento_materias, linha_cabecalho, formatar_estilos)
 
-        # Preenche o nome do aluno na coluna 1
-        if i < len(nomes_ordenados):
-            ws.cell(row=linha_atual, column=1, value=nomes_ordenados[i])
-        
-        # Se houver uma linha de resposta correspondente, processa os dados
-        if i < len(respostas_alunos):
-            respostas_do_aluno = respostas_alunos.iloc[i]
-            acertos_gerais = 0
-            
-            # Calcula acertos GERAIS
-            for col_idx, questao_nome in enumerate(cabecalhos_questoes, start=2):
-                resposta = respostas_do_aluno[questao_nome]
-                celula_atual = ws.cell(row=linha_atual, column=col_idx, value=resposta)
-                
-                if str(resposta) == str(gabarito[questao_nome]):
-                    acertos_gerais += 1
-                    celula_atual.fill = VERDE_CLARO
-                else:
-                    celula_atual.fill = VERMELHO_CLARO
-
-            # Escreve resultados GERAIS
-            porcentagem_geral = (acertos_gerais / total_questoes) * 100
-            ws.cell(row=linha_atual, column=total_questoes + 2, value=acertos_gerais)
-            ws.cell(row=linha_atual, column=total_questoes + 3, value=porcentagem_geral).number_format = '0.00"%"'
-
-            coluna_materia_atual = total_questoes + 4
-            for materia, questoes_nums in mapeamento_materias.items():
-                acertos_materia = 0
-                for col_idx, questao_nome in enumerate(cabecalhos_questoes, start=2):
-                    if int(questao_nome) in questoes_nums:
-                        if str(respostas_do_aluno[questao_nome]) == str(gabarito[questao_nome]):
-                            acertos_materia += 1
-
-                total_questoes_materia = len(questoes_nums)
-                percentual_materia = (acertos_materia / total_questoes_materia) * 100 if total_questoes_materia > 0 else 0
-
-                ws.cell(row=linha_atual, column=coluna_materia_atual, value=acertos_materia)
-                ws.cell(row=linha_atual, column=coluna_materia_atual + 1, value=percentual_materia).number_format = '0.00"%"'
-                
-                coluna_materia_atual += 2
-
-    # --- Passo 6: Aplicar estilos e salvar ---
-    if formatar_estilos:
-        # Passa o número total de colunas para formatação correta dos cabeçalhos
-        aplicar_estilos_base(ws, linha_cabecalho, coluna_final - 1, len(nomes_ordenados))
-    
+    # --- Passo 6: Salvar ---
     try:
         workbook.save(ARQUIVO_EXCEL)
         print(f"✅ Processamento concluído! O arquivo '{ARQUIVO_EXCEL}' foi atualizado.")
     except PermissionError:
         print(f"❌ ERRO: Feche o arquivo '{ARQUIVO_EXCEL}' para poder salvá-lo.")
 
+    return df_resultados
+
 # --- Ponto de Entrada Principal ---
 if __name__ == "__main__":
 
@@ -0,0 +1,177 @@
+import os
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from matriz_respostas import CODIGOS, decodificar, carregar_matriz, gravar_matriz, exportar_csv
+from config import (LIMIAR_BRANCO, LIMIAR_DUPLA, MARGEM_MINIMA, ARQUIVO_PREENCHIMENTOS, ARQUIVO_QUESTOES_AMBIGUAS,
+                    ARQUIVO_RESPOSTAS, ARQUIVO_MATRIZ_RESPOSTAS)
+
+# --- Preenchimento das bolinhas e re-correção ---
+# O corretor mede o preenchimento (0 a 1) das 5 bolinhas de cada questão e guarda tudo num tensor float16
+# (alunos × 60 × 5) em ARQUIVO_PREENCHIMENTOS. A resposta de cada questão sai desses valores pelas regras
+# abaixo, e não das imagens; por isso mudar uma regra e corrigir de novo leva milissegundos
+# (`python recorrecao.py --branco 0.4`), sem rasterizar os PDFs nem rodar a visão computacional.
+# As regras, da mais forte para a mais fraca:
+# - questão sem as 5 bolinhas detectadas: 'Z';
+# - maior preenchimento abaixo de `branco`: em branco ('');
+# - segunda bolinha com preenchimento a partir de `dupla`: marcação dupla ('Z');
+# - nos demais casos vale a alternativa mais preenchida, e a questão só é listada para revisão se a
+#   diferença para a segunda for menor que `margem`.
+# Uma regra com valor None fica desligada (sem nenhuma, vale sempre a mais preenchida).
+
+OK, EM_BRANCO, MARCACAO_DUPLA, MARGEM_PEQUENA, SEM_BOLINHAS = range(5)
+SITUACOES = ["", "em branco", "marcação dupla", "margem pequena", "bolinhas não detectadas"]
+_CODIGO_Z = CODIGOS.index("Z")
+
+
+def regras_padrao():
+    """Regras de decisão da configuração: {'branco', 'dupla', 'margem'}."""
+    return {"branco": LIMIAR_BRANCO, "dupla": LIMIAR_DUPLA, "margem": MARGEM_MINIMA}
+
+
+def aplicar_regras(preenchimentos, regras=None):
+    """
+    Aplica as regras a um array (..., 5) de preenchimentos (uma questão sem as 5 bolinhas tem NaN).
+    Devolve (códigos uint8 de `matriz_respostas`, situações uint8 de SITUACOES), ambos com o formato (...).
+    """
+    regras = regras_padrao() if regras is None else regras
+    # Uma cópia contígua por alternativa; a maior e a segunda maior são acompanhadas elemento a elemento,
+    # bem mais rápido que ordenar ou usar argmax num eixo de tamanho 5
+    alternativas = np.ascontiguousarray(np.moveaxis(np.asarray(preenchimentos), -1, 0), dtype=np.float32)
+    maior = np.array(alternativas[0])
+    segunda = np.full(maior.shape, -np.inf, dtype=np.float32)
+    codigos = np.ones(maior.shape, dtype=np.uint8)
+    for k in range(1, len(alternativas)):
+        alternativa = alternativas[k]
+        np.copyto(codigos, k + 1, where=alternativa > maior)  # estrito: no empate fica a primeira
+        np.maximum(segunda, np.minimum(alternativa, maior), out=segunda)
+        np.maximum(maior, alternativa, out=maior)
+    sem_bolinhas = np.isnan(maior)  # np.maximum propaga NaN
+    situacoes = np.zeros(codigos.shape, dtype=np.uint8)
+
+    # Cada regra sobrescreve as anteriores, então a ordem é da mais fraca para a mais forte
+    if regras.get("margem") is not None:
+        situacoes[maior - segunda < regras["margem"]] = MARGEM_PEQUENA
+    if regras.get("dupla") is not None:
+        dupla = segunda >= regras["dupla"]
+        codigos[dupla], situacoes[dupla] = _CODIGO_Z, MARCACAO_DUPLA
+    if regras.get("branco") is not None:
+        branco = maior < regras["branco"]
+        codigos[branco], situacoes[branco] = 0, EM_BRANCO
+    codigos[sem_bolinhas], situacoes[sem_bolinhas] = _CODIGO_Z, SEM_BOLINHAS
+    return codigos, situacoes
+
+
+def decidir_respostas(preenchimentos, regras=None):
+    """Letras ('', 'A'–'E' ou 'Z') das questões de uma página, a partir do array (60, 5) de preenchimentos."""
+    return decodificar(aplicar_regras(preenchimentos, regras)[0]).tolist()
+
+
+def salvar_preenchimentos(preenchimentos, resultados, caminho=ARQUIVO_PREENCHIMENTOS):
+    """
+    Salva os preenchimentos em float16. `preenchimentos` é a lista preenchida pelo corretor: o gabarito
+    primeiro e depois uma página por aluno, na ordem de `resultados` ((nome_base, nome_pagina, respostas)).
+    """
+    pasta = os.path.dirname(caminho)
+    if pasta:
+        os.makedirs(pasta, exist_ok=True)
+    gabarito = np.asarray(preenchimentos[0], dtype=np.float16)
+    alunos = (np.stack(preenchimentos[1:]).astype(np.float16) if len(preenchimentos) > 1
+              else np.zeros((0, *gabarito.shape), dtype=np.float16))
+    np.savez_compressed(caminho, preenchimentos=alunos, gabarito=gabarito,
+                        pdf=np.array([nome for nome, _, _ in resultados], dtype=str),
+                        pagina=np.array([pagina for _, pagina, _ in resultados], dtype=str))
+    print(f"✅ Preenchimentos das bolinhas salvos em '{caminho}' ({alunos.shape[0]} alunos × "
+          f"{gabarito.shape[0]} questões × {gabarito.shape[1]} alternativas).")
+
+
+def carregar_preenchimentos(caminho=ARQUIVO_PREENCHIMENTOS):
+    """Lê o .npz e devolve um dicionário com 'preenchimentos', 'gabarito', 'pdf' e 'pagina'."""
+    with np.load(caminho) as dados:
+        return {chave: dados[chave] for chave in ("preenchimentos", "gabarito", "pdf", "pagina")}
+
+
+def listar_ambiguas(dados, regras=None):
+    """
+    Uma linha por questão que não teve exatamente uma alternativa bem marcada, incluindo o gabarito:
+    'PDF', 'Página', 'Questão', 'Situação', 'Resposta' e o preenchimento de cada alternativa.
+    """
+    tensor = np.concatenate([dados["gabarito"][np.newaxis], dados["preenchimentos"]])
+    codigos, situacoes = aplicar_regras(tensor, regras)
+    linhas, questoes = np.nonzero(situacoes)
+    pdfs = np.concatenate([[""], dados["pdf"]])
+    paginas = np.concatenate([["gabarito"], dados["pagina"]])
+    tabela = pd.DataFrame({
+        "PDF": pdfs[linhas],
+        "Página": paginas[linhas],
+        "Questão": questoes + 1,
+        "Situação": np.array(SITUACOES, dtype=object)[situacoes[linhas, questoes]],
+        "Resposta": decodificar(codigos[linhas, questoes]),
+    })
+    valores = tensor[linhas, questoes].astype(np.float32).round(2)
+    for k, letra in enumerate(CODIGOS[1:6]):
+        tabela[letra] = valores[:, k]
+    return tabela
+
+
+def resumir_situacoes(situacoes):
+    """Texto com quantas questões caíram em cada situação (ex.: '12 em branco, 3 marcação dupla')."""
+    contagem = np.bincount(situacoes.ravel(), minlength=len(SITUACOES))
+    return ", ".join(f"{n} {SITUACOES[s]}" for s, n in enumerate(contagem) if s != OK and n) or "nenhuma"
+
+
+def recorrigir(regras=None, caminho=ARQUIVO_PREENCHIMENTOS, caminho_matriz=ARQUIVO_MATRIZ_RESPOSTAS,
+               caminho_csv=ARQUIVO_RESPOSTAS, caminho_ambiguas=ARQUIVO_QUESTOES_AMBIGUAS):
+    """
+    Aplica `regras` aos preenchimentos salvos, regrava as respostas (CSV e matriz, que as etapas seguintes
+    leem) e a lista de questões ambíguas. Devolve a tabela de `listar_ambiguas`.
+    """
+    regras = regras_padrao() if regras is None else regras
+    dados = carregar_preenchimentos(caminho)
+
+    inicio = time.perf_counter()
+    codigos, situacoes = aplicar_regras(dados["preenchimentos"], regras)
+    codigos_gabarito, _ = aplicar_regras(dados["gabarito"], regras)
+    duracao = time.perf_counter() - inicio
+    print(f"⚙️ Regras {regras} aplicadas a {codigos.shape[0]} alunos em {duracao * 1000:.1f} ms.")
+
+    if os.path.exists(caminho_matriz):
+        anteriores = carregar_matriz(caminho_matriz)["respostas"]
+        if anteriores.shape == codigos.shape:
+            print(f"🔁 {int((anteriores != codigos).sum())} respostas mudaram em relação à correção anterior.")
+
+    novos = {"respostas": codigos, "gabarito": codigos_gabarito, "pdf": dados["pdf"], "pagina": dados["pagina"]}
+    exportar_csv(novos, caminho_csv)
+    gravar_matriz(novos, caminho_matriz)  # depois do CSV: a matriz só é preferida se não for mais antiga
+
+    ambiguas = listar_ambiguas(dados, regras)
+    ambiguas.to_csv(caminho_ambiguas, index=False, encoding='utf-8')
+    print(f"📄 Questões para revisar ({resumir_situacoes(situacoes)}) salvas em '{caminho_ambiguas}'.")
+    return ambiguas
+
+
+def _valor_regra(texto):
+    """Valor de uma regra na linha de comando: um número ou 'nenhum' para desligá-la."""
+    return None if texto.strip().lower() in ("nenhum", "none", "") else float(texto)
+
+
+if __name__ == "__main__":
+    padrao = regras_padrao()
+    parser = argparse.ArgumentParser(description="Corrige de novo a partir dos preenchimentos salvos, sem visão computacional")
+    parser.add_argument("--branco", type=_valor_regra, default=padrao["branco"],
+                        help="maior preenchimento abaixo deste valor = em branco ('nenhum' desliga)")
+    parser.add_argument("--dupla", type=_valor_regra, default=padrao["dupla"],
+                        help="segunda bolinha a partir deste valor = marcação dupla ('nenhum' desliga)")
+    parser.add_argument("--margem", type=_valor_regra, default=padrao["margem"],
+                        help="diferença mínima entre as duas bolinhas mais preenchidas para não ir à revisão")
+    parser.add_argument("--preenchimentos", default=ARQUIVO_PREENCHIMENTOS)
+    parser.add_argument("--ambiguas", default=ARQUIVO_QUESTOES_AMBIGUAS, help="CSV com as questões para revisar")
+    args = parser.parse_args()
+
+    ambiguas = recorrigir({"branco": args.branco, "dupla": args.dupla, "margem": args.margem},
+                          args.preenchimentos, caminho_ambiguas=args.ambiguas)
+    if len(ambiguas):
+        print(ambiguas.head(20).to_string(index=False))
+        if len(ambiguas) > 20:
+            print(f"... e mais {len(ambiguas) - 20} (ver '{args.ambiguas}')")
@@ -0,0 +1,395 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import argparse
+from itertools import groupby
+from urllib.parse import urlsplit, parse_qs
+import numpy as np
+from pdf2image.exceptions import PDFPageCountError, PDFSyntaxError
+import corretor
+from cache_correcao import hash_arquivo, hash_parametros, carregar_cache, salvar_cache
+from recorrecao import decidir_respostas
+from config import (DPI_RASTERIZACAO, HOST_SERVICO, PORTA_SERVICO, PASTA_SERVICO, WORKERS_SERVICO,
+                    PAGINAS_POR_LOTE_SERVICO, MAX_PAGINAS_FILA_SERVICO, MAX_MB_ENVIO_SERVICO,
+                    MAX_ENVIOS_GUARDADOS_SERVICO, TEMPO_GUARDA_ENVIOS_SERVICO)
+
+# --- Serviço local de correção (HTTP) ---
+# Um único computador corrige as provas de vários coordenadores, que enviam PDFs pela rede local em vez de
+# instalar o poppler e rodar os scripts cada um na sua máquina. O front end é asyncio (só a biblioteca padrão):
+# recebe os envios, responde às consultas e nunca fica bloqueado pela correção. A correção roda num pool de
+# processos (ver `corretor.criar_pool`).
+# - As páginas de todos os envios entram numa única fila. Cada processo livre recebe um lote de até
+#   PAGINAS_POR_LOTE_SERVICO páginas, que podem ser de envios diferentes, e rasteriza e mede o lote inteiro de uma
+#   vez. Com a fila curta, os lotes são pequenos (menor latência); com ela cheia, crescem (menos idas e vindas).
+# - Contrapressão: no máximo um lote por processo fica em execução. Se as páginas aguardando correção passarem de
+#   MAX_PAGINAS_FILA_SERVICO, novos envios recebem 503 com Retry-After, em vez de acumular memória e disco.
+# - Um PDF já corrigido com o mesmo gabarito sai direto do cache de correção do corretor.py.
+# - Um envio concluído fica disponível por TEMPO_GUARDA_ENVIOS_SERVICO s (pode ser consultado de novo, por outro
+#   cliente ou depois de uma resposta perdida) e então é esquecido; acima de MAX_ENVIOS_GUARDADOS_SERVICO concluídos,
+#   os mais antigos saem antes. Reenviar o mesmo PDF devolve o resultado do cache na hora.
+# Rotas:
+#   POST /gabarito            corpo = PDF; a primeira página passa a ser o gabarito
+#   POST /provas?nome=sala1   corpo = PDF com as folhas dos alunos; responde 202 com o id do envio
+#   GET  /provas/<id>         situação; com ?esperar=30, aguarda até 30 s pelo fim da correção
+#   GET  /estado              fila, lotes em execução e envios por situação
+
+NA_FILA, CORRIGINDO, PRONTO, ERRO = "na fila", "corrigindo", "pronto", "erro"
+_MOTIVOS = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            409: "Conflict", 413: "Payload Too Large", 431: "Request Header Fields Too Large",
+            503: "Service Unavailable"}
+
+
+class ErroServico(Exception):
+    """Erro com o status HTTP que deve ser devolvido ao cliente."""
+
+    def __init__(self, status, mensagem, cabecalhos=None):
+        super().__init__(mensagem)
+        self.status = status
+        self.cabecalhos = cabecalhos or {}
+
+
+def _medir_lote(lote, opcoes, dpi):
+    """
+    Roda num processo do pool: rasteriza e mede as páginas do lote, (caminho do PDF, número da página),
+    agrupadas por PDF. Devolve ({(caminho, número): preenchimentos}, {caminho: mensagem de erro}).
+    Qualquer erro fica restrito ao PDF que o causou: os outros envios do mesmo lote seguem normalmente.
+    """
+    medidos, erros = {}, {}
+    for caminho, grupo in groupby(sorted(lote), key=lambda x: x[0]):
+        numeros = [n for _, n in grupo]
+        try:
+            for numero, pagina in corretor.rasterizar_pdf(caminho, dpi=dpi, paginas=numeros, threads=1):
+                medidos[(caminho, numero)] = corretor.medir_imagem(np.asarray(pagina), **opcoes)
+        except (PDFPageCountError, PDFSyntaxError, OSError, ValueError) as e:
+            erros[caminho] = str(e) or type(e).__name__
+        except Exception as e:  # ex.: cv2.error numa página ruim
+            erros[caminho] = f"{type(e).__name__}: {e}"
+    return medidos, erros
+
+
+class Envio:
+    """Um PDF recebido: páginas, preenchimentos já medidos e situação da correção."""
+
+    def __init__(self, nome, caminho, hash_pdf, total_paginas):
+        self.id = uuid.uuid4().hex[:12]
+        self.nome = nome
+        self.caminho = caminho
+        self.hash_pdf = hash_pdf
+        self.total_paginas = total_paginas
+        self.preenchimentos = {}  # número da página → array (60, 5)
+        self.estado = NA_FILA
+        self.erro = None
+        self.recebido = time.monotonic()
+        self.concluido = None
+        self.fim = asyncio.Event()
+
+    def situacao(self, incluir_respostas=True):
+        resposta = {"id": self.id, "nome": self.nome, "estado": self.estado, "paginas": self.total_paginas,
+                    "corrigidas": len(self.preenchimentos)}
+        if self.concluido is not None:
+            resposta["segundos"] = round(self.concluido - self.recebido, 3)
+        if self.erro:
+            resposta["erro"] = self.erro
+        if self.estado == PRONTO and incluir_respostas:
+            resposta["resultados"] = [{"pagina": f"{self.nome}_p{n}", "respostas": decidir_respostas(p)}
+                                      for n, p in sorted(self.preenchimentos.items())]
+        return resposta
+
+
+class ServicoCorrecao:
+    def __init__(self, workers=WORKERS_SERVICO, paginas_por_lote=PAGINAS_POR_LOTE_SERVICO,
+                 max_paginas_fila=MAX_PAGINAS_FILA_SERVICO, pasta=PASTA_SERVICO, dpi=DPI_RASTERIZACAO,
+                 max_envios_guardados=MAX_ENVIOS_GUARDADOS_SERVICO, tempo_guarda=TEMPO_GUARDA_ENVIOS_SERVICO):
+        self.workers = workers or os.cpu_count() or 1
+        self.paginas_por_lote = paginas_por_lote
+        self.max_paginas_fila = max_paginas_fila
+        self.pasta = pasta
+        os.makedirs(self.pasta, exist_ok=True)  # o gabarito de --gabarito é gravado aqui antes de `servir`
+        self.dpi = dpi
+        self.max_envios_guardados = max_envios_guardados
+        self.tempo_guarda = tempo_guarda
+        self.envios = {}
+        self.gabarito = None
+        self.opcoes = None
+        self.hash_params = None
+        self.fila = None          # (envio, número da página), criada dentro do loop de eventos
+        self.vagas = None         # um lote em execução por processo
+        self.lotes_em_execucao = 0
+        self.pool = None
+        self._tarefas = set()     # o loop só guarda referências fracas das tarefas
+
+    # ---------- gabarito e envios ----------
+    async def _salvar_pdf(self, dados):
+        if not dados.startswith(b"%PDF"):
+            raise ErroServico(400, "o corpo da requisição não é um PDF")
+        caminho = os.path.join(self.pasta, f"{uuid.uuid4().hex}.pdf")
+        await asyncio.to_thread(_gravar, caminho, dados)
+        return caminho
+
+    async def definir_gabarito(self, dados):
+        """Lê o gabarito da primeira página do PDF e prepara bloco, template e registro das folhas."""
+        if self.fila.qsize() or self.lotes_em_execucao:
+            raise ErroServico(409, "há provas sendo corrigidas; troque o gabarito quando a fila esvaziar")
+        caminho = await self._salvar_pdf(dados)
+        try:
+            gabarito, opcoes, hash_gabarito = await asyncio.to_thread(self._preparar_gabarito, caminho)
+        except (PDFPageCountError, PDFSyntaxError, OSError, ValueError) as e:
+            raise ErroServico(400, f"não foi possível ler o gabarito: {e}")
+        finally:
+            os.remove(caminho)
+        self.gabarito, self.opcoes = gabarito, opcoes
+        self.hash_params = hash_parametros(corretor.parametros_correcao(self.dpi, hash_gabarito))
+        return {"gabarito": gabarito}
+
+    def _preparar_gabarito(self, caminho):
+        primeira = next(corretor.rasterizar_pdf(caminho, dpi=self.dpi, paginas=[1]), None)
+        if primeira is None:
+            raise ValueError("o PDF não tem páginas")
+        pagina = primeira[1]
+        gabarito, opcoes = corretor.preparar_gabarito(np.asarray(pagina), self.dpi, caminho_layout=None)
+        return gabarito, opcoes, hash_arquivo(caminho)
+
+    async def receber_prova(self, dados, nome=None):
+        """Guarda o PDF, busca no cache as páginas já corrigidas e põe as demais na fila. Devolve o Envio."""
+        if self.opcoes is None:
+            raise ErroServico(409, "envie o gabarito antes (POST /gabarito)")
+        caminho = await self._salvar_pdf(dados)
+        try:
+            hash_pdf, cache = await asyncio.to_thread(self._ler_cache, caminho)
+            total = cache["total_paginas"] or await asyncio.to_thread(_contar_paginas, caminho)
+        except (PDFPageCountError, PDFSyntaxError, OSError, ValueError) as e:
+            os.remove(caminho)
+            raise ErroServico(400, f"PDF inválido: {e}")
+
+        faltantes = [n for n in range(1, total + 1) if str(n) not in cache["paginas"]]
+        # Contrapressão: com a fila cheia, o envio é recusado (um envio grande só entra com a fila vazia)
+        if faltantes and self.fila.qsize() and self.fila.qsize() + len(faltantes) > self.max_paginas_fila:
+            os.remove(caminho)
+            raise ErroServico(503, f"fila cheia ({self.fila.qsize()} páginas aguardando); tente de novo em instantes",
+                              {"Retry-After": str(max(1, round(self.fila.qsize() / (self.workers * 4))))})
+
+        envio = Envio(nome or os.path.splitext(os.path.basename(caminho))[0], caminho, hash_pdf, total)
+        self.envios[envio.id] = envio
+        for numero, preenchimentos in cache["paginas"].items():
+            envio.preenchimentos[int(numero)] = np.array(preenchimentos, dtype=np.float16)
+        for numero in faltantes:
+            self.fila.put_nowait((envio, numero))
+        if not faltantes:
+            await self._concluir(envio)
+        return envio
+
+    def _ler_cache(self, caminho):
+        hash_pdf = hash_arquivo(caminho)
+        return hash_pdf, carregar_cache(hash_pdf, self.hash_params)
+
+    def _limpar_envios(self):
+        """Esquece os envios concluídos há mais de `tempo_guarda` s e, acima do limite, os concluídos mais antigos."""
+        agora = time.monotonic()
+        concluidos = sorted((e for e in self.envios.values() if e.concluido is not None), key=lambda e: e.concluido)
+        excesso = len(concluidos) - self.max_envios_guardados
+        for i, envio in enumerate(concluidos):
+            if i < excesso or agora - envio.concluido > self.tempo_guarda:
+                del self.envios[envio.id]
+
+    async def _concluir(self, envio, erro=None):
+        envio.estado, envio.erro, envio.concluido = (ERRO if erro else PRONTO), erro, time.monotonic()
+        if not erro:
+            cache = {"total_paginas": envio.total_paginas,
+                     "paginas": {str(n): p.tolist() for n, p in envio.preenchimentos.items()}}
+            await asyncio.to_thread(salvar_cache, envio.hash_pdf, self.hash_params, cache)
+        if os.path.exists(envio.caminho):
+            os.remove(envio.caminho)
+        envio.fim.set()
+
+    # ---------- lotes ----------
+    async def _despachar(self):
+        """Monta os lotes: espera um processo livre e leva as páginas da fila, divididas entre os processos."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await self.vagas.acquire()
+            lote = [await self.fila.get()]
+            # Fila curta: lotes pequenos, todos os processos ocupados; fila longa: lotes cheios
+            tamanho = min(self.paginas_por_lote, max(1, -(-(self.fila.qsize() + 1) // self.workers)))
+            while len(lote) < tamanho and not self.fila.empty():
+                lote.append(self.fila.get_nowait())
+            lote = [(envio, numero) for envio, numero in lote if envio.estado != ERRO]
+            if not lote:
+                self.vagas.release()
+                continue
+            for envio, _ in lote:
+                envio.estado = CORRIGINDO
+            self.lotes_em_execucao += 1
+            futuro = loop.run_in_executor(self.pool, _medir_lote, [(e.caminho, n) for e, n in lote],
+                                          self.opcoes, self.dpi)
+            futuro.add_done_callback(lambda f, lote=lote: self._acompanhar(self._receber_lote(lote, f)))
+
+    def _acompanhar(self, corrotina):
+        tarefa = asyncio.get_running_loop().create_task(corrotina)
+        self._tarefas.add(tarefa)
+        tarefa.add_done_callback(self._tarefas.discard)
+
+    async def _receber_lote(self, lote, futuro):
+        self.lotes_em_execucao -= 1
+        self.vagas.release()
+        try:
+            medidos, erros = futuro.result()
+        except Exception as e:  # processo do pool morreu: os envios do lote falham, o serviço continua
+            medidos, erros = {}, {envio.caminho: f"falha no processo de correção: {e}" for envio, _ in lote}
+        for envio in {envio for envio, _ in lote}:
+            if envio.estado == ERRO:
+                continue
+            if envio.caminho in erros:
+                await self._concluir(envio, erros[envio.caminho])
+                continue
+            for (caminho, numero), preenchimentos in medidos.items():
+                if caminho == envio.caminho:
+                    envio.preenchimentos[numero] = preenchimentos
+            if len(envio.preenchimentos) == envio.total_paginas:
+                await self._concluir(envio)
+
+    def estado(self):
+        contagem = {}
+        for envio in self.envios.values():
+            contagem[envio.estado] = contagem.get(envio.estado, 0) + 1
+        return {"paginas_na_fila": self.fila.qsize(), "lotes_em_execucao": self.lotes_em_execucao,
+                "workers": self.workers, "gabarito": self.gabarito is not None, "envios": contagem}
+
+    # ---------- HTTP ----------
+    async def _rotear(self, metodo, caminho, parametros, corpo):
+        partes = [p for p in caminho.split("/") if p]
+        self._limpar_envios()
+        if partes == ["gabarito"] and metodo == "POST":
+            return 200, await self.definir_gabarito(corpo)
+        if partes == ["gabarito"] and metodo == "GET":
+            return 200, {"gabarito": self.gabarito}
+        if partes == ["provas"] and metodo == "POST":
+            envio = await self.receber_prova(corpo, parametros.get("nome", [None])[0])
+            return 202, {"id": envio.id, "url": f"/provas/{envio.id}", **envio.situacao(incluir_respostas=False)}
+        if len(partes) == 2 and partes[0] == "provas" and metodo == "GET":
+            envio = self.envios.get(partes[1])
+            if envio is None:
+                raise ErroServico(404, "envio não encontrado")
+            esperar = float(parametros.get("esperar", [0])[0])
+            if esperar > 0 and not envio.fim.is_set():
+                try:
+                    await asyncio.wait_for(envio.fim.wait(), esperar)
+                except asyncio.TimeoutError:
+                    pass
+            return 200, envio.situacao()
+        if partes == ["estado"] and metodo == "GET":
+            return 200, self.estado()
+        if partes and partes[0] in ("gabarito", "provas", "estado"):
+            raise ErroServico(405, f"método {metodo} não aceito em {caminho}")
+        raise ErroServico(404, f"rota {caminho} não existe")
+
+    async def _atender(self, reader, writer):
+        """Uma requisição por conexão (Connection: close)."""
+        try:
+            status, cabecalhos, dados = await self._responder(reader)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+            return
+        corpo = json.dumps(dados, ensure_ascii=False).encode("utf-8")
+        linhas = [f"HTTP/1.1 {status} {_MOTIVOS.get(status, '')}", "Content-Type: application/json; charset=utf-8",
+                  f"Content-Length: {len(corpo)}", "Connection: close"]
+        linhas += [f"{chave}: {valor}" for chave, valor in cabecalhos.items()]
+        writer.write(("\r\n".join(linhas) + "\r\n\r\n").encode("latin-1") + corpo)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+
+    async def _responder(self, reader):
+        try:
+            linha = (await _ler_linha(reader, 400, "linha de requisição longa demais")).split()
+            if len(linha) != 3:
+                raise ErroServico(400, "requisição malformada")
+            metodo, alvo, _ = linha
+            cabecalhos = {}
+            while True:
+                linha_cabecalho = (await _ler_linha(reader, 431, "linha de cabeçalho longa demais")).strip()
+                if not linha_cabecalho:
+                    break
+                chave, _, valor = linha_cabecalho.partition(":")
+                cabecalhos[chave.strip().lower()] = valor.strip()
+
+            url = urlsplit(alvo)
+            tamanho = _tamanho_corpo(cabecalhos)
+            corpo = await reader.readexactly(tamanho) if tamanho else b""
+            status, dados = await self._rotear(metodo.upper(), url.path, parse_qs(url.query), corpo)
+            return status, {}, dados
+        except ErroServico as e:
+            return e.status, e.cabecalhos, {"erro": str(e)}
+        except ValueError as e:
+            return 400, {}, {"erro": str(e)}
+
+    async def servir(self, host=HOST_SERVICO, porta=PORTA_SERVICO):
+        self.fila = asyncio.Queue()
+        self.vagas = asyncio.Semaphore(self.workers)
+        self.pool = corretor.criar_pool(self.workers)
+        despachante = asyncio.create_task(self._despachar())
+        servidor = await asyncio.start_server(self._atender, host, porta)
+        print(f"🌐 Serviço de correção em http://{host}:{porta} com {self.workers} processos (Ctrl+C para parar).")
+        try:
+            async with servidor:
+                await servidor.serve_forever()
+        finally:
+            despachante.cancel()
+            self.pool.shutdown(cancel_futures=True)
+
+
+async def _ler_linha(reader, status, mensagem):
+    """Uma linha da requisição; acima do limite do StreamReader, ErroServico(`status`, `mensagem`)."""
+    try:
+        return (await reader.readline()).decode("latin-1")
+    except (ValueError, asyncio.LimitOverrunError):  # o readline converte o LimitOverrunError em ValueError
+        raise ErroServico(status, mensagem)
+
+
+def _tamanho_corpo(cabecalhos):
+    """Tamanho do corpo pelo Content-Length; ErroServico 400 se inválido, 413 se maior que o limite."""
+    try:
+        tamanho = int(cabecalhos.get("content-length", 0) or 0)
+    except ValueError:
+        tamanho = -1
+    if tamanho < 0:
+        raise ErroServico(400, "Content-Length inválido")
+    if tamanho > MAX_MB_ENVIO_SERVICO * 1e6:
+        raise ErroServico(413, f"envio maior que {MAX_MB_ENVIO_SERVICO} MB")
+    return tamanho
+
+
+def _gravar(caminho, dados):
+    with open(caminho, 'wb') as f:
+        f.write(dados)
+
+
+def _contar_paginas(caminho):
+    return corretor.pdfinfo_from_path(caminho, poppler_path=corretor.poppler_path)["Pages"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serviço HTTP local que corrige os PDFs enviados pelos coordenadores")
+    parser.add_argument("--host", default=HOST_SERVICO, help="use 0.0.0.0 para aceitar outras máquinas da rede")
+    parser.add_argument("--porta", type=int, default=PORTA_SERVICO)
+    parser.add_argument("--workers", type=int, default=WORKERS_SERVICO, help="processos de correção (0 = todos os núcleos)")
+    parser.add_argument("--gabarito", metavar="PDF", help="PDF cuja primeira página é o gabarito")
+    args = parser.parse_args()
+
+    servico = ServicoCorrecao(workers=args.workers)
+
+    async def principal():
+        if args.gabarito:
+            # O gabarito inicial é lido antes de abrir a porta; depois pode ser trocado com POST /gabarito
+            servico.fila = asyncio.Queue()
+            with open(args.gabarito, 'rb') as f:
+                print(f"🔑 Gabarito: {(await servico.definir_gabarito(f.read()))['gabarito']}")
+        await servico.servir(args.host, args.porta)
+
+    try:
+        asyncio.run(principal())
+    except KeyboardInterrupt:
+        print("\n⏹️ Serviço encerrado.")
@@ -0,0 +1,22 @@
+import pandas as pd
+import pipeline
+
+
+def test_falha_ao_unir_os_dados_para_antes_do_relatorio_e_dos_boletins(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    df_resultados = pd.DataFrame({"Aluno/Questões": ["Gabarito", "Ana"], 1: ["A", "A"],
+                                  "Acertos": [None, 1], "% de Acertos": [None, 100.0]})
+    chamadas = []
+    monkeypatch.setattr(pipeline.corretor, "corrigir_pasta", lambda *a, **k: (["A"], [("sala", "p1", ["A"])]))
+    monkeypatch.setattr(pipeline.corretor, "salvar_csv", lambda *a, **k: None)
+    monkeypatch.setattr(pipeline, "salvar_matriz", lambda *a, **k: None)
+    monkeypatch.setattr(pipeline, "salvar_preenchimentos", lambda *a, **k: None)
+    # Planilha socioeconômica sem a coluna de nomes: a união dos dados falha
+    monkeypatch.setattr(pipeline, "ler_planilha", lambda *a, **k: pd.DataFrame({"Outra": ["Ana"]}))
+    monkeypatch.setattr(pipeline, "ler_mapeamento_materias", lambda *a, **k: {})
+    monkeypatch.setattr(pipeline, "processar_provas", lambda **k: df_resultados)
+    monkeypatch.setattr(pipeline, "criar_pdf_consolidado", lambda *a, **k: chamadas.append("relatório"))
+    monkeypatch.setattr(pipeline, "gerar_boletins", lambda *a, **k: chamadas.append("boletins"))
+
+    assert pipeline.executar_pipeline(str(tmp_path), destino_boletins=str(tmp_path / "boletins")) is None
+    assert chamadas == []
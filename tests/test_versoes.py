@@ -0,0 +1,116 @@
+import numpy as np
+import openpyxl  # type: ignore
+import pandas as pd
+import pytest
+import processar_provas
+from config import NOME_DA_PLANILHA_RESULTADOS, NOME_DA_PLANILHA_GABARITOS, COLUNA_NOME_SOCIO, COLUNA_TIPO_PROVA_SOCIO
+from pontuacao import coluna_certa
+
+# Duas versões com as letras embaralhadas: só a questão 3 tem a mesma resposta nas duas.
+# A questão 6 é anulada e a questão 1 vale 2 pontos.
+GABARITO_A = ["A", "B", "C", "D", "E", "A"]
+GABARITO_B = ["E", "D", "C", "B", "A", "B"]
+MAPEAMENTO = {"Matemática": [1, 2, 3], "Português": [4, 5, 6]}
+ALUNOS = {
+    "Ana": ("A", GABARITO_A),                        # versão A, tudo certo
+    "Bruno": ("B", GABARITO_B),                      # versão B, tudo certo
+    "Carla": ("B", GABARITO_A[:5] + ["C"]),          # versão B respondendo o gabarito A
+}
+
+
+def _criar_planilha(caminho):
+    workbook = openpyxl.Workbook()
+    workbook.active.title = NOME_DA_PLANILHA_RESULTADOS
+    ws = workbook.create_sheet(NOME_DA_PLANILHA_GABARITOS)
+    ws.append(["Questão", "Peso", "Anulada", "Gabarito A", "Gabarito B"])
+    for linha in range(4):
+        ws.insert_rows(1)  # cabeçalho na linha 5, como nas demais abas
+    for numero, (a, b) in enumerate(zip(GABARITO_A, GABARITO_B), start=1):
+        ws.append([numero, 2 if numero == 1 else 1, "Sim" if numero == 6 else "", a, b])
+    workbook.save(caminho)
+
+
+@pytest.fixture
+def resultados(tmp_path, monkeypatch):
+    """Roda `processar_provas` sobre a turma de duas versões; devolve (DataFrame, caminho da planilha, modo)."""
+    monkeypatch.chdir(tmp_path)
+    caminho = str(tmp_path / "planilha_final.xlsx")
+    _criar_planilha(caminho)
+    monkeypatch.setattr(processar_provas, "ARQUIVO_EXCEL", caminho)
+
+    colunas = [str(q) for q in range(1, len(GABARITO_A) + 1)]
+    df_respostas = pd.DataFrame([GABARITO_A] + [respostas for _, respostas in ALUNOS.values()], columns=colunas)
+    df_socio = pd.DataFrame({COLUNA_NOME_SOCIO: list(ALUNOS), COLUNA_TIPO_PROVA_SOCIO: [t for t, _ in ALUNOS.values()]})
+
+    def rodar(escrita_rapida):
+        monkeypatch.setattr(processar_provas, "ESCRITA_RAPIDA_EXCEL", escrita_rapida)
+        df = processar_provas.processar_provas(df_respostas=df_respostas, df_socio=df_socio,
+                                               mapeamento_materias=MAPEAMENTO)
+        return df, caminho
+    return rodar
+
+
+def _certas_esperadas():
+    certas = []
+    for tipo, respostas in ALUNOS.values():
+        chave = GABARITO_A if tipo == "A" else GABARITO_B
+        certas.append([r == c or q == 6 for q, (r, c) in enumerate(zip(respostas, chave), start=1)])
+    return np.array(certas)
+
+
+@pytest.mark.parametrize("escrita_rapida", [True, False])
+def test_colunas_certas_seguem_a_versao_de_cada_aluno(resultados, escrita_rapida):
+    df, caminho = resultados(escrita_rapida)
+    esperadas = _certas_esperadas()
+    colunas = [coluna_certa(q) for q in range(1, 7)]
+
+    lido = pd.read_excel(caminho, sheet_name=NOME_DA_PLANILHA_RESULTADOS, header=4)
+    for tabela in (df, lido):
+        np.testing.assert_array_equal(tabela[colunas].iloc[1:].to_numpy(dtype=float) == 1, esperadas)
+        np.testing.assert_array_equal(tabela["Acertos"].iloc[1:].to_numpy(dtype=float), esperadas.sum(axis=1))
+    # Bruno (versão B) acertou tudo: 100% mesmo com as letras diferentes das do gabarito A da linha 2
+    assert lido.loc[lido["Aluno/Questões"] == "Bruno", "% de Acertos"].item() == pytest.approx(100)
+    # O gabarito de cada aluno fica nas colunas ocultas
+    assert lido.loc[lido["Aluno/Questões"] == "Bruno", [f"Gabarito {q}" for q in range(1, 7)]].iloc[0].tolist() == GABARITO_B
+
+    ws = openpyxl.load_workbook(caminho)[NOME_DA_PLANILHA_RESULTADOS]
+    primeira = df.columns.get_loc(coluna_certa(1)) + 1
+    assert ws.column_dimensions[openpyxl.utils.get_column_letter(primeira)].hidden
+
+
+def test_formatacao_condicional_le_as_colunas_certas(resultados):
+    df, caminho = resultados(True)
+    ws = openpyxl.load_workbook(caminho)[NOME_DA_PLANILHA_RESULTADOS]
+    letra = openpyxl.utils.get_column_letter(df.columns.get_loc(coluna_certa(1)) + 1)
+    regras = [(str(faixa.sqref), regra.formula[0]) for faixa in ws.conditional_formatting for regra in faixa.rules]
+    assert regras == [("B7:G9", f"{letra}7=1"), ("B7:G9", f"{letra}7<>1")]
+
+
+def test_escrita_celula_a_celula_pinta_pela_versao(resultados):
+    _, caminho = resultados(False)
+    ws = openpyxl.load_workbook(caminho)[NOME_DA_PLANILHA_RESULTADOS]
+    verdes = np.array([[ws.cell(row=linha, column=col).fill.start_color.rgb.endswith("C6EFCE")
+                        for col in range(2, 8)] for linha in range(7, 10)])
+    np.testing.assert_array_equal(verdes, _certas_esperadas())
+
+
+def test_analise_de_itens_usa_os_acertos_da_pontuacao(resultados, tmp_path):
+    from analise_resultados import analisar_itens
+    _, caminho = resultados(True)
+    lido = pd.read_excel(caminho, sheet_name=NOME_DA_PLANILHA_RESULTADOS, header=4)
+    analisar_itens(lido.drop(columns=["Aluno/Questões"]), str(tmp_path))
+    itens = pd.read_csv(tmp_path / "analise_itens.csv")
+    np.testing.assert_allclose(itens["% Acerto"], _certas_esperadas().mean(axis=0) * 100, atol=1e-3)
+
+
+def test_boletim_mostra_o_gabarito_da_versao_do_aluno(resultados):
+    from boletins import preparar_turma, montar_boletim
+    _, caminho = resultados(True)
+    lido = pd.read_excel(caminho, sheet_name=NOME_DA_PLANILHA_RESULTADOS, header=4)
+    contexto, alunos = preparar_turma(lido, MAPEAMENTO)
+    por_nome = {aluno["nome"]: aluno for aluno in alunos}
+    assert por_nome["Bruno"]["certas"] == [True] * 6
+    assert por_nome["Bruno"]["gabarito"] == GABARITO_B
+    assert por_nome["Ana"]["gabarito"] is None  # igual ao gabarito comum
+    assert [aluno["certas"] for aluno in alunos] == _certas_esperadas().tolist()
+    montar_boletim(por_nome["Bruno"], contexto).output()
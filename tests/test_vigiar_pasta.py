@@ -0,0 +1,73 @@
+import os
+import vigiar_pasta
+from vigiar_pasta import CorrecaoContinua
+
+
+def _criar_pdfs(pasta, nomes):
+    for nome in nomes:
+        (pasta / nome).write_bytes(b"%PDF-1.4\n...\n%%EOF\n")
+
+
+def test_arquivo_apagado_depois_do_scandir_nao_interrompe_a_verificacao(tmp_path, monkeypatch):
+    _criar_pdfs(tmp_path, ["a.pdf", "b.pdf"])
+    vigia = CorrecaoContinua(str(tmp_path), tempo_estavel=0)
+    assert vigia._prontos(0) == []  # primeira passada: só observa
+    assert vigia._prontos(1) == ["a.pdf", "b.pdf"]
+
+    scandir = os.scandir
+
+    def scandir_e_renomeia(caminho):
+        entradas = list(scandir(caminho))
+        os.rename(tmp_path / "b.pdf", tmp_path / "c.pdf.tmp")  # o scanner troca o arquivo entre a listagem e o stat
+        return iter(entradas)
+
+    monkeypatch.setattr(vigiar_pasta.os, "scandir", scandir_e_renomeia)
+    assert vigia._prontos(2) == ["a.pdf"]
+    assert "b.pdf" not in vigia.observados
+
+
+def test_arquivo_apagado_ao_conferir_o_fim_do_pdf(tmp_path, monkeypatch):
+    _criar_pdfs(tmp_path, ["a.pdf", "b.pdf"])
+    vigia = CorrecaoContinua(str(tmp_path), tempo_estavel=0)
+    vigia._prontos(0)
+
+    pdf_completo = vigiar_pasta._pdf_completo
+
+    def apaga_b(caminho):
+        if caminho.endswith("b.pdf"):
+            os.remove(caminho)
+        return pdf_completo(caminho)
+
+    monkeypatch.setattr(vigiar_pasta, "_pdf_completo", apaga_b)
+    assert vigia._prontos(1) == ["a.pdf"]
+    assert "b.pdf" not in vigia.observados
+    assert vigia.pendentes == 1
+    assert vigia._prontos(2) == ["a.pdf"]  # a próxima passada segue normalmente
+
+
+def test_erro_inesperado_num_pdf_nao_encerra_a_vigia(tmp_path, monkeypatch):
+    _criar_pdfs(tmp_path, ["a.pdf", "b.pdf", "c.pdf"])
+    vigia = CorrecaoContinua(str(tmp_path), tempo_estavel=0)
+    tentativas = []
+
+    def preparar_gabarito(arquivo):
+        vigia.opcoes, vigia.arquivo_gabarito = {}, arquivo
+
+    def corrigir_pdf(arquivo):
+        tentativas.append(arquivo)
+        if arquivo == "b.pdf":
+            raise RuntimeError("falha na medição")  # ex.: cv2.error
+        vigia.corrigidos[arquivo] = (vigia.observados[arquivo][0], {})
+        return 0, 1
+
+    monkeypatch.setattr(vigia, "_preparar_gabarito", preparar_gabarito)
+    monkeypatch.setattr(vigia, "_corrigir_pdf", corrigir_pdf)
+    monkeypatch.setattr(vigia, "salvar_saidas", lambda: (0, []))
+    monkeypatch.setattr(vigiar_pasta, "resumir_situacoes", lambda situacoes: "")
+
+    assert vigia.verificar() == 0  # primeira passada: só observa
+    assert vigia.verificar() == 2
+    assert tentativas == ["a.pdf", "b.pdf", "c.pdf"]
+    assert vigia.falhos["b.pdf"] == vigia.observados["b.pdf"][0]
+    assert vigia.verificar() == 0
+    assert tentativas == ["a.pdf", "b.pdf", "c.pdf"]  # o PDF com erro não é tentado de novo sem mudar
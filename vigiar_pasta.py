@@ -0,0 +1,232 @@
+import io
+import os
+import time
+import argparse
+import contextlib
+import numpy as np
+from concurrent.futures.process import BrokenProcessPool
+import corretor
+from cache_correcao import hash_arquivo, hash_parametros, carregar_cache, salvar_cache
+from matriz_respostas import gravar_matriz, exportar_csv
+from recorrecao import aplicar_regras, salvar_preenchimentos, resumir_situacoes
+from config import (DPI_RASTERIZACAO, WORKERS_CORRECAO, INTERVALO_VIGIA, TEMPO_ESTAVEL_VIGIA, ARQUIVO_RESPOSTAS,
+                    ARQUIVO_MATRIZ_RESPOSTAS, ARQUIVO_PREENCHIMENTOS)
+
+# --- Correção contínua: vigia a pasta de PDFs ---
+# No dia da prova, os scanners vão deixando PDFs em imagens_pdf ao longo de horas. Em vez de esperar o fim e
+# rodar o corretor.py sobre tudo, este modo fica rodando e olha a pasta a cada INTERVALO_VIGIA segundos. Um PDF
+# novo é corrigido assim que fica completo: o tamanho e a data não mudam por TEMPO_ESTAVEL_VIGIA segundos e o
+# arquivo termina com a marca de fim de PDF. As páginas vão para um pool de processos que fica aberto o tempo
+# todo. Depois de cada PDF, o respostas.csv, a matriz e os preenchimentos são regravados com todos os PDFs
+# corrigidos até ali, na ordem alfabética, a mesma do corretor.py.
+# Um PDF já corrigido (mesmo nome, tamanho e data) não é nem relido. O cache de correção é o mesmo do
+# corretor.py, então nenhuma página é corrigida duas vezes, nem depois de reiniciar este processo, e rodar o
+# corretor.py no fim só reaproveita o cache.
+# O gabarito é a primeira página do primeiro PDF em ordem alfabética (ex.: '00_gabarito.pdf'), como no
+# corretor.py; os demais PDFs esperam até ele ficar completo.
+
+
+def _pdf_completo(caminho, tamanho_final=2048):
+    """Indica se o arquivo já termina com a marca de fim de PDF ('%%EOF'), gravada por último pelos scanners."""
+    with open(caminho, 'rb') as f:
+        f.seek(max(0, os.path.getsize(caminho) - tamanho_final))
+        return b"%%EOF" in f.read()
+
+
+class CorrecaoContinua:
+    """Estado da correção contínua: PDFs observados, gabarito e preenchimentos de cada PDF já corrigido."""
+
+    def __init__(self, pasta_pdf=corretor.entrada_pdf, dpi=DPI_RASTERIZACAO, workers=WORKERS_CORRECAO,
+                 tempo_estavel=TEMPO_ESTAVEL_VIGIA, caminho_csv=ARQUIVO_RESPOSTAS,
+                 caminho_matriz=ARQUIVO_MATRIZ_RESPOSTAS, caminho_preenchimentos=ARQUIVO_PREENCHIMENTOS):
+        self.pasta_pdf = pasta_pdf
+        self.dpi = dpi
+        self.workers = workers or os.cpu_count() or 1
+        self.tempo_estavel = tempo_estavel
+        self.caminhos = (caminho_csv, caminho_matriz, caminho_preenchimentos)
+        self.observados = {}  # arquivo → (tamanho, data), instante em que essa assinatura apareceu
+        self.corrigidos = {}  # arquivo → (assinatura, {número da página: preenchimentos (60, 5)})
+        self.falhos = {}      # arquivo → assinatura que não pôde ser lida (tenta de novo se o arquivo mudar)
+        self.arquivo_gabarito = None
+        self.preenchimentos_gabarito = None
+        self.opcoes = None    # argumentos de corretor.corrigir_alunos, prontos depois do gabarito
+        self.hash_params = None
+        self.pool = None
+        self.pendentes = 0    # PDFs vistos na última verificação que ainda não foram corrigidos
+        self._primeiro = None  # primeiro PDF da pasta em ordem alfabética (o do gabarito)
+        self._alterado = False  # algum PDF corrigido saiu da pasta
+
+    def _prontos(self, agora):
+        """PDFs completos ainda não corrigidos (ou alterados depois da correção), em ordem alfabética."""
+        presentes, prontos, self.pendentes = set(), [], 0
+        for entrada in sorted(os.scandir(self.pasta_pdf), key=lambda e: e.name):
+            if not entrada.name.endswith(".pdf"):
+                continue
+            try:
+                if not entrada.is_file():
+                    continue
+                info = entrada.stat()
+                assinatura = (info.st_size, info.st_mtime_ns)
+                ja_lido = assinatura in (self.corrigidos.get(entrada.name, (None,))[0], self.falhos.get(entrada.name))
+                observado = self.observados.get(entrada.name)
+                novo = observado is None or observado[0] != assinatura
+                completo = (not ja_lido and not novo and agora - observado[1] >= self.tempo_estavel
+                            and _pdf_completo(entrada.path))
+            except OSError:
+                # Renomeado ou apagado entre o scandir e a leitura (scanners que gravam num temporário e renomeiam)
+                self.observados.pop(entrada.name, None)
+                continue
+            presentes.add(entrada.name)
+            if ja_lido:
+                continue
+            self.pendentes += 1
+            if novo:
+                self.observados[entrada.name] = (assinatura, agora)  # novo ou ainda sendo gravado
+            elif completo:
+                prontos.append(entrada.name)
+
+        for arquivo in [a for a in self.corrigidos if a not in presentes]:
+            print(f"⚠️ '{arquivo}' saiu da pasta; as respostas dele foram retiradas.")
+            del self.corrigidos[arquivo]
+            self._alterado = True
+        self._primeiro = min(presentes) if presentes else None
+        return prontos
+
+    def _preparar_gabarito(self, arquivo):
+        """Corrige o gabarito e prepara o bloco, o template e o registro usados nas páginas dos alunos."""
+        caminho = os.path.join(self.pasta_pdf, arquivo)
+        self.hash_params = hash_parametros(corretor.parametros_correcao(self.dpi, hash_arquivo(caminho)))
+        _, pagina = next(corretor.rasterizar_pdf(caminho, dpi=self.dpi, paginas=[1]))
+        medidos = []
+        _, self.opcoes = corretor.preparar_gabarito(np.asarray(pagina), self.dpi, preenchimentos=medidos)
+        self.preenchimentos_gabarito = medidos[0]
+        self.arquivo_gabarito = arquivo
+        print(f"🔑 Gabarito lido de '{arquivo}'.")
+
+    def _corrigir_pdf(self, arquivo):
+        """Corrige as páginas do PDF que não estão no cache e guarda os preenchimentos de todas."""
+        caminho = os.path.join(self.pasta_pdf, arquivo)
+        assinatura = self.observados[arquivo][0]
+        hash_pdf = hash_arquivo(caminho)
+        cache = carregar_cache(hash_pdf, self.hash_params)
+        if cache["total_paginas"] is None:
+            cache["total_paginas"] = corretor.pdfinfo_from_path(caminho, poppler_path=corretor.poppler_path)["Pages"]
+        if arquivo == self.arquivo_gabarito:
+            cache["paginas"]["1"] = self.preenchimentos_gabarito.tolist()
+
+        faltantes = [n for n in range(1, cache["total_paginas"] + 1) if str(n) not in cache["paginas"]]
+        if faltantes:
+            medidos = []
+            corretor.corrigir_alunos(corretor.paginas_pdf(caminho, faltantes, self.dpi), workers=self.workers,
+                                     preenchimentos=medidos, pool=self.pool, **self.opcoes)
+            for numero, preenchimentos in zip(faltantes, medidos):
+                cache["paginas"][str(numero)] = preenchimentos.tolist()
+        salvar_cache(hash_pdf, self.hash_params, cache)
+        self.corrigidos[arquivo] = (assinatura, {int(n): np.array(p, dtype=np.float16)
+                                                 for n, p in cache["paginas"].items()})
+        return len(faltantes), cache["total_paginas"]
+
+    def salvar_saidas(self):
+        """Regrava respostas.csv, a matriz e os preenchimentos com todos os PDFs corrigidos, em ordem alfabética."""
+        resultados, preenchimentos = [], [self.preenchimentos_gabarito]
+        for arquivo in sorted(self.corrigidos):
+            nome_base = os.path.splitext(arquivo)[0]
+            for numero, medidos in sorted(self.corrigidos[arquivo][1].items()):
+                if (arquivo, numero) == (self.arquivo_gabarito, 1):
+                    continue
+                resultados.append((nome_base, f"{nome_base}_p{numero}.jpg", None))
+                preenchimentos.append(medidos)
+
+        # As regras são aplicadas ao tensor inteiro de uma vez, sem decidir página por página
+        tensor = np.stack(preenchimentos)
+        codigos, situacoes = aplicar_regras(tensor)
+        dados = {"respostas": codigos[1:], "gabarito": codigos[0],
+                 "pdf": np.array([nome for nome, _, _ in resultados], dtype=str),
+                 "pagina": np.array([pagina for _, pagina, _ in resultados], dtype=str)}
+        caminho_csv, caminho_matriz, caminho_preenchimentos = self.caminhos
+        with contextlib.redirect_stdout(io.StringIO()):
+            exportar_csv(dados, caminho_csv)
+            gravar_matriz(dados, caminho_matriz)  # depois do CSV: a matriz só é preferida se não for mais antiga
+            salvar_preenchimentos(preenchimentos, resultados, caminho_preenchimentos)
+        return len(resultados), situacoes[1:]
+
+    def verificar(self):
+        """Uma passada pela pasta: corrige os PDFs prontos e regrava as saídas. Devolve quantos PDFs corrigiu."""
+        self._alterado = False
+        prontos = self._prontos(time.monotonic())
+
+        if self.arquivo_gabarito in prontos:
+            # O PDF do gabarito mudou: tudo precisa ser corrigido de novo com o gabarito novo
+            print(f"⚠️ O PDF do gabarito '{self.arquivo_gabarito}' mudou; todos os PDFs serão corrigidos de novo.")
+            self.opcoes, self.corrigidos = None, {}
+        if self.opcoes is None:
+            if self._primeiro not in prontos:
+                return 0  # o gabarito (primeiro PDF) ainda não chegou ou não está completo
+            prontos = [self._primeiro] + [a for a in prontos if a != self._primeiro]
+            try:
+                self._preparar_gabarito(self._primeiro)
+            except Exception as e:  # um PDF ruim não pode encerrar a vigia
+                print(f"❌ ERRO ao ler o gabarito em '{self._primeiro}': {type(e).__name__}: {e}. "
+                      f"Ele será tentado de novo quando mudar.")
+                self.opcoes = None  # o gabarito pode ter ficado pela metade
+                self.falhos[self._primeiro] = self.observados[self._primeiro][0]
+                return 0
+
+        corrigidos = 0
+        for arquivo in prontos:
+            if arquivo < self.arquivo_gabarito:
+                print(f"⚠️ '{arquivo}' vem antes de '{self.arquivo_gabarito}' em ordem alfabética: o corretor.py o "
+                      f"tomaria como gabarito. Renomeie um dos dois.")
+            inicio = time.perf_counter()
+            try:
+                novas, total = self._corrigir_pdf(arquivo)
+            except Exception as e:  # ex.: cv2.error ou um processo do pool que morreu nesta página
+                print(f"❌ ERRO ao corrigir '{arquivo}': {type(e).__name__}: {e}. Ele será tentado de novo quando mudar.")
+                self.falhos[arquivo] = self.observados[arquivo][0]
+                if isinstance(e, BrokenProcessPool) and self.pool is not None:
+                    self.pool.shutdown(wait=False)
+                    self.pool = corretor.criar_pool(self.workers)  # os próximos PDFs precisam de um pool novo
+                continue
+            self.falhos.pop(arquivo, None)
+            alunos, situacoes = self.salvar_saidas()
+            corrigidos += 1
+            print(f"✅ '{arquivo}': {novas} de {total} páginas corrigidas em {time.perf_counter() - inicio:.1f} s. "
+                  f"{alunos} alunos no '{self.caminhos[0]}' (para revisar: {resumir_situacoes(situacoes)}).")
+
+        if self._alterado and not corrigidos and self.opcoes is not None:
+            self.salvar_saidas()
+        return corrigidos
+
+    def vigiar(self, intervalo=INTERVALO_VIGIA, encerrar_apos=None):
+        """
+        Verifica a pasta a cada `intervalo` segundos até Ctrl+C ou, com `encerrar_apos`, até passar esse
+        tempo (s) sem nenhum PDF novo nem sendo gravado.
+        """
+        print(f"👀 Vigiando '{self.pasta_pdf}' com {self.workers} processos (Ctrl+C para parar)...")
+        ultima_atividade = time.monotonic()
+        self.pool = corretor.criar_pool(self.workers)
+        try:
+            while True:
+                if self.verificar() or self.pendentes:
+                    ultima_atividade = time.monotonic()
+                elif encerrar_apos is not None and time.monotonic() - ultima_atividade >= encerrar_apos:
+                    print(f"⏹️ Nenhum PDF novo há {encerrar_apos:.0f} s; encerrando.")
+                    break
+                time.sleep(intervalo)
+        except KeyboardInterrupt:
+            print("\n⏹️ Correção contínua interrompida.")
+        finally:
+            self.pool.shutdown()
+            self.pool = None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Corrige cada PDF novo da pasta assim que ele termina de ser gravado")
+    parser.add_argument("--pasta", default=corretor.entrada_pdf)
+    parser.add_argument("--workers", type=int, default=WORKERS_CORRECAO, help="processos de correção (0 = todos os núcleos)")
+    parser.add_argument("--intervalo", type=float, default=INTERVALO_VIGIA, help="segundos entre as verificações")
+    parser.add_argument("--encerrar-apos", type=float, default=None, metavar="SEGUNDOS",
+                        help="encerra depois desse tempo sem nenhum PDF novo")
+    args = parser.parse_args()
+
+    CorrecaoContinua(args.pasta, workers=args.workers).vigiar(args.intervalo, args.encerrar_apos)